@@ -14,6 +14,19 @@ from routes.attendance_routes import attendance_bp
 from routes.company_routes import company_bp
 from dotenv import load_dotenv
 from models import initialize_database, get_db_connection, close_db_connection
+from db_connection import close_pool, pool_stats
+from prepared_statements import prepared_statement_stats
+from auth import token_cache_stats
+from employee_directory import employee_directory
+from company_catalog import company_catalog
+import password_hashing
+import attendance_partitions
+import attendance_summary
+import token_revocation
+from roster_events import roster_broadcaster
+from company_purge import company_purger
+from login_audit import login_audit
+import db_context
 
 # Suppress the semaphore warnings
 warnings.filterwarnings("ignore", message="resource_tracker: There appear to be \\d+ leaked semaphore objects to clean up at shutdown")
@@ -21,6 +34,7 @@ warnings.filterwarnings("ignore", message="resource_tracker: There appear to be
 load_dotenv()
 
 app = Flask(__name__)
+db_context.init_app(app)
 
 # Test route to verify the Flask app is working
 @app.route('/api/test', methods=['GET'])
@@ -31,6 +45,22 @@ def test():
         'time': datetime.now().isoformat()
     })
 
+# Connection pool counters for monitoring
+@app.route('/api/health/db', methods=['GET'])
+def db_health():
+    try:
+        return jsonify({
+            'status': 'success',
+            'pool': pool_stats(),
+            'prepared_statements': prepared_statement_stats(),
+            'token_cache': token_cache_stats(),
+            'employee_directory': employee_directory.stats(),
+            'company_catalog': company_catalog.stats(),
+            'login_audit': login_audit.stats()
+        })
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 503
+
 # Allow requests from localhost and your local network IP
 CORS(app, resources={
     r"/api/*": {
@@ -120,6 +150,24 @@ with app.app_context():
     except Exception as e:
         print(f"Error initializing database: {e}")
         
+# Start the bcrypt workers before any request threads exist
+try:
+    password_hashing.start_pool()
+except Exception as e:
+    print(f"Error starting password hashing pool: {e}")
+
+# Keep next months' attendance partitions created ahead of time
+attendance_partitions.start_partition_maintenance()
+
+# Fold the summary deltas written by the attendance trigger
+attendance_summary.start_summary_folding()
+
+# Finish removing soft-deleted companies in the background
+company_purger.start()
+
+# Mirror revoked_tokens into memory so token checks never query it
+token_revocation.start_revocation_refresh()
+
 # Debug: Print all registered routes before adding blueprints
 print("\nBefore registering blueprints:")
 for rule in app.url_map.iter_rules():
@@ -148,7 +196,15 @@ def shutdown():
 
 def signal_handler(sig, frame):
     print('\nShutting down gracefully...')
-    # Add any cleanup code here if needed
+    password_hashing.shutdown_pool()
+    attendance_partitions.stop_partition_maintenance()
+    attendance_summary.stop_summary_folding()
+    token_revocation.stop_revocation_refresh()
+    roster_broadcaster.stop()
+    company_purger.stop()
+    # Write out queued login events while the pool is still open
+    login_audit.stop()
+    close_pool()
     os._exit(0)
 
 def main():
@@ -0,0 +1,256 @@
+import os
+import threading
+from psycopg2 import sql
+from dotenv import load_dotenv
+from db_connection import get_db_connection, close_db_connection
+
+load_dotenv()
+
+# Monthly partitions kept ready beyond the current month
+PARTITION_MONTHS_AHEAD = int(os.getenv('ATTENDANCE_PARTITION_MONTHS_AHEAD', '3'))
+# Seconds between checks that the upcoming partitions exist
+PARTITION_MAINTENANCE_INTERVAL = float(os.getenv('ATTENDANCE_PARTITION_MAINTENANCE_INTERVAL', '86400'))
+
+# Indexes every attendance table carries, as (suffix, columns)
+ATTENDANCE_INDEXES = [
+    ('emp_no', 'emp_no'),
+    ('employee_id', 'employee_id'),
+    ('company_name_shift_start', 'company_name, shift_start_time'),
+]
+# Built after work_date is filled in, without blocking writes; see create_work_date_index
+WORK_DATE_INDEX = ('emp_no_work_date', 'emp_no, work_date')
+
+
+def create_attendance_table(cursor, name='attendance'):
+    """Create ``name`` as an attendance table range-partitioned by month on shift_start_time.
+
+    The primary key has to include the partition key, and a row needs a
+    shift_start_time to be routed, so the column is NOT NULL here.
+    Anything outside the monthly partitions lands in ``<name>_default``.
+    """
+    cursor.execute(sql.SQL("""
+        CREATE TABLE IF NOT EXISTS {table} (
+            id SERIAL,
+            emp_no VARCHAR(50) REFERENCES employees(emp_no) ON DELETE CASCADE,
+            employee_id VARCHAR(20) REFERENCES employees(id) ON DELETE CASCADE,
+            name VARCHAR(100),
+            company_name VARCHAR(100) REFERENCES companies(company_name) ON DELETE CASCADE,
+            shift_start_time TIMESTAMP WITH TIME ZONE NOT NULL,
+            shift_end_time TIMESTAMP WITH TIME ZONE,
+            work_date DATE,
+            status VARCHAR(20) DEFAULT 'Active',
+            marked_by VARCHAR(50),
+            total_work_hours INTERVAL,
+            shift_count INTEGER,
+            created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id, shift_start_time),
+            CONSTRAINT valid_shift_times CHECK (
+                shift_end_time IS NULL OR shift_end_time > shift_start_time OR
+                (shift_end_time < shift_start_time AND
+                 (shift_end_time + INTERVAL '24 hours') > shift_start_time)
+            )
+        ) PARTITION BY RANGE (shift_start_time);
+        CREATE TABLE IF NOT EXISTS {default} PARTITION OF {table} DEFAULT;
+    """).format(table=sql.Identifier(name), default=sql.Identifier(f'{name}_default')))
+
+    for suffix, columns in ATTENDANCE_INDEXES:
+        cursor.execute(sql.SQL("CREATE INDEX IF NOT EXISTS {index} ON {table} ({columns})").format(
+            index=sql.Identifier(f'idx_{name}_{suffix}'),
+            table=sql.Identifier(name),
+            columns=sql.SQL(columns)
+        ))
+
+
+def install_partition_function(cursor, timezone):
+    """(Re)create create_attendance_partition(parent, month).
+
+    Partition bounds are midnight in ``timezone`` (the attendance time
+    zone), so a month's partition holds exactly that month's work dates.
+    Rows of the month already sitting in the default partition would make
+    CREATE TABLE ... PARTITION OF fail, so they are moved out first and
+    into the new partition once it exists. The move runs with the row
+    triggers of both partitions disabled: the rows keep their ids and
+    values, so summaries, open sessions and updated_at must not change
+    and no roster notifications are sent. Disabling takes a SHARE ROW
+    EXCLUSIVE lock until commit, and the triggers are enabled again
+    before the function returns.
+    """
+    cursor.execute(sql.SQL("""
+        CREATE OR REPLACE FUNCTION create_attendance_partition(p_parent TEXT, p_month DATE)
+        RETURNS TEXT AS $$
+        DECLARE
+            month_start DATE := date_trunc('month', p_month)::date;
+            part_name TEXT := format('attendance_y%sm%s',
+                                     to_char(month_start, 'YYYY'), to_char(month_start, 'MM'));
+            default_name TEXT := p_parent || '_default';
+            lower_bound TIMESTAMP WITH TIME ZONE := month_start::timestamp AT TIME ZONE {tz};
+            upper_bound TIMESTAMP WITH TIME ZONE := (month_start + INTERVAL '1 month')::timestamp AT TIME ZONE {tz};
+            strays BOOLEAN := FALSE;
+        BEGIN
+            IF to_regclass(part_name) IS NOT NULL THEN
+                RETURN part_name;
+            END IF;
+
+            IF to_regclass(default_name) IS NOT NULL THEN
+                EXECUTE format(
+                    'SELECT EXISTS (SELECT 1 FROM %I WHERE shift_start_time >= %L AND shift_start_time < %L)',
+                    default_name, lower_bound, upper_bound
+                ) INTO strays;
+            END IF;
+            IF strays THEN
+                DROP TABLE IF EXISTS attendance_partition_strays;
+                EXECUTE format('CREATE TEMP TABLE attendance_partition_strays (LIKE %I) ON COMMIT DROP',
+                               p_parent);
+                EXECUTE format('ALTER TABLE %I DISABLE TRIGGER USER', default_name);
+                EXECUTE format(
+                    'WITH moved AS (DELETE FROM %I WHERE shift_start_time >= %L AND shift_start_time < %L RETURNING *) '
+                    'INSERT INTO attendance_partition_strays SELECT * FROM moved',
+                    default_name, lower_bound, upper_bound
+                );
+                EXECUTE format('ALTER TABLE %I ENABLE TRIGGER USER', default_name);
+            END IF;
+
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                part_name, p_parent, lower_bound, upper_bound
+            );
+
+            IF strays THEN
+                EXECUTE format('ALTER TABLE %I DISABLE TRIGGER USER', part_name);
+                EXECUTE format('INSERT INTO %I SELECT * FROM attendance_partition_strays', part_name);
+                EXECUTE format('ALTER TABLE %I ENABLE TRIGGER USER', part_name);
+                DROP TABLE attendance_partition_strays;
+            END IF;
+            RETURN part_name;
+        END;
+        $$ LANGUAGE plpgsql;
+    """).format(tz=sql.Literal(timezone)))
+
+
+def is_partitioned(cursor, name='attendance'):
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (name,))
+    row = cursor.fetchone()
+    return bool(row) and row[0] == 'p'
+
+
+def _build_index_concurrently(cursor, index, table, columns):
+    """CREATE INDEX CONCURRENTLY, first dropping a copy left invalid by an interrupted build."""
+    cursor.execute("""
+        SELECT i.indisvalid FROM pg_index i
+        WHERE i.indexrelid = to_regclass(%s)
+    """, (index,))
+    row = cursor.fetchone()
+    if row and not row[0]:
+        cursor.execute(sql.SQL("DROP INDEX CONCURRENTLY {index}").format(index=sql.Identifier(index)))
+    cursor.execute(sql.SQL("CREATE INDEX CONCURRENTLY IF NOT EXISTS {index} ON {table} ({columns})").format(
+        index=sql.Identifier(index), table=sql.Identifier(table), columns=sql.SQL(columns)
+    ))
+
+
+def create_work_date_index(conn, name='attendance'):
+    """Build idx_<name>_emp_no_work_date without blocking writes.
+
+    Needs a connection with no transaction open; it is switched to
+    autocommit for the build. A partitioned table cannot be indexed
+    concurrently as a whole, so the index is declared on the parent only
+    and each partition's index is built concurrently and attached. New
+    partitions get it from the parent.
+    """
+    suffix, columns = WORK_DATE_INDEX
+    parent_index = f'idx_{name}_{suffix}'
+    conn.commit()
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cursor:
+            if not is_partitioned(cursor, name):
+                _build_index_concurrently(cursor, parent_index, name, columns)
+                return
+            cursor.execute(sql.SQL("CREATE INDEX IF NOT EXISTS {index} ON ONLY {table} ({columns})").format(
+                index=sql.Identifier(parent_index), table=sql.Identifier(name), columns=sql.SQL(columns)
+            ))
+            cursor.execute("""
+                SELECT c.relname,
+                       EXISTS (SELECT 1 FROM pg_inherits ii
+                               JOIN pg_index x ON x.indexrelid = ii.inhrelid
+                               WHERE ii.inhparent = to_regclass(%s) AND x.indrelid = c.oid)
+                FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = to_regclass(%s)
+                ORDER BY c.relname
+            """, (parent_index, name))
+            for partition, attached in cursor.fetchall():
+                if attached:
+                    continue
+                index = f'idx_{partition}_{suffix}'
+                _build_index_concurrently(cursor, index, partition, columns)
+                cursor.execute(sql.SQL("ALTER INDEX {parent} ATTACH PARTITION {index}").format(
+                    parent=sql.Identifier(parent_index), index=sql.Identifier(index)
+                ))
+    finally:
+        conn.autocommit = False
+
+
+def ensure_partitions(cursor, parent='attendance', start=None, months_ahead=None):
+    """Create the monthly partitions from ``start`` (default: this month) to months_ahead out.
+
+    "This month" is the attendance time zone's, like work_date, not the
+    server's. Runs under a transaction-level advisory lock, so concurrent
+    callers create (and move rows into) each partition only once.
+    """
+    # models imports this module
+    from models import attendance_today
+    if months_ahead is None:
+        months_ahead = PARTITION_MONTHS_AHEAD
+    today = attendance_today()
+    cursor.execute("SELECT pg_advisory_xact_lock(hashtext('create_attendance_partition'))")
+    cursor.execute("""
+        SELECT create_attendance_partition(%s, month::date)
+        FROM generate_series(
+            date_trunc('month', %s::date),
+            date_trunc('month', %s::date) + %s * INTERVAL '1 month',
+            INTERVAL '1 month'
+        ) AS month
+    """, (parent, start or today, today, months_ahead))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def maintain_partitions():
+    """Make sure the upcoming months have partitions; no-op on an unpartitioned table."""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            if is_partitioned(cursor):
+                ensure_partitions(cursor)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        close_db_connection(conn)
+
+
+_stop = threading.Event()
+_thread = None
+
+
+def _maintenance_loop():
+    while not _stop.is_set():
+        try:
+            maintain_partitions()
+        except Exception as e:
+            print(f"Error maintaining attendance partitions: {str(e)}")
+        _stop.wait(PARTITION_MAINTENANCE_INTERVAL)
+
+
+def start_partition_maintenance():
+    """Create upcoming partitions now and then once per maintenance interval."""
+    global _thread
+    if _thread is None or not _thread.is_alive():
+        _stop.clear()
+        _thread = threading.Thread(target=_maintenance_loop, name='attendance-partitions', daemon=True)
+        _thread.start()
+
+
+def stop_partition_maintenance():
+    _stop.set()
@@ -0,0 +1,101 @@
+import os
+import threading
+from dotenv import load_dotenv
+from db_connection import get_db_connection, close_db_connection
+
+load_dotenv()
+
+# Seconds between folds of the summary deltas into attendance_daily_summary
+SUMMARY_FOLD_INTERVAL = float(os.getenv('ATTENDANCE_SUMMARY_FOLD_INTERVAL', '5'))
+
+# Takes every committed delta and adds it onto its summary row, in key
+# order so two folds (or a fold and a rebuild) lock rows the same way
+FOLD_SQL = """
+    WITH moved AS (
+        DELETE FROM attendance_daily_summary_deltas
+        RETURNING company_name, work_date, headcount, sessions, open_sessions,
+                  total_work_hours, shift_count
+    ), totals AS (
+        SELECT company_name, work_date,
+               SUM(headcount)::integer AS headcount,
+               SUM(sessions)::integer AS sessions,
+               SUM(open_sessions)::integer AS open_sessions,
+               SUM(total_work_hours) AS total_work_hours,
+               SUM(shift_count)::integer AS shift_count
+        FROM moved
+        GROUP BY company_name, work_date
+    )
+    INSERT INTO attendance_daily_summary AS s (
+        company_name, work_date, headcount, sessions, open_sessions,
+        total_work_hours, shift_count
+    )
+    SELECT company_name, work_date, headcount, sessions, open_sessions,
+           total_work_hours, shift_count
+    FROM totals
+    ORDER BY company_name, work_date
+    ON CONFLICT (company_name, work_date) DO UPDATE SET
+        headcount = s.headcount + EXCLUDED.headcount,
+        sessions = s.sessions + EXCLUDED.sessions,
+        open_sessions = s.open_sessions + EXCLUDED.open_sessions,
+        total_work_hours = s.total_work_hours + EXCLUDED.total_work_hours,
+        shift_count = s.shift_count + EXCLUDED.shift_count,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+
+def lock_summaries(cursor, wait=True):
+    """Take the transaction-level lock that folds and rebuilds share."""
+    function = 'pg_advisory_xact_lock' if wait else 'pg_try_advisory_xact_lock'
+    cursor.execute(f"SELECT {function}(hashtext('attendance_daily_summary'))")
+    return wait or cursor.fetchone()[0]
+
+
+def fold_summary_deltas(cursor):
+    """Add the pending deltas onto attendance_daily_summary; the caller commits.
+
+    Returns the number of summary rows touched, or None when another
+    process is folding right now.
+    """
+    if not lock_summaries(cursor, wait=False):
+        return None
+    cursor.execute(FOLD_SQL)
+    return cursor.rowcount
+
+
+def fold_summaries():
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            fold_summary_deltas(cursor)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        close_db_connection(conn)
+
+
+_stop = threading.Event()
+_thread = None
+
+
+def _fold_loop():
+    while not _stop.is_set():
+        try:
+            fold_summaries()
+        except Exception as e:
+            print(f"Error folding attendance summaries: {str(e)}")
+        _stop.wait(SUMMARY_FOLD_INTERVAL)
+
+
+def start_summary_folding():
+    """Fold the summary deltas now and then once per fold interval."""
+    global _thread
+    if _thread is None or not _thread.is_alive():
+        _stop.clear()
+        _thread = threading.Thread(target=_fold_loop, name='attendance-summaries', daemon=True)
+        _thread.start()
+
+
+def stop_summary_folding():
+    _stop.set()
@@ -0,0 +1,270 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+import jwt
+from flask import g, jsonify, request
+from dotenv import load_dotenv
+from db_context import get_db
+from prepared_statements import execute_prepared
+from token_revocation import revocation_list
+
+load_dotenv()
+
+SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-here')
+JWT_ALGORITHM = 'HS256'
+# Number of verified tokens kept in memory
+TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', '4096'))
+# Lifetime of access tokens; devices renew them with a refresh token
+TOKEN_TTL = timedelta(minutes=float(os.getenv('AUTH_ACCESS_TOKEN_TTL_MINUTES', '15')))
+# Seconds a looked-up role is trusted before it is read again
+ROLE_CACHE_TTL = float(os.getenv('AUTH_ROLE_CACHE_TTL', '60'))
+# Use the role signed into employee tokens instead of looking it up
+TRUST_ROLE_CLAIM = os.getenv('AUTH_TRUST_ROLE_CLAIM', 'false').lower() == 'true'
+
+ADMIN_ROLES = ('admin', 'acting_admin')
+
+# Table -> prepared statement that reads a role from it
+ROLE_STATEMENTS = {
+    'employees': 'employee_role',
+    'users': 'user_role',
+}
+
+
+class TokenRevokedError(jwt.InvalidTokenError):
+    """Raised for a correctly signed token that has been revoked."""
+
+
+class TokenCache:
+    """Bounded LRU of verified token claims keyed by the token's digest.
+
+    Entries are dropped as soon as the token's ``exp`` has passed, so an
+    expired token always falls through to a full ``jwt.decode`` which
+    reports the expiry.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, digest, now):
+        with self._lock:
+            claims = self._entries.get(digest)
+            if claims is None:
+                self.misses += 1
+                return None
+            exp = claims.get('exp')
+            if exp is not None and exp <= now:
+                del self._entries[digest]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return claims
+
+    def put(self, digest, claims):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[digest] = claims
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, digest):
+        with self._lock:
+            self._entries.pop(digest, None)
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+class RoleCache:
+    """Roles by (table, emp_no) with a TTL and explicit invalidation."""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, now):
+        """Return (found, role); a cached None means the user does not exist."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                self.misses += 1
+                return False, None
+            self.hits += 1
+            return True, entry[0]
+
+    def put(self, key, role, now):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (role, now + self.ttl)
+
+    def invalidate(self, emp_no=None):
+        with self._lock:
+            if emp_no is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[1] == emp_no]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+_token_cache = TokenCache(TOKEN_CACHE_SIZE)
+_role_cache = RoleCache(ROLE_CACHE_TTL)
+
+
+def token_digest(token):
+    return hashlib.sha256(token.encode('utf-8')).digest()
+
+
+def issue_token(emp_no, ttl=None, **claims):
+    """Sign a token for ``emp_no`` with a unique ``jti`` so it can be revoked."""
+    now = datetime.now(timezone.utc)
+    payload = dict(claims)
+    payload.update({
+        'emp_no': emp_no,
+        'jti': uuid.uuid4().hex,
+        'iat': now,
+        'exp': now + (ttl or TOKEN_TTL),
+    })
+    return jwt.encode(payload, SECRET_KEY, algorithm=JWT_ALGORITHM)
+
+
+def verify_token(token):
+    """Return the token's claims, verifying the signature only on first sight.
+
+    Raises the usual ``jwt`` exceptions for expired or invalid tokens, and
+    ``TokenRevokedError`` for revoked ones.
+    """
+    digest = token_digest(token)
+    claims = _token_cache.get(digest, time.time())
+    if claims is None:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[JWT_ALGORITHM])
+        _token_cache.put(digest, claims)
+    jti = claims.get('jti')
+    if jti and revocation_list.is_revoked(jti):
+        raise TokenRevokedError('Token has been revoked')
+    return claims
+
+
+def revoke_token(claims):
+    """Revoke the token described by ``claims`` as part of the current request."""
+    jti = claims.get('jti')
+    if not jti:
+        return False
+    exp = claims.get('exp') or (time.time() + TOKEN_TTL.total_seconds())
+    db_ctx = get_db()
+    with db_ctx.cursor() as cur:
+        revocation_list.revoke(cur, jti, claims.get('emp_no'), exp)
+    db_ctx.after_commit(lambda: revocation_list.mark_revoked(jti, exp))
+    return True
+
+
+def get_request_token():
+    """Extract the raw token from the Authorization header, if any."""
+    header = request.headers.get('Authorization', '').strip()
+    if header.lower().startswith('bearer '):
+        header = header[7:].strip()
+    return header or None
+
+
+def token_required(f):
+    """Reject the request unless it carries a valid token.
+
+    The decoded claims are exposed as ``g.token_claims`` and the caller's
+    employee number as ``g.current_emp_no``.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        token = get_request_token()
+        if not token:
+            return jsonify({'success': False, 'message': 'Authorization token is missing'}), 401
+
+        try:
+            claims = verify_token(token)
+        except jwt.ExpiredSignatureError:
+            return jsonify({'success': False, 'message': 'Token has expired'}), 401
+        except TokenRevokedError:
+            return jsonify({'success': False, 'message': 'Token has been revoked'}), 401
+        except jwt.InvalidTokenError:
+            return jsonify({'success': False, 'message': 'Invalid token'}), 401
+
+        g.token_claims = claims
+        g.current_emp_no = claims.get('emp_no')
+        return f(*args, **kwargs)
+    return decorated
+
+
+def get_role(emp_no, table='employees'):
+    """Return the role of ``emp_no`` in ``table``, or None if there is no such user."""
+    if table == 'employees' and TRUST_ROLE_CLAIM:
+        claims = g.get('token_claims') or {}
+        if claims.get('emp_no') == emp_no and claims.get('role'):
+            return claims['role']
+
+    key = (table, emp_no)
+    now = time.monotonic()
+    found, role = _role_cache.get(key, now)
+    if found:
+        return role
+
+    with get_db().cursor() as cur:
+        execute_prepared(cur, ROLE_STATEMENTS[table], (emp_no,))
+        row = cur.fetchone()
+    role = row['role'] if row else None
+    _role_cache.put(key, role, now)
+    return role
+
+
+def invalidate_role(emp_no=None):
+    """Forget cached roles for one employee, or for everyone."""
+    _role_cache.invalidate(emp_no)
+
+
+def role_required(*roles, table='employees', message='Insufficient permissions'):
+    """Allow the request only if the caller's role is one of ``roles``.
+
+    Must be applied below ``token_required``. Roles are compared
+    case-insensitively.
+    """
+    allowed = {role.lower() for role in roles}
+
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            try:
+                role = get_role(g.current_emp_no, table)
+            except Exception as e:
+                print(f"Error looking up role: {str(e)}")
+                return jsonify({'success': False, 'message': 'Error checking permissions'}), 500
+            if not role or role.strip().lower() not in allowed:
+                return jsonify({'success': False, 'message': message}), 403
+            g.current_role = role
+            return f(*args, **kwargs)
+        return decorated
+    return decorator
+
+
+def token_cache_stats():
+    return {
+        'tokens': _token_cache.stats(),
+        'roles': _role_cache.stats(),
+        'revocations': revocation_list.stats(),
+    }
@@ -0,0 +1,75 @@
+import os
+from dotenv import load_dotenv
+from versioned_cache import VersionedCache
+
+load_dotenv()
+
+# Seconds between checks of the catalog version in the database; writes
+# made through this process are applied immediately (see apply)
+VERSION_CHECK_INTERVAL = float(os.getenv('COMPANY_CATALOG_VERSION_CHECK_INTERVAL', '5'))
+
+COMPANY_COLUMNS = ('company_name', 'address', 'subsidiary', 'contact_number')
+
+
+class CompanyCatalog(VersionedCache):
+    """In-process copy of the companies table, keyed by company_name.
+
+    Loaded on first use. A statement trigger bumps ``company_catalog_version``
+    on every write to ``companies``; the catalog compares that number at
+    most every ``VERSION_CHECK_INTERVAL`` seconds and reloads when another
+    process moved it. Writes made here are applied write-through with the
+    version they produced, so they need no reload.
+    """
+
+    name = 'company catalog'
+
+    def __init__(self):
+        super().__init__('company_catalog_version', VERSION_CHECK_INTERVAL)
+        self._by_name = {}
+        self._sorted = []
+
+    def _load(self, cursor, version):
+        # Soft-deleted companies are hidden while they are purged
+        cursor.execute(f"SELECT {', '.join(COMPANY_COLUMNS)} FROM companies WHERE deleted_at IS NULL")
+        self._install({row[0]: dict(zip(COMPANY_COLUMNS, row)) for row in cursor.fetchall()}, version)
+
+    def _install(self, by_name, version):
+        # Swap in complete indexes so readers never see a half-built one
+        self._sorted = [by_name[name] for name in sorted(by_name)]
+        self._by_name = by_name
+        self._version = version
+
+    def apply(self, version, company_name, company=None):
+        """Write through a committed change: ``company`` replaces the entry,
+        None removes it. ``version`` is the catalog version the write
+        produced; if any other write happened in between, reload instead."""
+        with self._lock:
+            if self._version is None or version != self._version + 1:
+                self._next_check = 0.0
+                return
+            by_name = dict(self._by_name)
+            if company is None:
+                by_name.pop(company_name, None)
+            else:
+                by_name[company_name] = {column: company.get(column) for column in COMPANY_COLUMNS}
+            self._install(by_name, version)
+
+    def all(self):
+        self.maybe_refresh()
+        return self._sorted
+
+    def get(self, company_name):
+        self.maybe_refresh()
+        return self._by_name.get(company_name)
+
+    def exists(self, company_name):
+        return self.get(company_name) is not None
+
+    def stats(self):
+        return {
+            'version': self._version,
+            'companies': len(self._by_name),
+        }
+
+
+company_catalog = CompanyCatalog()
@@ -0,0 +1,281 @@
+import os
+import threading
+from psycopg2 import extras
+from dotenv import load_dotenv
+from db_connection import get_db_connection, close_db_connection
+
+load_dotenv()
+
+# Rows deleted per transaction while purging a company
+PURGE_BATCH_SIZE = int(os.getenv('COMPANY_PURGE_BATCH_SIZE', '1000'))
+# Seconds to pause between batches, leaving room for regular traffic
+PURGE_BATCH_PAUSE = float(os.getenv('COMPANY_PURGE_BATCH_PAUSE', '0.05'))
+# Seconds between checks for pending purges when nothing wakes the purger
+PURGE_POLL_INTERVAL = float(os.getenv('COMPANY_PURGE_POLL_INTERVAL', '60'))
+
+# Attendance rows of the company itself, or of one batch of its employees.
+# With archiving, each batch is copied into company_archive by the same
+# statement that deletes it.
+DELETE_ATTENDANCE_SQL = """
+    WITH batch AS (
+        SELECT id, shift_start_time FROM attendance
+        WHERE {condition}
+        LIMIT %(limit)s
+    ), moved AS (
+        DELETE FROM attendance a
+        USING batch b
+        WHERE a.id = b.id AND a.shift_start_time = b.shift_start_time
+        RETURNING a.*
+    ), archived AS (
+        INSERT INTO company_archive (company_name, source_table, data)
+        SELECT %(company_name)s, 'attendance', to_jsonb(moved) FROM moved
+        WHERE %(archive)s
+    )
+    SELECT count(*) FROM moved
+"""
+
+DELETE_EMPLOYEES_SQL = """
+    WITH moved AS (
+        DELETE FROM employees
+        WHERE emp_no = ANY(%(emp_nos)s)
+        RETURNING *
+    ), archived AS (
+        INSERT INTO company_archive (company_name, source_table, data)
+        SELECT %(company_name)s, 'employees', to_jsonb(moved) FROM moved
+        WHERE %(archive)s
+    )
+    SELECT count(*) FROM moved
+"""
+
+DELETE_COMPANY_SQL = """
+    WITH moved AS (
+        DELETE FROM companies
+        WHERE company_name = %(company_name)s AND deleted_at IS NOT NULL
+        RETURNING *
+    ), archived AS (
+        INSERT INTO company_archive (company_name, source_table, data)
+        SELECT %(company_name)s, 'companies', to_jsonb(moved) FROM moved
+        WHERE %(archive)s
+    )
+    SELECT count(*) FROM moved
+"""
+
+
+def install_company_purge(cursor):
+    """Create the soft delete column, the purge queue and the archive table."""
+    cursor.execute("""
+        ALTER TABLE companies ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMP WITH TIME ZONE;
+
+        -- Each employee batch of a purge is looked up by company
+        CREATE INDEX IF NOT EXISTS idx_employees_company_name ON employees(company_name);
+
+        CREATE TABLE IF NOT EXISTS company_purges (
+            company_name VARCHAR(100) PRIMARY KEY,
+            archive BOOLEAN NOT NULL DEFAULT FALSE,
+            status VARCHAR(20) NOT NULL DEFAULT 'pending',
+            attendance_deleted BIGINT NOT NULL DEFAULT 0,
+            employees_deleted BIGINT NOT NULL DEFAULT 0,
+            error TEXT,
+            requested_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP WITH TIME ZONE
+        );
+
+        CREATE TABLE IF NOT EXISTS company_archive (
+            id BIGSERIAL PRIMARY KEY,
+            company_name VARCHAR(100) NOT NULL,
+            source_table VARCHAR(50) NOT NULL,
+            data JSONB NOT NULL,
+            archived_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_company_archive_company_name ON company_archive(company_name);
+    """)
+
+
+def request_purge(cursor, company_name, archive=False):
+    """Queue ``company_name`` (already soft deleted) for purging."""
+    cursor.execute("""
+        INSERT INTO company_purges (company_name, archive)
+        VALUES (%s, %s)
+        ON CONFLICT (company_name) DO UPDATE
+            SET archive = company_purges.archive OR EXCLUDED.archive,
+                status = 'pending',
+                error = NULL,
+                finished_at = NULL,
+                updated_at = CURRENT_TIMESTAMP
+    """, (company_name, archive))
+
+
+def get_purge(cursor, company_name):
+    cursor.execute("""
+        SELECT company_name, archive, status, attendance_deleted, employees_deleted,
+               error, requested_at, updated_at, finished_at
+        FROM company_purges
+        WHERE company_name = %s
+    """, (company_name,))
+    return cursor.fetchone()
+
+
+class _PurgeStopped(Exception):
+    """Raised between batches once the purger has been asked to stop."""
+
+
+class CompanyPurger:
+    """Background thread that removes soft-deleted companies in small batches.
+
+    Each batch is its own short transaction, so no lock is held for long
+    and progress in company_purges survives a restart: the next run simply
+    carries on, and purges that failed are queued again when the thread
+    starts. A session advisory lock per company keeps two processes from
+    purging the same company; it is released if the process dies.
+    """
+
+    def __init__(self):
+        self._thread = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='company-purger', daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        """Look for pending purges now instead of at the next poll."""
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        requeued = False
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                if not requeued:
+                    self.requeue_failed()
+                    requeued = True
+                self.run_pending()
+            except Exception as e:
+                print(f"Error purging companies: {str(e)}")
+            self._wake.wait(PURGE_POLL_INTERVAL)
+
+    def requeue_failed(self):
+        """Queue purges that failed in an earlier run again."""
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE company_purges
+                    SET status = 'pending', error = NULL, updated_at = CURRENT_TIMESTAMP
+                    WHERE status = 'failed'
+                """)
+                if cur.rowcount:
+                    print(f"Queued {cur.rowcount} failed company purge(s) again")
+            conn.commit()
+        finally:
+            close_db_connection(conn)
+
+    def run_pending(self):
+        conn = get_db_connection()
+        # A connection that failed mid-purge may still hold an advisory
+        # lock, so it is not handed back to the pool
+        discard = True
+        try:
+            with conn.cursor(cursor_factory=extras.DictCursor) as cur:
+                cur.execute("""
+                    SELECT company_name, archive FROM company_purges
+                    WHERE status IN ('pending', 'running')
+                    ORDER BY requested_at
+                """)
+                purges = cur.fetchall()
+                conn.commit()
+                for purge in purges:
+                    if self._stop.is_set():
+                        break
+                    cur.execute("SELECT pg_try_advisory_lock(hashtext('company_purge'), hashtext(%s))",
+                                (purge['company_name'],))
+                    locked = cur.fetchone()[0]
+                    conn.commit()
+                    if not locked:
+                        continue
+                    try:
+                        self._purge(conn, cur, purge['company_name'], purge['archive'])
+                    except _PurgeStopped:
+                        # Shutting down; the next start carries on from here
+                        conn.rollback()
+                        break
+                    except Exception as e:
+                        conn.rollback()
+                        cur.execute("""
+                            UPDATE company_purges
+                            SET status = 'failed', error = %s, updated_at = CURRENT_TIMESTAMP
+                            WHERE company_name = %s
+                        """, (str(e), purge['company_name']))
+                        conn.commit()
+                        print(f"Error purging company {purge['company_name']}: {str(e)}")
+                    finally:
+                        cur.execute("SELECT pg_advisory_unlock(hashtext('company_purge'), hashtext(%s))",
+                                    (purge['company_name'],))
+                        conn.commit()
+            discard = False
+        finally:
+            close_db_connection(conn, discard=discard)
+
+    def _progress(self, conn, cur, company_name, **counts):
+        updates = ''.join(f', {column} = {column} + %({column})s' for column in counts)
+        cur.execute(f"""
+            UPDATE company_purges
+            SET status = 'running', updated_at = CURRENT_TIMESTAMP{updates}
+            WHERE company_name = %(company_name)s
+        """, {'company_name': company_name, **counts})
+        conn.commit()
+        self._stop.wait(PURGE_BATCH_PAUSE)
+        if self._stop.is_set():
+            raise _PurgeStopped()
+
+    def _delete_attendance(self, conn, cur, company_name, archive, condition, **params):
+        while True:
+            cur.execute(DELETE_ATTENDANCE_SQL.format(condition=condition), {
+                'company_name': company_name, 'archive': archive, 'limit': PURGE_BATCH_SIZE, **params
+            })
+            deleted = cur.fetchone()[0]
+            self._progress(conn, cur, company_name, attendance_deleted=deleted)
+            if deleted < PURGE_BATCH_SIZE:
+                return
+
+    def _purge(self, conn, cur, company_name, archive):
+        print(f"Purging company {company_name}")
+        # Attendance recorded against the company
+        self._delete_attendance(conn, cur, company_name, archive,
+                                'company_name = %(company_name)s')
+
+        # Its employees, each batch after their remaining attendance
+        while True:
+            cur.execute("SELECT emp_no FROM employees WHERE company_name = %s LIMIT %s",
+                        (company_name, PURGE_BATCH_SIZE))
+            emp_nos = [row[0] for row in cur.fetchall()]
+            if not emp_nos:
+                conn.commit()
+                break
+            self._delete_attendance(conn, cur, company_name, archive,
+                                    'emp_no = ANY(%(emp_nos)s)', emp_nos=emp_nos)
+            cur.execute(DELETE_EMPLOYEES_SQL, {
+                'company_name': company_name, 'archive': archive, 'emp_nos': emp_nos
+            })
+            self._progress(conn, cur, company_name, employees_deleted=cur.fetchone()[0])
+
+        # Nothing is left to cascade to
+        cur.execute(DELETE_COMPANY_SQL, {'company_name': company_name, 'archive': archive})
+        cur.execute("""
+            UPDATE company_purges
+            SET status = 'done', updated_at = CURRENT_TIMESTAMP, finished_at = CURRENT_TIMESTAMP
+            WHERE company_name = %s
+        """, (company_name,))
+        conn.commit()
+        print(f"Purged company {company_name}")
+
+
+company_purger = CompanyPurger()
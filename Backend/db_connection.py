@@ -1,53 +1,274 @@
 import psycopg2
-from psycopg2 import pool
+from psycopg2 import extensions, pool
 import os
+import threading
+import time
+import weakref
+from collections import deque
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def create_db_pool():
-    try:
-        db_config = {
-            'host': os.getenv('DB_HOST', 'localhost'),
-            'port': os.getenv('DB_PORT', '5433'),
-            'database': os.getenv('DB_NAME', 'Security-Attendance'),
-            'user': os.getenv('DB_USER', 'postgres'),
-            'password': os.getenv('DB_PASSWORD', 'Gevindu')
+# Connection settings
+DB_CONFIG = {
+    'host': os.getenv('DB_HOST', 'localhost'),
+    'port': os.getenv('DB_PORT', '5433'),
+    'database': os.getenv('DB_NAME', 'Security-Attendance'),
+    'user': os.getenv('DB_USER', 'postgres'),
+    'password': os.getenv('DB_PASSWORD', 'Gevindu'),
+    'connect_timeout': 5
+}
+
+# Pool settings
+POOL_MIN_CONNECTIONS = int(os.getenv('DB_POOL_MIN', '1'))
+POOL_MAX_CONNECTIONS = int(os.getenv('DB_POOL_MAX', '20'))
+# Seconds a caller waits for a free connection before giving up
+POOL_CHECKOUT_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '5'))
+# Connections older than this are closed and replaced
+POOL_MAX_LIFETIME = float(os.getenv('DB_POOL_MAX_LIFETIME', '1800'))
+# Idle connections are pinged before reuse after this many seconds
+POOL_PREPING_INTERVAL = float(os.getenv('DB_POOL_PREPING_INTERVAL', '30'))
+
+
+class PoolTimeout(pool.PoolError):
+    """Raised when no connection becomes free within the checkout timeout."""
+
+
+class PooledConnection(extensions.connection):
+    """psycopg2 connection that carries the bookkeeping the pool needs."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        # Names of server-side prepared statements on this session
+        self.prepared_statements = set()
+
+
+class ConnectionPool:
+    """Thread-safe connection pool with lazy validation and recycling.
+
+    Idle connections are handed out most-recently-used first so that a
+    small working set stays warm. A connection is only pinged when it has
+    been idle longer than ``preping_interval``, and is replaced once it
+    outlives ``max_lifetime``.
+    """
+
+    def __init__(self, minconn, maxconn, checkout_timeout, max_lifetime,
+                 preping_interval, **db_config):
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.checkout_timeout = checkout_timeout
+        self.max_lifetime = max_lifetime
+        self.preping_interval = preping_interval
+        self._db_config = db_config
+        self._idle = deque()
+        # Weak so that a connection a handler forgot to return is reclaimed
+        # by the garbage collector instead of holding its slot forever.
+        self._in_use = weakref.WeakSet()
+        self._opening = 0
+        self._closed = False
+        self._cond = threading.Condition(threading.Lock())
+        self._stats = {
+            'connections_opened': 0,
+            'connections_closed': 0,
+            'checkouts': 0,
+            'checkout_waits': 0,
+            'checkout_timeouts': 0,
+            'preping_failures': 0,
+            'recycled': 0,
         }
-        
-        # Create connection pool
-        connection_pool = psycopg2.pool.SimpleConnectionPool(
-            1,  # minconn
-            10, # maxconn
-            **db_config
-        )
-        
-        # Get a connection to set auto-commit for schema changes
-        conn = connection_pool.getconn()
-        conn.autocommit = True
-        connection_pool.putconn(conn)
-        
-        return connection_pool
-    except Exception as e:
-        print(f"Error creating connection pool: {e}")
-        raise
 
-# Create global connection pool
-connection_pool = create_db_pool()
+        for _ in range(minconn):
+            self._idle.append(self._connect())
+
+    def _connect(self):
+        conn = psycopg2.connect(connection_factory=PooledConnection, **self._db_config)
+        conn.autocommit = False
+        with self._cond:
+            self._stats['connections_opened'] += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            if not conn.closed:
+                conn.close()
+        except Exception as e:
+            print(f"Error closing pooled connection: {str(e)}")
+        with self._cond:
+            self._stats['connections_closed'] += 1
+
+    def _size(self):
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def _is_usable(self, conn, now):
+        """Check an idle connection before lending it out."""
+        if conn.closed:
+            return False
+        if now - conn.created_at > self.max_lifetime:
+            with self._cond:
+                self._stats['recycled'] += 1
+            return False
+        if now - conn.last_used > self.preping_interval:
+            try:
+                with conn.cursor() as cur:
+                    cur.execute('SELECT 1')
+                conn.rollback()
+            except Exception:
+                with self._cond:
+                    self._stats['preping_failures'] += 1
+                return False
+        return True
+
+    def getconn(self, timeout=None):
+        """Borrow a connection, waiting at most ``timeout`` seconds for one."""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            conn = None
+            with self._cond:
+                if self._closed:
+                    raise pool.PoolError("connection pool is closed")
+                waited = False
+                while not self._idle and self._size() >= self.maxconn:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['checkout_timeouts'] += 1
+                        raise PoolTimeout(
+                            f"no database connection available within {timeout:g}s"
+                        )
+                    if not waited:
+                        self._stats['checkout_waits'] += 1
+                        waited = True
+                    self._cond.wait(min(remaining, 0.5))
+                if self._idle:
+                    conn = self._idle.pop()
+                    self._in_use.add(conn)
+                else:
+                    # Reserve a slot and open the connection outside the lock
+                    self._opening += 1
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._opening -= 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._opening -= 1
+                    self._in_use.add(conn)
+            elif not self._is_usable(conn, time.monotonic()):
+                with self._cond:
+                    self._in_use.discard(conn)
+                    self._cond.notify()
+                self._discard(conn)
+                continue
+
+            with self._cond:
+                self._stats['checkouts'] += 1
+            return conn
+
+    def putconn(self, conn, discard=False):
+        """Return a borrowed connection, rolling back any open transaction."""
+        if not discard and not conn.closed:
+            try:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                discard = True
+
+        now = time.monotonic()
+        if not discard and (conn.closed or now - conn.created_at > self.max_lifetime):
+            discard = True
+            if not conn.closed:
+                with self._cond:
+                    self._stats['recycled'] += 1
+
+        with self._cond:
+            self._in_use.discard(conn)
+            if not discard and not self._closed:
+                conn.last_used = now
+                self._idle.append(conn)
+                self._cond.notify()
+                return
+            self._cond.notify()
+        self._discard(conn)
+
+    def stats(self):
+        """Return a snapshot of pool counters and current occupancy."""
+        with self._cond:
+            snapshot = dict(self._stats)
+            snapshot.update({
+                'idle': len(self._idle),
+                'in_use': len(self._in_use),
+                'max_connections': self.maxconn,
+            })
+        return snapshot
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for conn in idle:
+            self._discard(conn)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide connection pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                try:
+                    _pool = ConnectionPool(
+                        POOL_MIN_CONNECTIONS,
+                        POOL_MAX_CONNECTIONS,
+                        POOL_CHECKOUT_TIMEOUT,
+                        POOL_MAX_LIFETIME,
+                        POOL_PREPING_INTERVAL,
+                        **DB_CONFIG
+                    )
+                except Exception as e:
+                    print(f"Error creating connection pool: {e}")
+                    raise
+    return _pool
+
 
 def get_db_connection():
+    """Borrow a connection from the shared pool."""
     try:
-        conn = connection_pool.getconn()
-        # For schema changes, enable autocommit
-        conn.autocommit = True
-        return conn
+        return get_pool().getconn()
     except Exception as e:
         print(f"Error getting connection: {e}")
         raise
 
-def close_db_connection(conn):
+
+def close_db_connection(conn, discard=False):
+    """Hand a connection back to the shared pool."""
+    if not conn:
+        return
     try:
-        connection_pool.putconn(conn)
+        get_pool().putconn(conn, discard=discard)
     except Exception as e:
         print(f"Error returning connection: {e}")
-        raise
+
+
+def pool_stats():
+    return get_pool().stats()
+
+
+def close_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
@@ -0,0 +1,159 @@
+from flask import g, jsonify, make_response
+from psycopg2 import extras
+from db_connection import get_db_connection, close_db_connection
+from prepared_statements import execute_prepared
+from company_catalog import company_catalog
+
+
+def with_company(row):
+    """``row`` as a dict with company_display_name filled in from the catalog."""
+    if row is None:
+        return None
+    employee = dict(row)
+    company = company_catalog.get(employee['company_name']) if employee['company_name'] else None
+    employee['company_display_name'] = company['company_name'] if company else None
+    return employee
+
+
+class DataContext:
+    """Unit of work for a single request.
+
+    Lends one pooled connection for the whole request, so every statement a
+    handler runs shares one transaction that is committed or rolled back
+    once when the request finishes. Rows loaded through the context are kept
+    in an identity map, so looking the same employee up twice costs a single
+    query.
+    """
+
+    def __init__(self):
+        self.conn = get_db_connection()
+        self._identity_map = {}
+        self._rollback_only = False
+        self._finished = False
+        self._after_commit = []
+
+    def cursor(self, cursor_factory=extras.DictCursor, **kwargs):
+        return self.conn.cursor(cursor_factory=cursor_factory, **kwargs)
+
+    # Identity map
+
+    def get(self, kind, key, default=None):
+        return self._identity_map.get((kind, key), default)
+
+    def remember(self, kind, key, row):
+        self._identity_map[(kind, key)] = row
+        return row
+
+    def forget(self, kind, key):
+        self._identity_map.pop((kind, key), None)
+
+    def load_employee(self, emp_no):
+        """Return an employee with its company, or None, loading it at most once."""
+        if not emp_no:
+            return None
+        if ('employee', emp_no) in self._identity_map:
+            return self._identity_map[('employee', emp_no)]
+
+        with self.cursor(cursor_factory=extras.RealDictCursor) as cur:
+            execute_prepared(cur, 'employee_details', (emp_no,))
+            row = cur.fetchone()
+        return self.remember('employee', emp_no, with_company(row))
+
+    def load_employees(self, emp_nos):
+        """Return {emp_no: employee with company or None}, querying only the
+        emp_nos not loaded yet, all in one round trip."""
+        missing = [e for e in emp_nos if ('employee', e) not in self._identity_map]
+        if missing:
+            with self.cursor(cursor_factory=extras.RealDictCursor) as cur:
+                execute_prepared(cur, 'employees_details', (missing,))
+                found = {row['emp_no']: with_company(row) for row in cur.fetchall()}
+            for emp_no in missing:
+                self.remember('employee', emp_no, found.get(emp_no))
+        return {e: self._identity_map[('employee', e)] for e in emp_nos}
+
+    # Transaction control
+
+    def after_commit(self, callback):
+        """Run ``callback`` once the request's transaction has committed."""
+        self._after_commit.append(callback)
+
+    def commit(self):
+        """Commit the work done so far, e.g. before answering with an error
+        that must not undo it. Later statements run in a new transaction."""
+        self.conn.commit()
+
+    def set_rollback_only(self):
+        """Make sure the request's work is rolled back even on success."""
+        self._rollback_only = True
+
+    def complete(self, success):
+        """Commit or roll back the request's transaction exactly once."""
+        if self._finished:
+            return
+        self._finished = True
+        if success and not self._rollback_only:
+            self.conn.commit()
+        else:
+            self.conn.rollback()
+            self._after_commit.clear()
+            return
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Error in after-commit callback: {str(e)}")
+
+    def close(self):
+        try:
+            if not self._finished:
+                self.complete(False)
+        except Exception as e:
+            print(f"Error rolling back request transaction: {str(e)}")
+            close_db_connection(self.conn, discard=True)
+        else:
+            close_db_connection(self.conn)
+        finally:
+            self._identity_map.clear()
+
+
+def get_db():
+    """Return the data context for the current request, opening it on first use."""
+    if '_data_context' not in g:
+        g._data_context = DataContext()
+    return g._data_context
+
+
+def release_db():
+    """Commit the request's work so far and hand its connection back to the
+    pool, e.g. before slow work that needs no database. The next get_db()
+    opens a fresh context."""
+    ctx = g.pop('_data_context', None)
+    if ctx is None:
+        return
+    try:
+        ctx.complete(True)
+    finally:
+        ctx.close()
+
+
+def init_app(app):
+    """Commit after a successful response and always release the connection."""
+
+    @app.after_request
+    def _commit_data_context(response):
+        ctx = g.get('_data_context')
+        if ctx is None:
+            return response
+        try:
+            ctx.complete(response.status_code < 400)
+        except Exception as e:
+            print(f"Error committing request transaction: {str(e)}")
+            return make_response(jsonify({'success': False, 'message': f'Error saving changes: {str(e)}'}), 500)
+        return response
+
+    @app.teardown_request
+    def _release_data_context(exc):
+        ctx = g.pop('_data_context', None)
+        if ctx is not None:
+            ctx.close()
@@ -0,0 +1,155 @@
+import base64
+import json
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Changes returned per page of /api/employees/changes
+CHANGES_PAGE_SIZE = int(os.getenv('EMPLOYEE_CHANGES_PAGE_SIZE', '500'))
+
+# Columns a device keeps in its local copy; writes touching only other
+# columns (password, address, ...) are not synced
+SYNC_COLUMNS = ('emp_no', 'id', 'name', 'role', 'security_firm', 'rank', 'company_name')
+
+CHANGES_SQL = f"""
+    SELECT change_version, 'upsert' AS op, {', '.join(SYNC_COLUMNS)}
+    FROM employees
+    WHERE change_txid >= %(horizon)s AND change_version > %(after)s
+    UNION ALL
+    SELECT change_version, 'delete' AS op, emp_no, {', '.join(['NULL'] * (len(SYNC_COLUMNS) - 1))}
+    FROM employee_tombstones
+    WHERE change_txid >= %(horizon)s AND change_version > %(after)s
+    ORDER BY change_version
+    LIMIT %(limit)s
+"""
+
+
+class InvalidChangesCursor(ValueError):
+    pass
+
+
+def install_change_tracking(cursor):
+    """Stamp employees with a change version and keep tombstones of deleted ones.
+
+    Every insert, and every update of SYNC_COLUMNS, takes the next value of
+    employee_change_seq and records the writing transaction's id; deletes
+    leave a tombstone stamped the same way.
+    """
+    changed = ' OR '.join(f'NEW.{c} IS DISTINCT FROM OLD.{c}' for c in SYNC_COLUMNS)
+    cursor.execute(f"""
+        CREATE SEQUENCE IF NOT EXISTS employee_change_seq;
+
+        ALTER TABLE employees
+            ADD COLUMN IF NOT EXISTS change_version BIGINT NOT NULL DEFAULT nextval('employee_change_seq'),
+            ADD COLUMN IF NOT EXISTS change_txid BIGINT NOT NULL DEFAULT txid_current(),
+            ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP;
+
+        CREATE INDEX IF NOT EXISTS idx_employees_change_txid ON employees(change_txid);
+        CREATE INDEX IF NOT EXISTS idx_employees_change_version ON employees(change_version);
+
+        CREATE TABLE IF NOT EXISTS employee_tombstones (
+            emp_no VARCHAR(50) PRIMARY KEY,
+            change_version BIGINT NOT NULL,
+            change_txid BIGINT NOT NULL,
+            deleted_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_employee_tombstones_change_txid ON employee_tombstones(change_txid);
+
+        CREATE OR REPLACE FUNCTION stamp_employee_change()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                DELETE FROM employee_tombstones WHERE emp_no = NEW.emp_no;
+            ELSIF NOT ({changed}) THEN
+                RETURN NEW;
+            END IF;
+            NEW.change_version := nextval('employee_change_seq');
+            NEW.change_txid := txid_current();
+            NEW.updated_at := CURRENT_TIMESTAMP;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE OR REPLACE FUNCTION record_employee_tombstone()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            INSERT INTO employee_tombstones (emp_no, change_version, change_txid)
+            VALUES (OLD.emp_no, nextval('employee_change_seq'), txid_current())
+            ON CONFLICT (emp_no) DO UPDATE
+                SET change_version = EXCLUDED.change_version,
+                    change_txid = EXCLUDED.change_txid,
+                    deleted_at = CURRENT_TIMESTAMP;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS stamp_employee_change ON employees;
+        DROP TRIGGER IF EXISTS record_employee_tombstone ON employees;
+
+        CREATE TRIGGER stamp_employee_change
+            BEFORE INSERT OR UPDATE ON employees
+            FOR EACH ROW
+            EXECUTE FUNCTION stamp_employee_change();
+
+        CREATE TRIGGER record_employee_tombstone
+            AFTER DELETE ON employees
+            FOR EACH ROW
+            EXECUTE FUNCTION record_employee_tombstone();
+    """)
+
+
+def encode_cursor(horizon, after=0, next_horizon=None):
+    state = [horizon] if next_horizon is None else [horizon, after, next_horizon]
+    raw = json.dumps(state, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        state = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        if len(state) == 1:
+            return int(state[0]), 0, None
+        horizon, after, next_horizon = state
+        return int(horizon), int(after), int(next_horizon)
+    except (ValueError, TypeError):
+        raise InvalidChangesCursor('Invalid cursor')
+
+
+def fetch_changes(cursor, since=None, limit=None):
+    """One page of employee changes after the ``since`` cursor.
+
+    Change versions come from a sequence, so a transaction can commit a
+    lower version after a reader has already seen a higher one. The cursor
+    therefore tracks a transaction id horizon instead: the oldest
+    transaction still running when a sync began (snapshot xmin). The next
+    sync returns every row written by a transaction at or after that
+    horizon, which covers anything that was in flight, at the cost of
+    resending a few rows the client already has. Within one sync, pages
+    are walked by change_version. No ``since`` returns everything.
+
+    Returns (changes, next cursor, whether more pages follow).
+    """
+    limit = max(1, min(limit or CHANGES_PAGE_SIZE, CHANGES_PAGE_SIZE))
+    horizon, after, next_horizon = decode_cursor(since) if since else (0, 0, None)
+    if next_horizon is None:
+        cursor.execute("SELECT txid_snapshot_xmin(txid_current_snapshot())")
+        next_horizon = cursor.fetchone()[0]
+
+    cursor.execute(CHANGES_SQL, {'horizon': horizon, 'after': after, 'limit': limit + 1})
+    rows = cursor.fetchall()
+
+    changes = []
+    for row in rows[:limit]:
+        if row['op'] == 'delete':
+            changes.append({'op': 'delete', 'version': row['change_version'], 'emp_no': row['emp_no']})
+        else:
+            changes.append({
+                'op': 'upsert',
+                'version': row['change_version'],
+                'employee': {column: row[column] for column in SYNC_COLUMNS}
+            })
+
+    if len(rows) > limit:
+        return changes, encode_cursor(horizon, changes[-1]['version'], next_horizon), True
+    return changes, encode_cursor(next_horizon), False
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+from dotenv import load_dotenv
+from versioned_cache import VersionedCache
+
+load_dotenv()
+
+# Seconds between checks of the directory version in the database; writes
+# made through this process are picked up immediately (see invalidate)
+VERSION_CHECK_INTERVAL = float(os.getenv('DIRECTORY_VERSION_CHECK_INTERVAL', '2'))
+
+DIRECTORY_COLUMNS = ('emp_no', 'id', 'name', 'role', 'security_firm', 'rank')
+
+
+class RankListing:
+    """A rank's employees plus the response body and ETag built from them."""
+
+    __slots__ = ('employees', 'body', 'etag')
+
+    def __init__(self, rank, employees):
+        self.employees = employees
+        self.body = json.dumps({
+            'message': f'Employees with rank {rank} retrieved successfully',
+            'employees': employees
+        }).encode('utf-8')
+        self.etag = hashlib.blake2b(self.body, digest_size=12).hexdigest()
+
+
+class EmployeeDirectory(VersionedCache):
+    """In-process copy of the employee directory, indexed by emp_no and rank.
+
+    A statement trigger bumps ``employee_directory_version`` on every write
+    to the directory columns of ``employees``. The cache compares that
+    number at most every ``VERSION_CHECK_INTERVAL`` seconds and reloads the
+    whole directory when it moved; between checks lookups are dictionary
+    reads. Rank responses are serialised once per version, so serving
+    one (or a 304 for it) costs no JSON encoding.
+    """
+
+    name = 'employee directory'
+
+    def __init__(self):
+        super().__init__('employee_directory_version', VERSION_CHECK_INTERVAL)
+        self._all = []
+        self._by_emp_no = {}
+        self._by_rank = {}
+
+    def _load(self, cursor, version):
+        cursor.execute(f"""
+            SELECT {', '.join(DIRECTORY_COLUMNS)}
+            FROM employees
+            WHERE company_name IS NULL OR company_name NOT IN (
+                SELECT company_name FROM companies WHERE deleted_at IS NOT NULL
+            )
+            ORDER BY emp_no
+        """)
+        employees = [dict(zip(DIRECTORY_COLUMNS, row)) for row in cursor.fetchall()]
+        ranks = {}
+        for employee in employees:
+            ranks.setdefault(employee['rank'], []).append(employee)
+
+        # Swap in complete indexes so readers never see a half-built one
+        self._all = employees
+        self._by_emp_no = {e['emp_no']: e for e in employees}
+        self._by_rank = {rank: RankListing(rank, members) for rank, members in ranks.items()}
+        self._version = version
+
+    def all(self):
+        self.maybe_refresh()
+        return self._all
+
+    def get(self, emp_no):
+        self.maybe_refresh()
+        return self._by_emp_no.get(emp_no)
+
+    def rank(self, rank):
+        """The RankListing for ``rank``; an empty one if nobody holds it."""
+        self.maybe_refresh()
+        listing = self._by_rank.get(rank)
+        if listing is None:
+            listing = RankListing(rank, [])
+        return listing
+
+    def stats(self):
+        return {
+            'version': self._version,
+            'employees': len(self._all),
+            'ranks': len(self._by_rank),
+        }
+
+
+employee_directory = EmployeeDirectory()
@@ -0,0 +1,215 @@
+import csv
+import os
+import tempfile
+from dotenv import load_dotenv
+from password_hashing import hash_passwords
+
+load_dotenv()
+
+# Largest CSV accepted in one import
+IMPORT_MAX_ROWS = int(os.getenv('EMPLOYEE_IMPORT_MAX_ROWS', '5000'))
+# Rows read, validated and hashed together
+IMPORT_CHUNK_ROWS = int(os.getenv('EMPLOYEE_IMPORT_CHUNK_ROWS', '200'))
+# Staged rows kept in memory before spilling to a temporary file
+IMPORT_SPOOL_BYTES = int(os.getenv('EMPLOYEE_IMPORT_SPOOL_BYTES', str(1024 * 1024)))
+
+# CSV columns (the registration form's fields) and their column widths
+IMPORT_COLUMNS = {
+    'emp_no': 50,
+    'id': 20,
+    'name': 100,
+    'rank': 50,
+    'role': 20,
+    'company_name': 100,
+    'security_firm': 100,
+    'address': 200,
+    'tel': 20,
+    'nic': 20,
+    'password': None,
+}
+REQUIRED_COLUMNS = ('emp_no', 'id', 'name', 'rank', 'company_name', 'security_firm', 'nic', 'password')
+IMPORT_ROLES = ('admin', 'acting_admin', 'user')
+# Columns that are unique in employees and therefore within one import
+UNIQUE_COLUMNS = ('emp_no', 'id', 'nic')
+
+STAGING_COLUMNS = ('line_no', 'emp_no', 'id', 'name', 'rank', 'role', 'company_name',
+                   'security_firm', 'address', 'tel', 'nic', 'password')
+
+# Rows already in employees (or naming an unknown company) are reported
+# with the reason; the rest are inserted. ON CONFLICT catches rows a
+# concurrent writer took between the checks and the insert.
+MERGE_SQL = """
+    WITH classified AS (
+        SELECT s.*,
+               CASE
+                   WHEN EXISTS (SELECT 1 FROM employees e WHERE e.emp_no = s.emp_no) THEN 'emp_no_exists'
+                   WHEN EXISTS (SELECT 1 FROM employees e WHERE e.id = s.id) THEN 'id_exists'
+                   WHEN EXISTS (SELECT 1 FROM employees e WHERE e.nic = s.nic) THEN 'nic_exists'
+                   WHEN NOT EXISTS (SELECT 1 FROM companies c WHERE c.company_name = s.company_name)
+                       THEN 'unknown_company'
+               END AS conflict
+        FROM employee_import_staging s
+    ), inserted AS (
+        INSERT INTO employees (emp_no, id, name, rank, role, company_name,
+                               security_firm, address, tel, nic, password)
+        SELECT emp_no, id, name, rank, role, company_name,
+               security_firm, address, tel, nic, password
+        FROM classified
+        WHERE conflict IS NULL
+        ON CONFLICT DO NOTHING
+        RETURNING emp_no
+    )
+    SELECT c.line_no, c.emp_no, COALESCE(c.conflict, 'concurrent_conflict') AS conflict
+    FROM classified c
+    LEFT JOIN inserted i ON i.emp_no = c.emp_no
+    WHERE i.emp_no IS NULL
+    ORDER BY c.line_no
+"""
+
+
+class InvalidImport(ValueError):
+    """The CSV as a whole cannot be imported (bad header, too many rows)."""
+
+
+def read_chunks(stream):
+    """Validate the CSV in ``stream`` row by row, IMPORT_CHUNK_ROWS at a time.
+
+    Yields the rows to load, each with its line number, and the rows
+    rejected before reaching the database as {line, emp_no, reason}.
+    Only one chunk is held in memory.
+    """
+    reader = csv.DictReader(stream)
+    header = [name.strip().lower() for name in reader.fieldnames or []]
+    missing = [name for name in REQUIRED_COLUMNS if name not in header]
+    if missing:
+        raise InvalidImport(f"CSV is missing columns: {', '.join(missing)}")
+    reader.fieldnames = header
+
+    rows, rejected, received = [], [], 0
+    seen = {column: set() for column in UNIQUE_COLUMNS}
+    for record in reader:
+        if received >= IMPORT_MAX_ROWS:
+            raise InvalidImport(f"At most {IMPORT_MAX_ROWS} employees can be imported at once")
+        received += 1
+        line = reader.line_num
+        row = {column: (record.get(column) or '').strip() for column in IMPORT_COLUMNS}
+        row['role'] = row['role'].lower() or 'user'
+
+        reason = None
+        empty = [column for column in REQUIRED_COLUMNS if not row[column]]
+        if empty:
+            reason = f"missing {', '.join(empty)}"
+        elif row['role'] not in IMPORT_ROLES:
+            reason = f"invalid role {row['role']}"
+        else:
+            too_long = [column for column, width in IMPORT_COLUMNS.items()
+                        if width and len(row[column]) > width]
+            if too_long:
+                reason = f"too long: {', '.join(too_long)}"
+            else:
+                duplicate = next((column for column in UNIQUE_COLUMNS if row[column] in seen[column]), None)
+                if duplicate:
+                    reason = f"duplicate_{duplicate}_in_file"
+
+        if reason:
+            rejected.append({'line': line, 'emp_no': row['emp_no'] or None, 'reason': reason})
+        else:
+            for column in UNIQUE_COLUMNS:
+                seen[column].add(row[column])
+            row['line_no'] = line
+            rows.append(row)
+        if len(rows) + len(rejected) >= IMPORT_CHUNK_ROWS:
+            yield rows, rejected
+            rows, rejected = [], []
+    if rows or rejected:
+        yield rows, rejected
+
+
+class PreparedImport:
+    """Validated rows with hashed passwords, spooled as staging CSV.
+
+    Built by prepare_import without a database connection; load_import
+    COPYs it in. Close it (or use it as a context manager) to drop the
+    spool file.
+    """
+
+    def __init__(self):
+        self.staging = tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES, mode='w+', newline='')
+        self.received = 0
+        self.staged = 0
+        self.rejected = []
+
+    def close(self):
+        self.staging.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def prepare_import(stream):
+    """Read, validate and hash the employee CSV in ``stream`` chunk by chunk.
+
+    Passwords are hashed on the bcrypt workers as bulk jobs, which leave
+    workers free for logins. No connection is needed, so callers should
+    run this before opening their transaction.
+    """
+    prepared = PreparedImport()
+    try:
+        writer = csv.writer(prepared.staging)
+        for rows, rejected in read_chunks(stream):
+            prepared.received += len(rows) + len(rejected)
+            prepared.rejected.extend(rejected)
+            for row, hashed in zip(rows, hash_passwords(row['password'] for row in rows)):
+                row['password'] = hashed
+                # Empty optional fields go in as NULL
+                writer.writerow([row[column] if row[column] != '' else None for column in STAGING_COLUMNS])
+            prepared.staged += len(rows)
+        prepared.staging.seek(0)
+    except BaseException:
+        prepared.close()
+        raise
+    return prepared
+
+
+def load_import(cursor, prepared):
+    """Merge a PreparedImport into employees.
+
+    The rows are COPYed into a temporary staging table and merged with one
+    INSERT ... SELECT. The caller commits. Returns a report with the
+    number of rows received and inserted and a conflict per rejected row.
+    """
+    report = {'received': prepared.received, 'inserted': 0, 'conflicts': prepared.rejected}
+    if not prepared.staged:
+        return report
+
+    cursor.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS employee_import_staging (
+            line_no INTEGER PRIMARY KEY,
+            emp_no VARCHAR(50),
+            id VARCHAR(20),
+            name VARCHAR(100),
+            rank VARCHAR(50),
+            role VARCHAR(20),
+            company_name VARCHAR(100),
+            security_firm VARCHAR(100),
+            address VARCHAR(200),
+            tel VARCHAR(20),
+            nic VARCHAR(20),
+            password VARCHAR(255)
+        ) ON COMMIT DROP
+    """)
+    cursor.execute("TRUNCATE employee_import_staging")
+    cursor.copy_expert(
+        f"COPY employee_import_staging ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+        prepared.staging
+    )
+    cursor.execute(MERGE_SQL)
+    conflicts = [{'line': line, 'emp_no': emp_no, 'reason': reason}
+                 for line, emp_no, reason in cursor.fetchall()]
+
+    report['inserted'] = prepared.staged - len(conflicts)
+    report['conflicts'] = sorted(prepared.rejected + conflicts, key=lambda c: c['line'])
+    return report
@@ -0,0 +1,126 @@
+import base64
+import json
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Results returned per page unless the caller asks for fewer
+SEARCH_DEFAULT_LIMIT = int(os.getenv('EMPLOYEE_SEARCH_DEFAULT_LIMIT', '10'))
+SEARCH_MAX_LIMIT = int(os.getenv('EMPLOYEE_SEARCH_MAX_LIMIT', '50'))
+# Shorter queries are rejected; one character matches too much to rank cheaply
+SEARCH_MIN_QUERY_LENGTH = int(os.getenv('EMPLOYEE_SEARCH_MIN_QUERY_LENGTH', '2'))
+# Queries at least this long also match fuzzily and anywhere in the name;
+# shorter ones only match as prefixes
+SEARCH_FUZZY_MIN_LENGTH = 3
+
+# Trigram indexes serving every predicate of SEARCH_SQL, as (name, expression)
+SEARCH_INDEXES = [
+    ('idx_employees_name_trgm', 'lower(name)'),
+    ('idx_employees_emp_no_trgm', 'lower(emp_no)'),
+    ('idx_employees_nic_trgm', 'lower(nic)'),
+]
+
+# Exact emp_no/NIC hits rank first, then prefix hits, then names with a
+# later word starting with the query; ties are broken by trigram similarity.
+# Every branch of the WHERE clause is answered by one of SEARCH_INDEXES.
+SEARCH_SQL = """
+    SELECT emp_no, name, rank, role, company_name, score
+    FROM (
+        SELECT emp_no, name, rank, role, company_name,
+               (CASE
+                    WHEN lower(emp_no) = %(q)s OR lower(nic) = %(q)s THEN 3
+                    WHEN lower(emp_no) LIKE %(prefix)s OR lower(nic) LIKE %(prefix)s
+                         OR lower(name) LIKE %(prefix)s THEN 2
+                    WHEN lower(name) LIKE %(word_prefix)s THEN 1
+                    ELSE 0
+                END + GREATEST(word_similarity(%(q)s, lower(name)),
+                               similarity(%(q)s, lower(emp_no)),
+                               similarity(%(q)s, lower(nic))))::float8 AS score
+        FROM employees
+        WHERE (lower(name) LIKE %(prefix)s
+           OR lower(emp_no) LIKE %(prefix)s
+           OR lower(nic) LIKE %(prefix)s
+           {fuzzy})
+          AND (company_name IS NULL OR company_name NOT IN (
+              SELECT company_name FROM companies WHERE deleted_at IS NOT NULL
+          ))
+    ) matches
+    WHERE %(after_score)s::float8 IS NULL
+       OR score < %(after_score)s::float8
+       OR (score = %(after_score)s::float8 AND emp_no > %(after_emp_no)s)
+    ORDER BY score DESC, emp_no
+    LIMIT %(limit)s
+"""
+
+FUZZY_SQL = """
+           OR lower(name) LIKE %(contains)s
+           OR %(q)s <%% lower(name)
+           OR lower(emp_no) %% %(q)s
+           OR lower(nic) %% %(q)s
+"""
+
+
+class InvalidSearchCursor(ValueError):
+    pass
+
+
+def install_search_indexes(cursor):
+    """Enable pg_trgm and build the GIN trigram indexes used by search_employees."""
+    cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, expression in SEARCH_INDEXES:
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON employees USING gin ({expression} gin_trgm_ops)"
+        )
+
+
+def escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def encode_cursor(score, emp_no):
+    raw = json.dumps([score, emp_no], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """(score, emp_no) of the last row of the previous page."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        score, emp_no = json.loads(raw)
+        return float(score), str(emp_no)
+    except (ValueError, TypeError):
+        raise InvalidSearchCursor('Invalid cursor')
+
+
+def search_employees(cursor, query, limit=None, after=None):
+    """One page of employees matching ``query`` on name, emp_no or NIC.
+
+    ``after`` is the cursor returned with the previous page. Returns the
+    matching rows and the cursor of the next page (None on the last one).
+    Scores are compared as the exact float8 the database produced, so
+    paging never skips or repeats a row.
+    """
+    query = query.strip().lower()
+    limit = max(1, min(limit or SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT))
+    after_score, after_emp_no = decode_cursor(after) if after else (None, None)
+    escaped = escape_like(query)
+
+    fuzzy = FUZZY_SQL if len(query) >= SEARCH_FUZZY_MIN_LENGTH else ''
+    cursor.execute(SEARCH_SQL.format(fuzzy=fuzzy), {
+        'q': query,
+        'prefix': f'{escaped}%',
+        'word_prefix': f'% {escaped}%',
+        'contains': f'%{escaped}%',
+        'after_score': after_score,
+        'after_emp_no': after_emp_no,
+        # One extra row tells whether another page follows
+        'limit': limit + 1,
+    })
+    rows = cursor.fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]['score'], rows[-1]['emp_no'])
+    return rows, next_cursor
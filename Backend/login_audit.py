@@ -0,0 +1,169 @@
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from psycopg2 import extras
+from dotenv import load_dotenv
+from db_connection import get_db_connection, close_db_connection
+
+load_dotenv()
+
+# Events buffered in memory before logins start waiting on the writer
+LOGIN_AUDIT_QUEUE_SIZE = int(os.getenv('LOGIN_AUDIT_QUEUE_SIZE', '10000'))
+# Events written per INSERT
+LOGIN_AUDIT_BATCH_SIZE = int(os.getenv('LOGIN_AUDIT_BATCH_SIZE', '500'))
+# Seconds an event may wait for more to share its INSERT
+LOGIN_AUDIT_FLUSH_INTERVAL = float(os.getenv('LOGIN_AUDIT_FLUSH_INTERVAL', '0.01'))
+# Seconds a login waits for room in a full queue before its event is dropped
+LOGIN_AUDIT_ENQUEUE_TIMEOUT = float(os.getenv('LOGIN_AUDIT_ENQUEUE_TIMEOUT', '0.05'))
+# Attempts per batch, and seconds to wait before the first retry (doubled after each)
+LOGIN_AUDIT_WRITE_ATTEMPTS = int(os.getenv('LOGIN_AUDIT_WRITE_ATTEMPTS', '3'))
+LOGIN_AUDIT_RETRY_DELAY = float(os.getenv('LOGIN_AUDIT_RETRY_DELAY', '0.5'))
+
+AUDIT_COLUMNS = ('occurred_at', 'emp_no', 'name', 'department', 'role', 'tel', 'company_name',
+                 'security_firm', 'rank', 'ip_address', 'device_info', 'status')
+
+
+def install_login_events(cursor):
+    """Create login_events, the append-only history written by LoginAuditWriter."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS login_events (
+            id BIGSERIAL PRIMARY KEY,
+            occurred_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            emp_no VARCHAR(50),
+            name VARCHAR(100),
+            department VARCHAR(100),
+            role VARCHAR(20),
+            tel VARCHAR(20),
+            company_name VARCHAR(100),
+            security_firm VARCHAR(100),
+            rank VARCHAR(50),
+            ip_address VARCHAR(45),
+            device_info TEXT,
+            status VARCHAR(20) NOT NULL,
+            inserted_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS idx_login_events_occurred_at ON login_events(occurred_at);
+        CREATE INDEX IF NOT EXISTS idx_login_events_emp_no_occurred_at ON login_events(emp_no, occurred_at);
+    """)
+
+
+class LoginAuditWriter:
+    """Writes login events to login_events off the request path.
+
+    ``record`` only queues the event. A writer thread collects up to
+    LOGIN_AUDIT_BATCH_SIZE events, or whatever arrived within
+    LOGIN_AUDIT_FLUSH_INTERVAL of the first, and writes them with one
+    multi-row INSERT. When the queue is full a login waits at most
+    LOGIN_AUDIT_ENQUEUE_TIMEOUT for room, then the event is dropped and
+    counted. ``stop`` writes out everything still queued.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=LOGIN_AUDIT_QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self._counters = {'written': 0, 'dropped': 0, 'failed': 0, 'batches': 0}
+
+    def record(self, status, user=None, emp_no=None, ip_address=None, device_info=None):
+        """Queue one login attempt; ``user`` is the users row, if one was found."""
+        user = user or {}
+        event = (
+            datetime.now(timezone.utc),
+            user.get('emp_no', emp_no),
+            user.get('name'),
+            user.get('department'),
+            user.get('role'),
+            user.get('tel'),
+            user.get('company_name'),
+            user.get('security_firm'),
+            user.get('rank'),
+            ip_address,
+            device_info,
+            status,
+        )
+        self._ensure_started()
+        try:
+            self._queue.put(event, timeout=LOGIN_AUDIT_ENQUEUE_TIMEOUT)
+        except queue.Full:
+            self._count('dropped')
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if (self._thread is None or not self._thread.is_alive()) and not self._stop.is_set():
+                self._thread = threading.Thread(target=self._run, name='login-audit', daemon=True)
+                self._thread.start()
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def _next_batch(self):
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + LOGIN_AUDIT_FLUSH_INTERVAL
+        while len(batch) < LOGIN_AUDIT_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        delay = LOGIN_AUDIT_RETRY_DELAY
+        for attempt in range(LOGIN_AUDIT_WRITE_ATTEMPTS):
+            if attempt:
+                # Back off so a database outage is not hammered; stop cuts it short
+                self._stop.wait(delay)
+                delay *= 2
+            conn = None
+            try:
+                conn = get_db_connection()
+                with conn.cursor() as cur:
+                    extras.execute_values(
+                        cur,
+                        f"INSERT INTO login_events ({', '.join(AUDIT_COLUMNS)}) VALUES %s",
+                        batch,
+                        page_size=LOGIN_AUDIT_BATCH_SIZE
+                    )
+                conn.commit()
+                close_db_connection(conn)
+                self._count('written', len(batch))
+                self._count('batches')
+                return
+            except Exception as e:
+                close_db_connection(conn, discard=True)
+                print(f"Error writing login audit events: {str(e)}")
+        self._count('failed', len(batch))
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            # Nothing may end the thread early: queued events would pile up
+            try:
+                batch = self._next_batch()
+                if batch:
+                    self._write(batch)
+            except Exception as e:
+                print(f"Error in login audit writer: {str(e)}")
+                self._stop.wait(LOGIN_AUDIT_RETRY_DELAY)
+
+    def stop(self, timeout=5):
+        """Flush the queued events and stop the writer thread."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, queued=self._queue.qsize())
+
+
+login_audit = LoginAuditWriter()
@@ -0,0 +1,146 @@
+"""Maintenance commands for the attendance backend.
+
+Usage:
+    python manage.py init-db
+    python manage.py backfill-work-date [--batch-size N]
+    python manage.py rebuild-summaries [--from YYYY-MM-DD] [--to YYYY-MM-DD]
+    python manage.py partition-attendance [--batch-size N]
+    python manage.py create-partitions [--months-ahead N]
+    python manage.py payroll --month YYYY-MM [--company NAME ...] [--workers N]
+    python manage.py import-employees FILE.csv
+"""
+import argparse
+import sys
+from datetime import date, datetime
+from dotenv import load_dotenv
+import models
+import attendance_partitions
+from db_connection import close_pool, get_db_connection, close_db_connection
+
+load_dotenv()
+
+
+def init_db(args):
+    models.initialize_database()
+
+
+def backfill_work_date(args):
+    models.backfill_attendance_work_date(batch_size=args.batch_size)
+
+
+def rebuild_summaries(args):
+    models.rebuild_attendance_summaries(start=args.start, end=args.end)
+
+
+def partition_attendance(args):
+    models.partition_attendance_table(batch_size=args.batch_size)
+
+
+def create_partitions(args):
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            if not attendance_partitions.is_partitioned(cursor):
+                raise RuntimeError("attendance is not partitioned; run partition-attendance first")
+            created = attendance_partitions.ensure_partitions(cursor, months_ahead=args.months_ahead)
+        conn.commit()
+        print(f"Attendance partitions present: {', '.join(created)}")
+    finally:
+        close_db_connection(conn)
+
+
+def payroll(args):
+    import payroll as payroll_engine
+    results = payroll_engine.run_payroll(args.month, company_names=args.company or None,
+                                         workers=args.workers)
+    print(f"Payroll for {args.month:%Y-%m}: {sum(results.values())} employees "
+          f"across {len(results)} companies")
+
+
+def import_employees(args):
+    from employee_import import load_import, prepare_import
+    import password_hashing
+    try:
+        with open(args.file, encoding='utf-8-sig', newline='') as stream:
+            prepared = prepare_import(stream)
+    finally:
+        password_hashing.shutdown_pool()
+
+    with prepared:
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                report = load_import(cursor, prepared)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            close_db_connection(conn)
+
+    print(f"Imported {report['inserted']} of {report['received']} employees")
+    for conflict in report['conflicts']:
+        print(f"  line {conflict['line']} ({conflict['emp_no']}): {conflict['reason']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Attendance backend maintenance commands')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('init-db', help='Create or update the database schema').set_defaults(func=init_db)
+
+    backfill = commands.add_parser(
+        'backfill-work-date',
+        help='Fill attendance.work_date for existing rows in batches and build its index'
+    )
+    backfill.add_argument('--batch-size', type=int, default=5000)
+    backfill.set_defaults(func=backfill_work_date)
+
+    rebuild = commands.add_parser(
+        'rebuild-summaries',
+        help='Recompute the daily per-company attendance summaries'
+    )
+    rebuild.add_argument('--from', dest='start', type=date.fromisoformat)
+    rebuild.add_argument('--to', dest='end', type=date.fromisoformat)
+    rebuild.set_defaults(func=rebuild_summaries)
+
+    partition = commands.add_parser(
+        'partition-attendance',
+        help='Move the attendance table to monthly partitions while the app keeps running'
+    )
+    partition.add_argument('--batch-size', type=int, default=5000)
+    partition.set_defaults(func=partition_attendance)
+
+    partitions = commands.add_parser(
+        'create-partitions',
+        help='Create monthly attendance partitions up to N months ahead'
+    )
+    partitions.add_argument('--months-ahead', type=int, default=attendance_partitions.PARTITION_MONTHS_AHEAD)
+    partitions.set_defaults(func=create_partitions)
+
+    pay = commands.add_parser('payroll', help='Compute monthly payroll totals per employee')
+    pay.add_argument('--month', required=True, type=lambda v: datetime.strptime(v, '%Y-%m').date())
+    pay.add_argument('--company', action='append', help='Limit to this company (repeatable)')
+    pay.add_argument('--workers', type=int)
+    pay.set_defaults(func=payroll)
+
+    load = commands.add_parser(
+        'import-employees',
+        help='Add employees from a CSV with the registration form columns'
+    )
+    load.add_argument('file')
+    load.set_defaults(func=import_employees)
+
+    args = parser.parse_args(argv)
+    try:
+        args.func(args)
+    except Exception as e:
+        print(f"Error running {args.command}: {e}")
+        return 1
+    finally:
+        close_pool()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,158 +1,44 @@
-import psycopg2
-from psycopg2 import pool, extras
+from psycopg2 import extras, sql
 from dotenv import load_dotenv
 import os
-import bcrypt
-import jwt
-import time
+from datetime import datetime, time
+from zoneinfo import ZoneInfo
+from db_connection import get_db_connection, close_db_connection
+from employee_directory import employee_directory
+from company_catalog import company_catalog
+from employee_search import install_search_indexes
+from employee_changes import install_change_tracking
+from company_purge import install_company_purge
+from login_audit import install_login_events
+from attendance_summary import lock_summaries
+from attendance_partitions import (
+    ATTENDANCE_INDEXES, WORK_DATE_INDEX, create_attendance_table, create_work_date_index,
+    ensure_partitions, install_partition_function, is_partitioned
+)
 
 load_dotenv()
 
-# Connection settings
-DB_CONFIG = {
-    'host': os.getenv("DB_HOST", "localhost"),
-    'port': os.getenv("DB_PORT", "5433"),
-    'database': os.getenv("DB_NAME", "Security-Attendance"),
-    'user': os.getenv("DB_USER", "postgres"),
-    'password': os.getenv("DB_PASSWORD", "Gevindu"),
-    'connect_timeout': 5
-}
-
-# Simple connection pool with a fixed size
-MAX_CONNECTIONS = 20
-connection_pool = None
-
-def get_db_connection():
-    """Get a database connection with retry logic."""
-    max_retries = 3
-    retry_delay = 1
-    last_error = None
-    
-    for attempt in range(max_retries):
-        conn = None
-        try:
-            # Create a new connection
-            conn = psycopg2.connect(
-                host=os.getenv("DB_HOST", "localhost"),
-                port=os.getenv("DB_PORT", "5433"),
-                database=os.getenv("DB_NAME", "Security-Attendance"),
-                user=os.getenv("DB_USER", "postgres"),
-                password=os.getenv("DB_PASSWORD", "Gevindu"),
-                connect_timeout=5
-            )
-            conn.autocommit = False
-            
-            # Test the connection
-            with conn.cursor() as cur:
-                cur.execute('SELECT 1')
-                
-            print(f"Successfully connected to database (attempt {attempt + 1})")
-            return conn
-            
-        except Exception as e:
-            last_error = e
-            print(f"Database connection attempt {attempt + 1} failed: {str(e)}")
-            
-            # Clean up any broken connections
-            if conn is not None:
-                try:
-                    if not conn.closed:
-                        conn.close()
-                except Exception as close_error:
-                    print(f"Error closing connection: {str(close_error)}")
-            
-            if attempt == max_retries - 1:  # Last attempt
-                print("Max retries reached, giving up")
-                raise Exception(f"Failed to connect to database after {max_retries} attempts. Last error: {str(last_error)}")
-                
-            # Wait before retrying
-            time.sleep(retry_delay)
-            retry_delay *= 2  # Exponential backoff
-            
-    # This should never be reached due to the raise in the last attempt
-    raise Exception("Unexpected error in get_db_connection")
+# Time zone that decides which calendar day a shift belongs to
+ATTENDANCE_TIMEZONE = os.getenv('ATTENDANCE_TIMEZONE', 'Asia/Colombo')
 
-def close_db_connection(conn):
-    """Safely close the database connection."""
-    if not conn:
-        return
+def attendance_today():
+    """Today's date in the attendance time zone."""
+    return datetime.now(ZoneInfo(ATTENDANCE_TIMEZONE)).date()
 
-    try:
-        # Check if the connection is already closed
-        if conn.closed:
-            print("Connection already closed")
-            return
-            
-        # Try to rollback any pending transactions
-        try:
-            conn.rollback()
-        except Exception as rollback_error:
-            print(f"Error during rollback: {str(rollback_error)}")
-            
-        # Close the connection
-        conn.close()
-        print("Database connection closed successfully")
-        
-    except Exception as e:
-        print(f"Error closing database connection: {str(e)}")
-        
-        # If we get here, try a more forceful close
-        try:
-            if not conn.closed:
-                conn.close()
-        except Exception as force_close_error:
-            print(f"Error during forced connection close: {str(force_close_error)}")
+def attendance_day_bounds(start, end):
+    """shift_start_time bounds for work dates start <= work_date < end.
 
-def hash_password(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-
-def verify_password(stored_password, provided_password):
-    return bcrypt.checkpw(provided_password.encode('utf-8'), stored_password.encode('utf-8'))
+    Filtering on these as well as on work_date lets Postgres prune the
+    monthly attendance partitions.
+    """
+    tz = ZoneInfo(ATTENDANCE_TIMEZONE)
+    return datetime.combine(start, time.min, tz), datetime.combine(end, time.min, tz)
 
 def get_all_employees():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute("""
-            SELECT emp_no, id, name, role, security_firm, rank
-            FROM employees
-            ORDER BY emp_no
-        """)
-        employees = cursor.fetchall()
-        return [{
-            'emp_no': emp[0],
-            'id': emp[1],
-            'name': emp[2],
-            'role': emp[3],
-            'security_firm': emp[4],
-            'rank': emp[5]
-        } for emp in employees]
-    finally:
-        cursor.close()
-        close_db_connection(conn)
+    return [dict(e) for e in employee_directory.all()]
 
 def get_employees_by_rank(rank):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute("""
-            SELECT emp_no, id, name, role, security_firm, rank
-            FROM employees
-            WHERE rank = %s
-            ORDER BY emp_no
-        """, (rank,))
-        employees = cursor.fetchall()
-        return [{
-            'emp_no': emp[0],
-            'id': emp[1],
-            'name': emp[2],
-            'role': emp[3],
-            'security_firm': emp[4],
-            'rank': emp[5]
-        } for emp in employees]
-    finally:
-        cursor.close()
-        close_db_connection(conn)
+    return [dict(e) for e in employee_directory.rank(rank).employees]
 
 def get_employee_by_id(employee_id):
     conn = get_db_connection()
@@ -313,28 +199,582 @@ def mark_leave(emp_no, leave_type):
         close_db_connection(conn)
 
 def get_all_companies():
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    return [dict(company) for company in company_catalog.all()]
+
+def install_open_sessions(cursor):
+    """Create attendance_open_sessions, holding each employee's one open session.
+
+    Its primary key on emp_no is what check-in claims (INSERT ... ON
+    CONFLICT DO NOTHING) and check-out releases; a unique index on
+    attendance itself cannot express this once the table is partitioned.
+    A trigger keeps it in step with every other write to attendance and
+    refuses a second open session. Building it fails while an employee
+    already has several open sessions, so those are reported first for
+    an admin to close.
+    """
+    cursor.execute("""
+        SELECT emp_no, COUNT(*)
+        FROM attendance
+        WHERE shift_end_time IS NULL AND emp_no IS NOT NULL
+        GROUP BY emp_no
+        HAVING COUNT(*) > 1
+    """)
+    duplicates = cursor.fetchall()
+    if duplicates:
+        listed = ', '.join(f"{row[0]} ({row[1]})" for row in duplicates)
+        raise RuntimeError(
+            f"Employees with more than one open attendance session: {listed}. "
+            "Set shift_end_time on the stale rows and run init-db again."
+        )
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS attendance_open_sessions (
+            emp_no VARCHAR(50) PRIMARY KEY,
+            attendance_id INTEGER NOT NULL,
+            shift_start_time TIMESTAMP WITH TIME ZONE NOT NULL
+        );
+
+        CREATE OR REPLACE FUNCTION sync_attendance_open_session()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.shift_end_time IS NULL THEN
+                DELETE FROM attendance_open_sessions
+                WHERE emp_no = OLD.emp_no AND attendance_id = OLD.id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.shift_end_time IS NULL AND NEW.emp_no IS NOT NULL THEN
+                INSERT INTO attendance_open_sessions AS o (emp_no, attendance_id, shift_start_time)
+                VALUES (NEW.emp_no, NEW.id, NEW.shift_start_time)
+                ON CONFLICT (emp_no) DO UPDATE SET shift_start_time = EXCLUDED.shift_start_time
+                WHERE o.attendance_id = EXCLUDED.attendance_id;
+                IF NOT FOUND THEN
+                    RAISE EXCEPTION 'Employee % already has an open attendance session', NEW.emp_no
+                        USING ERRCODE = 'unique_violation';
+                END IF;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS sync_attendance_open_session ON attendance;
+
+        CREATE TRIGGER sync_attendance_open_session
+            AFTER INSERT OR UPDATE OF emp_no, shift_start_time, shift_end_time OR DELETE ON attendance
+            FOR EACH ROW
+            EXECUTE FUNCTION sync_attendance_open_session();
+
+        -- Superseded by attendance_open_sessions
+        DROP INDEX IF EXISTS uq_attendance_open_session;
+
+        -- Committed check-ins/check-outs are pushed to roster streams (roster_events.py)
+        CREATE OR REPLACE FUNCTION notify_attendance_roster()
+        RETURNS TRIGGER AS $$
+        DECLARE
+            session attendance_open_sessions;
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                session := NEW;
+            ELSE
+                session := OLD;
+            END IF;
+            PERFORM pg_notify('attendance_roster', json_build_object(
+                'emp_no', session.emp_no,
+                'company_name', (SELECT company_name FROM employees WHERE emp_no = session.emp_no),
+                'status', CASE WHEN TG_OP = 'INSERT' THEN 'IN' ELSE 'OUT' END,
+                'shift_start_time', session.shift_start_time,
+                'changed_at', CURRENT_TIMESTAMP
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS notify_attendance_roster ON attendance_open_sessions;
+
+        CREATE TRIGGER notify_attendance_roster
+            AFTER INSERT OR DELETE ON attendance_open_sessions
+            FOR EACH ROW
+            EXECUTE FUNCTION notify_attendance_roster();
+    """)
+    resync_open_sessions(cursor)
+
+def resync_open_sessions(cursor):
+    """Rebuild attendance_open_sessions from the open rows in attendance."""
+    cursor.execute("""
+        DELETE FROM attendance_open_sessions;
+        INSERT INTO attendance_open_sessions (emp_no, attendance_id, shift_start_time)
+        SELECT emp_no, id, shift_start_time
+        FROM attendance
+        WHERE shift_end_time IS NULL AND emp_no IS NOT NULL AND shift_start_time IS NOT NULL;
+    """)
+
+def install_attendance_triggers(cursor):
+    """(Re)create the row triggers on attendance.
+
+    The calculation trigger only fires when the shift times change, so
+    maintenance updates such as the work_date backfill leave updated_at
+    alone.
+    """
+    cursor.execute("""
+        DROP TRIGGER IF EXISTS update_attendance_calculations ON attendance;
+
+        CREATE TRIGGER update_attendance_calculations
+            BEFORE INSERT OR UPDATE OF shift_start_time, shift_end_time ON attendance
+            FOR EACH ROW
+            EXECUTE FUNCTION update_attendance_calculations();
+    """)
+
+    # Keep attendance.work_date in step with shift_start_time
+    cursor.execute(sql.SQL("""
+        CREATE OR REPLACE FUNCTION set_attendance_work_date()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            NEW.work_date := (COALESCE(NEW.shift_start_time, NEW.created_at, CURRENT_TIMESTAMP)
+                              AT TIME ZONE {tz})::date;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS set_attendance_work_date ON attendance;
+
+        CREATE TRIGGER set_attendance_work_date
+            BEFORE INSERT OR UPDATE OF shift_start_time ON attendance
+            FOR EACH ROW
+            EXECUTE FUNCTION set_attendance_work_date();
+    """).format(tz=sql.Literal(ATTENDANCE_TIMEZONE)))
+
+def backfill_attendance_work_date(batch_size=5000):
+    """Fill work_date for rows written before the column existed.
+
+    Works through the table in primary-key order, committing every batch
+    so locks stay short and the job can be interrupted and re-run. The
+    composite index is built concurrently at the end.
+    """
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("ALTER TABLE attendance ADD COLUMN IF NOT EXISTS work_date DATE")
+        install_attendance_triggers(cursor)
+        conn.commit()
+
+        last_id = 0
+        total = 0
+        while True:
+            cursor.execute("""
+                WITH batch AS (
+                    SELECT id FROM attendance
+                    WHERE id > %s
+                    ORDER BY id
+                    LIMIT %s
+                ), updated AS (
+                    UPDATE attendance a
+                    SET work_date = (COALESCE(a.shift_start_time, a.created_at) AT TIME ZONE %s)::date
+                    FROM batch
+                    WHERE a.id = batch.id AND a.work_date IS NULL
+                    RETURNING a.id
+                )
+                SELECT (SELECT MAX(id) FROM batch), (SELECT COUNT(*) FROM updated)
+            """, (last_id, batch_size, ATTENDANCE_TIMEZONE))
+            max_id, updated = cursor.fetchone()
+            conn.commit()
+            if max_id is None:
+                break
+            last_id = max_id
+            total += updated
+            print(f"Backfilled work_date up to attendance id {last_id} ({total} rows updated)")
+
+        create_work_date_index(conn)
+        print(f"work_date backfill completed: {total} rows updated")
+        return total
+
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            if conn.autocommit:
+                conn.autocommit = False
+            close_db_connection(conn)
+
+ATTENDANCE_COLUMNS = (
+    'id', 'emp_no', 'employee_id', 'name', 'company_name', 'shift_start_time',
+    'shift_end_time', 'work_date', 'status', 'marked_by', 'total_work_hours',
+    'shift_count', 'created_at', 'updated_at'
+)
+
+def _copy_attendance_rows(cursor, where, params):
+    """Copy rows of the current attendance table into attendance_partitioned.
+
+    Rows without a shift start are routed by when they were created.
+    """
+    columns = sql.SQL(', ').join(map(sql.Identifier, ATTENDANCE_COLUMNS))
+    cursor.execute(sql.SQL("""
+        INSERT INTO attendance_partitioned ({columns})
+        SELECT id, emp_no, employee_id, name, company_name,
+               COALESCE(shift_start_time, created_at, CURRENT_TIMESTAMP),
+               shift_end_time,
+               COALESCE(work_date, (COALESCE(shift_start_time, created_at, CURRENT_TIMESTAMP)
+                                    AT TIME ZONE {tz})::date),
+               status, marked_by, total_work_hours, shift_count, created_at, updated_at
+        FROM attendance
+        WHERE {where}
+    """).format(columns=columns, tz=sql.Literal(ATTENDANCE_TIMEZONE), where=sql.SQL(where)), params)
+    return cursor.rowcount
+
+def _apply_logged_changes(cursor, batch_size):
+    """Re-copy rows changed since the migration started; returns how many were handled."""
+    cursor.execute("""
+        DELETE FROM attendance_migration_changes
+        WHERE id IN (SELECT id FROM attendance_migration_changes ORDER BY id LIMIT %s)
+        RETURNING id
+    """, (batch_size,))
+    ids = [row[0] for row in cursor.fetchall()]
+    if ids:
+        cursor.execute("DELETE FROM attendance_partitioned WHERE id = ANY(%s)", (ids,))
+        _copy_attendance_rows(cursor, "id = ANY(%s)", (ids,))
+    return len(ids)
+
+def partition_attendance_table(batch_size=5000):
+    """Move an existing single-heap attendance table to monthly partitions online.
+
+    1. Create attendance_partitioned and log the id of every row written
+       to attendance from now on.
+    2. Copy the existing rows across in primary-key batches, committing
+       each, while the application keeps writing to attendance.
+    3. Replay the logged changes until few are left.
+    4. Briefly block writes, replay the rest and swap the tables. The old
+       table is kept as attendance_legacy for the operator to drop.
+
+    The summary and open session tables already describe these rows, so
+    the copy runs without triggers and they are only installed at the swap.
+    """
+    conn = None
+    cursor = None
     try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        if is_partitioned(cursor):
+            print("attendance is already partitioned")
+            return 0
+
+        install_partition_function(cursor, ATTENDANCE_TIMEZONE)
+        create_attendance_table(cursor, 'attendance_partitioned')
+        cursor.execute("SELECT MIN(COALESCE(shift_start_time, created_at)), MAX(id) FROM attendance")
+        oldest, max_id = cursor.fetchone()
+        ensure_partitions(cursor, parent='attendance_partitioned', start=oldest)
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS attendance_migration_changes (id INTEGER PRIMARY KEY);
+
+            CREATE OR REPLACE FUNCTION log_attendance_migration_change()
+            RETURNS TRIGGER AS $$
+            BEGIN
+                IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                    INSERT INTO attendance_migration_changes VALUES (OLD.id) ON CONFLICT DO NOTHING;
+                END IF;
+                IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                    INSERT INTO attendance_migration_changes VALUES (NEW.id) ON CONFLICT DO NOTHING;
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+
+            DROP TRIGGER IF EXISTS log_attendance_migration_change ON attendance;
+
+            CREATE TRIGGER log_attendance_migration_change
+                AFTER INSERT OR UPDATE OR DELETE ON attendance
+                FOR EACH ROW
+                EXECUTE FUNCTION log_attendance_migration_change();
+        """)
+        conn.commit()
+
+        # Rows changed after this point are in the log and copied again later
+        cursor.execute("TRUNCATE attendance_partitioned")
+        conn.commit()
+        last_id = 0
+        copied = 0
+        while max_id is not None and last_id < max_id:
+            upper = min(last_id + batch_size, max_id)
+            copied += _copy_attendance_rows(cursor, "id > %s AND id <= %s", (last_id, upper))
+            conn.commit()
+            last_id = upper
+            print(f"Copied attendance up to id {last_id} ({copied} rows)")
+
+        while _apply_logged_changes(cursor, batch_size) >= batch_size:
+            conn.commit()
+        conn.commit()
+
+        # Swap: writes wait on this lock for the few statements below
+        cursor.execute("LOCK TABLE attendance IN EXCLUSIVE MODE")
+        while _apply_logged_changes(cursor, batch_size):
+            pass
+        cursor.execute("""
+            DROP TRIGGER log_attendance_migration_change ON attendance;
+            DROP TRIGGER IF EXISTS update_attendance_calculations ON attendance;
+            DROP TRIGGER IF EXISTS set_attendance_work_date ON attendance;
+            DROP TRIGGER IF EXISTS maintain_attendance_summary ON attendance;
+            DROP TRIGGER IF EXISTS sync_attendance_open_session ON attendance;
+            DROP TABLE attendance_migration_changes;
+            DROP FUNCTION log_attendance_migration_change();
+
+            ALTER TABLE attendance RENAME TO attendance_legacy;
+            ALTER TABLE attendance_partitioned RENAME TO attendance;
+            ALTER TABLE attendance_partitioned_default RENAME TO attendance_default;
+        """)
+        # The new table gets the work_date index after the swap, concurrently
+        for suffix, _ in ATTENDANCE_INDEXES + [WORK_DATE_INDEX]:
+            cursor.execute(sql.SQL("""
+                ALTER INDEX IF EXISTS {old} RENAME TO {legacy};
+                ALTER INDEX IF EXISTS {new} RENAME TO {old};
+            """).format(
+                old=sql.Identifier(f'idx_attendance_{suffix}'),
+                legacy=sql.Identifier(f'idx_attendance_legacy_{suffix}'),
+                new=sql.Identifier(f'idx_attendance_partitioned_{suffix}')
+            ))
         cursor.execute("""
-            SELECT company_name, address, subsidiary, contact_number
-            FROM companies
-            ORDER BY company_name
+            SELECT setval(pg_get_serial_sequence('attendance', 'id'),
+                          GREATEST((SELECT MAX(id) FROM attendance),
+                                   (SELECT last_value FROM attendance_id_seq), 1))
         """)
-        companies = cursor.fetchall()
-        return [{
-            'company_name': company[0],
-            'address': company[1],
-            'subsidiary': company[2],
-            'contact_number': company[3]
-        } for company in companies]
+        install_attendance_triggers(cursor)
+        install_attendance_summary(cursor)
+        install_open_sessions(cursor)
+        conn.commit()
+        create_work_date_index(conn)
+        print("attendance is now partitioned by month; the old table is kept as attendance_legacy")
+        return copied
+
+    except Exception:
+        if conn:
+            conn.rollback()
+        raise
+
     finally:
-        cursor.close()
-        close_db_connection(conn)
+        if cursor:
+            cursor.close()
+        if conn:
+            close_db_connection(conn)
+
+def install_attendance_summary(cursor):
+    """Create the daily per-company summary tables and the trigger keeping them current.
+
+    Every insert, update or delete on attendance appends the row's change
+    in contribution (its old values out, its new values in) to
+    attendance_daily_summary_deltas. Appending takes no lock on a shared
+    row, so check-ins of one company do not queue behind each other; the
+    deltas are folded into attendance_daily_summary in the background
+    (attendance_summary.py). Dashboards read attendance_daily_totals, the
+    summary plus the deltas not folded yet. Headcount counts distinct
+    employees through attendance_daily_employees.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS attendance_daily_summary (
+            company_name VARCHAR(100) NOT NULL,
+            work_date DATE NOT NULL,
+            headcount INTEGER NOT NULL DEFAULT 0,
+            sessions INTEGER NOT NULL DEFAULT 0,
+            open_sessions INTEGER NOT NULL DEFAULT 0,
+            total_work_hours INTERVAL NOT NULL DEFAULT INTERVAL '0',
+            shift_count INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (company_name, work_date)
+        );
+        CREATE INDEX IF NOT EXISTS idx_attendance_daily_summary_work_date
+            ON attendance_daily_summary(work_date);
+
+        CREATE TABLE IF NOT EXISTS attendance_daily_summary_deltas (
+            id BIGSERIAL PRIMARY KEY,
+            company_name VARCHAR(100) NOT NULL,
+            work_date DATE NOT NULL,
+            headcount INTEGER NOT NULL,
+            sessions INTEGER NOT NULL,
+            open_sessions INTEGER NOT NULL,
+            total_work_hours INTERVAL NOT NULL,
+            shift_count INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_attendance_daily_summary_deltas_work_date
+            ON attendance_daily_summary_deltas(work_date);
+
+        CREATE OR REPLACE VIEW attendance_daily_totals AS
+        SELECT company_name, work_date,
+               SUM(headcount)::integer AS headcount,
+               SUM(sessions)::integer AS sessions,
+               SUM(open_sessions)::integer AS open_sessions,
+               SUM(total_work_hours) AS total_work_hours,
+               SUM(shift_count)::integer AS shift_count
+        FROM (
+            SELECT company_name, work_date, headcount, sessions, open_sessions,
+                   total_work_hours, shift_count
+            FROM attendance_daily_summary
+            UNION ALL
+            SELECT company_name, work_date, headcount, sessions, open_sessions,
+                   total_work_hours, shift_count
+            FROM attendance_daily_summary_deltas
+        ) parts
+        GROUP BY company_name, work_date;
+
+        CREATE TABLE IF NOT EXISTS attendance_daily_employees (
+            company_name VARCHAR(100) NOT NULL,
+            work_date DATE NOT NULL,
+            emp_no VARCHAR(50) NOT NULL,
+            sessions INTEGER NOT NULL,
+            PRIMARY KEY (company_name, work_date, emp_no)
+        );
+    """)
+
+    cursor.execute("""
+        CREATE OR REPLACE FUNCTION apply_attendance_summary(
+            p_company VARCHAR, p_date DATE, p_emp_no VARCHAR, p_sign INTEGER,
+            p_hours INTERVAL, p_shifts INTEGER, p_open BOOLEAN
+        ) RETURNS VOID AS $$
+        DECLARE
+            remaining INTEGER;
+            headcount_delta INTEGER := 0;
+        BEGIN
+            IF p_company IS NULL OR p_date IS NULL THEN
+                RETURN;
+            END IF;
+
+            IF p_emp_no IS NOT NULL THEN
+                IF p_sign > 0 THEN
+                    INSERT INTO attendance_daily_employees AS d (company_name, work_date, emp_no, sessions)
+                    VALUES (p_company, p_date, p_emp_no, 1)
+                    ON CONFLICT (company_name, work_date, emp_no)
+                    DO UPDATE SET sessions = d.sessions + 1
+                    RETURNING sessions INTO remaining;
+                    IF remaining = 1 THEN
+                        headcount_delta := 1;
+                    END IF;
+                ELSE
+                    UPDATE attendance_daily_employees
+                    SET sessions = sessions - 1
+                    WHERE company_name = p_company AND work_date = p_date AND emp_no = p_emp_no
+                    RETURNING sessions INTO remaining;
+                    IF remaining = 0 THEN
+                        DELETE FROM attendance_daily_employees
+                        WHERE company_name = p_company AND work_date = p_date AND emp_no = p_emp_no;
+                        headcount_delta := -1;
+                    END IF;
+                END IF;
+            END IF;
+
+            INSERT INTO attendance_daily_summary_deltas (
+                company_name, work_date, headcount, sessions, open_sessions,
+                total_work_hours, shift_count
+            ) VALUES (
+                p_company, p_date, headcount_delta, p_sign,
+                CASE WHEN p_open THEN p_sign ELSE 0 END,
+                p_sign * COALESCE(p_hours, INTERVAL '0'),
+                p_sign * COALESCE(p_shifts, 0)
+            );
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    cursor.execute("""
+        CREATE OR REPLACE FUNCTION maintain_attendance_summary()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' AND
+               (OLD.company_name, OLD.work_date, OLD.emp_no, OLD.shift_end_time,
+                OLD.total_work_hours, OLD.shift_count)
+               IS NOT DISTINCT FROM
+               (NEW.company_name, NEW.work_date, NEW.emp_no, NEW.shift_end_time,
+                NEW.total_work_hours, NEW.shift_count) THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM apply_attendance_summary(
+                    OLD.company_name, OLD.work_date, OLD.emp_no, -1,
+                    OLD.total_work_hours, OLD.shift_count, OLD.shift_end_time IS NULL);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM apply_attendance_summary(
+                    NEW.company_name, NEW.work_date, NEW.emp_no, 1,
+                    NEW.total_work_hours, NEW.shift_count, NEW.shift_end_time IS NULL);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS maintain_attendance_summary ON attendance;
+
+        CREATE TRIGGER maintain_attendance_summary
+            AFTER INSERT OR UPDATE OR DELETE ON attendance
+            FOR EACH ROW
+            EXECUTE FUNCTION maintain_attendance_summary();
+    """)
+
+def rebuild_attendance_summaries(start=None, end=None):
+    """Recompute the daily summaries from attendance, optionally for a date range.
+
+    Writes to attendance are blocked for the duration so the trigger and
+    the rebuild cannot both count the same row.
+    """
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        install_attendance_summary(cursor)
+        cursor.execute("LOCK TABLE attendance IN SHARE MODE")
+        # Keep the background fold out while the range is replaced
+        lock_summaries(cursor)
+
+        date_range = """
+            (%(start)s::date IS NULL OR work_date >= %(start)s::date)
+            AND (%(end)s::date IS NULL OR work_date <= %(end)s::date)
+        """
+        params = {'start': start, 'end': end}
+        cursor.execute(f"DELETE FROM attendance_daily_employees WHERE {date_range}", params)
+        cursor.execute(f"DELETE FROM attendance_daily_summary WHERE {date_range}", params)
+        cursor.execute(f"DELETE FROM attendance_daily_summary_deltas WHERE {date_range}", params)
+        cursor.execute(f"""
+            INSERT INTO attendance_daily_employees (company_name, work_date, emp_no, sessions)
+            SELECT company_name, work_date, emp_no, COUNT(*)
+            FROM attendance
+            WHERE company_name IS NOT NULL AND work_date IS NOT NULL AND emp_no IS NOT NULL
+              AND {date_range}
+            GROUP BY company_name, work_date, emp_no
+        """, params)
+        cursor.execute(f"""
+            INSERT INTO attendance_daily_summary (
+                company_name, work_date, headcount, sessions, open_sessions,
+                total_work_hours, shift_count
+            )
+            SELECT company_name, work_date,
+                   COUNT(DISTINCT emp_no),
+                   COUNT(*),
+                   COUNT(*) FILTER (WHERE shift_end_time IS NULL),
+                   COALESCE(SUM(total_work_hours), INTERVAL '0'),
+                   COALESCE(SUM(shift_count), 0)
+            FROM attendance
+            WHERE company_name IS NOT NULL AND work_date IS NOT NULL
+              AND {date_range}
+            GROUP BY company_name, work_date
+        """, params)
+        rebuilt = cursor.rowcount
+        conn.commit()
+        print(f"Rebuilt {rebuilt} daily attendance summaries")
+        return rebuilt
+
+    except Exception:
+        if conn:
+            conn.rollback()
+        raise
+
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            close_db_connection(conn)
 
 def initialize_database():
+    conn = None
+    cursor = None
     try:
-        # Get connection - auto-commit is enabled in connection pool
         conn = get_db_connection()
         cursor = conn.cursor()
 
@@ -365,42 +805,165 @@ def initialize_database():
                 created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
             );
         """)
+        # Trigram indexes behind /api/employees/search
+        install_search_indexes(cursor)
+        # Change versions and tombstones behind /api/employees/changes
+        install_change_tracking(cursor)
 
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS attendance (
-                id SERIAL PRIMARY KEY,
-                emp_no VARCHAR(50) REFERENCES employees(emp_no) ON DELETE CASCADE,
-                employee_id VARCHAR(20) REFERENCES employees(id) ON DELETE CASCADE,
-                name VARCHAR(100),
-                company_name VARCHAR(100) REFERENCES companies(company_name) ON DELETE CASCADE,
-                shift_start_time TIMESTAMP WITH TIME ZONE,
-                shift_end_time TIMESTAMP WITH TIME ZONE,
-                status VARCHAR(20) DEFAULT 'Active',
-                marked_by VARCHAR(50),
-                total_work_hours INTERVAL,
-                shift_count INTEGER,
-                created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-                CONSTRAINT valid_shift_times CHECK (
-                    shift_end_time IS NULL OR shift_end_time > shift_start_time OR 
-                    (shift_end_time < shift_start_time AND 
-                     (shift_end_time + INTERVAL '24 hours') > shift_start_time)
-                )
-            );
-        """)
+        # New installs get the monthly partitioned table; an existing
+        # single-heap table is moved over by partition_attendance_table
+        install_partition_function(cursor, ATTENDANCE_TIMEZONE)
+        cursor.execute("SELECT to_regclass('attendance')")
+        if cursor.fetchone()[0] is None:
+            create_attendance_table(cursor)
+            # Free on an empty table; existing tables get it concurrently
+            # from 'python manage.py backfill-work-date'
+            cursor.execute(sql.SQL("CREATE INDEX {index} ON attendance ({columns})").format(
+                index=sql.Identifier(f'idx_attendance_{WORK_DATE_INDEX[0]}'),
+                columns=sql.SQL(WORK_DATE_INDEX[1])
+            ))
+        if is_partitioned(cursor):
+            ensure_partitions(cursor)
+        else:
+            print("attendance is not partitioned; run 'python manage.py partition-attendance'")
+
+        # Tables created before work_date existed; see backfill_attendance_work_date
+        cursor.execute("ALTER TABLE attendance ADD COLUMN IF NOT EXISTS work_date DATE")
 
         # Create indexes
         cursor.execute("""
             -- Create indexes if they don't exist
             CREATE INDEX IF NOT EXISTS idx_attendance_emp_no ON attendance(emp_no);
             CREATE INDEX IF NOT EXISTS idx_attendance_employee_id ON attendance(employee_id);
+            CREATE INDEX IF NOT EXISTS idx_attendance_company_name_shift_start
+                ON attendance(company_name, shift_start_time);
+        """)
+        install_open_sessions(cursor)
+
+        # Revoked token ids, mirrored in memory by token_revocation.py
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS revoked_tokens (
+                jti VARCHAR(64) PRIMARY KEY,
+                emp_no VARCHAR(50),
+                expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+                revoked_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+            );
+            CREATE INDEX IF NOT EXISTS idx_revoked_tokens_revoked_at ON revoked_tokens(revoked_at);
+        """)
+
+        # Rotating refresh tokens, stored as SHA-256 digests
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS refresh_tokens (
+                token_hash CHAR(64) PRIMARY KEY,
+                emp_no VARCHAR(50) REFERENCES employees(emp_no) ON DELETE CASCADE,
+                family_id UUID NOT NULL,
+                expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+                used_at TIMESTAMP WITH TIME ZONE,
+                revoked_at TIMESTAMP WITH TIME ZONE,
+                created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+            );
+            CREATE INDEX IF NOT EXISTS idx_refresh_tokens_family_id ON refresh_tokens(family_id);
+        """)
+
+        # Bumped on every write to the directory columns of employees;
+        # employee_directory.py reloads its in-process copy when it moves
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS employee_directory_version (
+                singleton BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (singleton),
+                version BIGINT NOT NULL DEFAULT 0
+            );
+            INSERT INTO employee_directory_version (singleton, version)
+            VALUES (TRUE, 0)
+            ON CONFLICT (singleton) DO NOTHING;
+
+            CREATE OR REPLACE FUNCTION bump_employee_directory_version()
+            RETURNS TRIGGER AS $$
+            BEGIN
+                UPDATE employee_directory_version SET version = version + 1;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+
+            DROP TRIGGER IF EXISTS bump_employee_directory_version ON employees;
+
+            CREATE TRIGGER bump_employee_directory_version
+                AFTER INSERT OR DELETE OR TRUNCATE
+                   OR UPDATE OF emp_no, id, name, role, security_firm, rank
+                ON employees
+                FOR EACH STATEMENT
+                EXECUTE FUNCTION bump_employee_directory_version();
+        """)
+
+        # Soft-deleted companies and their background purge (company_purge.py)
+        install_company_purge(cursor)
+
+        # Bumped on every write to companies; company_catalog.py reloads
+        # its in-process copy when it moves
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS company_catalog_version (
+                singleton BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (singleton),
+                version BIGINT NOT NULL DEFAULT 0
+            );
+            INSERT INTO company_catalog_version (singleton, version)
+            VALUES (TRUE, 0)
+            ON CONFLICT (singleton) DO NOTHING;
+
+            CREATE OR REPLACE FUNCTION bump_company_catalog_version()
+            RETURNS TRIGGER AS $$
+            BEGIN
+                UPDATE company_catalog_version SET version = version + 1;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+
+            DROP TRIGGER IF EXISTS bump_company_catalog_version ON companies;
+
+            CREATE TRIGGER bump_company_catalog_version
+                AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON companies
+                FOR EACH STATEMENT
+                EXECUTE FUNCTION bump_company_catalog_version();
+        """)
+
+        # Append-only login history written by login_audit.py
+        install_login_events(cursor)
+
+        # Monthly per-employee pay totals written by payroll.py
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS payroll_monthly (
+                period DATE NOT NULL,
+                company_name VARCHAR(100) NOT NULL,
+                emp_no VARCHAR(50) NOT NULL,
+                sessions INTEGER NOT NULL,
+                days_worked INTEGER NOT NULL,
+                total_hours NUMERIC(8, 2) NOT NULL,
+                regular_hours NUMERIC(8, 2) NOT NULL,
+                overtime_hours NUMERIC(8, 2) NOT NULL,
+                night_hours NUMERIC(8, 2) NOT NULL,
+                shift_count INTEGER NOT NULL,
+                computed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (period, company_name, emp_no)
+            );
+        """)
+
+        # Idempotency keys of replayed offline attendance events and their outcome
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS attendance_event_keys (
+                idempotency_key VARCHAR(100) PRIMARY KEY,
+                emp_no VARCHAR(50),
+                event_type VARCHAR(10) NOT NULL,
+                occurred_at TIMESTAMP WITH TIME ZONE NOT NULL,
+                status VARCHAR(20) NOT NULL DEFAULT 'pending',
+                message VARCHAR(200),
+                attendance_id INTEGER,
+                received_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+            );
         """)
 
         # Create functions and trigger
         cursor.execute("""
             CREATE OR REPLACE FUNCTION calculate_shift_count(
-                start_time TIME,
-                end_time TIME
+                start_time TIMESTAMP WITH TIME ZONE,
+                end_time TIMESTAMP WITH TIME ZONE
             ) RETURNS INTEGER AS $$
             DECLARE
                 total_hours INTERVAL;
@@ -433,17 +996,10 @@ def initialize_database():
             $$ LANGUAGE plpgsql;
         """)
 
-        cursor.execute("""
-            -- Drop existing trigger if it exists
-            DROP TRIGGER IF EXISTS update_attendance_calculations ON attendance;
-            
-            -- Create new trigger
-            CREATE TRIGGER update_attendance_calculations
-                BEFORE INSERT OR UPDATE ON attendance
-                FOR EACH ROW
-                EXECUTE FUNCTION update_attendance_calculations();
-        """)
+        install_attendance_triggers(cursor)
+        install_attendance_summary(cursor)
 
+        conn.commit()
         print("Database initialization completed successfully")
 
     except Exception as e:
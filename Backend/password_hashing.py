@@ -0,0 +1,221 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+import bcrypt
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Cost factor for new hashes; older hashes are upgraded on successful login
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))
+# Worker processes dedicated to bcrypt
+BCRYPT_WORKERS = int(os.getenv('BCRYPT_WORKERS', str(max(1, (os.cpu_count() or 2) // 2))))
+# Hash/verify jobs allowed in flight before new ones are turned away
+BCRYPT_MAX_PENDING = int(os.getenv('BCRYPT_MAX_PENDING', str(BCRYPT_WORKERS * 4)))
+# Workers a bulk job (e.g. the CSV import) may occupy at once; logins keep the rest
+BCRYPT_BULK_MAX_PENDING = int(os.getenv('BCRYPT_BULK_MAX_PENDING', str(max(1, BCRYPT_WORKERS // 2))))
+# Seconds to wait for a worker result
+BCRYPT_TIMEOUT = float(os.getenv('BCRYPT_TIMEOUT', '10'))
+
+# Failed login throttling per emp_no
+LOGIN_MAX_FAILURES = int(os.getenv('LOGIN_MAX_FAILURES', '5'))
+LOGIN_FAILURE_WINDOW = float(os.getenv('LOGIN_FAILURE_WINDOW', '300'))
+LOGIN_LOCKOUT_SECONDS = float(os.getenv('LOGIN_LOCKOUT_SECONDS', '300'))
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when too many hash/verify jobs are already queued, or one
+    waited longer than BCRYPT_TIMEOUT for a worker."""
+
+
+class LoginThrottled(Exception):
+    """Raised when an emp_no has failed to log in too often."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Too many failed login attempts, retry in {int(retry_after)}s")
+        self.retry_after = retry_after
+
+
+# Worker-side functions; they must stay at module level to be picklable
+
+def _hashpw(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+
+def _checkpw(password, hashed):
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+_pending = threading.BoundedSemaphore(BCRYPT_MAX_PENDING)
+_bulk_pending = threading.BoundedSemaphore(BCRYPT_BULK_MAX_PENDING)
+
+
+def _get_executor():
+    """Return this process's worker pool, recreating it after a fork or crash."""
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            if 'fork' in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context('fork')
+            else:
+                context = multiprocessing.get_context()
+            _executor = ProcessPoolExecutor(max_workers=BCRYPT_WORKERS, mp_context=context)
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _reset_executor(broken):
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False)
+
+
+def start_pool():
+    """Spawn the workers up front, before the server starts request threads."""
+    _get_executor().submit(_checkpw, '', _hashpw('', 4)).result()
+
+
+def shutdown_pool():
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False)
+
+
+def _release_slot(future):
+    _pending.release()
+
+
+def _run(fn, *args):
+    """Run ``fn`` on the worker pool, failing fast when the queue is full.
+
+    The admission slot is released when the job finishes, not when this
+    call stops waiting: a timed-out job keeps its worker busy until then.
+    """
+    for attempt in range(2):
+        if not _pending.acquire(blocking=False):
+            raise PasswordPoolBusy("password hashing queue is full")
+        executor = _get_executor()
+        try:
+            future = executor.submit(fn, *args)
+        except BaseException:
+            _pending.release()
+            raise
+        future.add_done_callback(_release_slot)
+        try:
+            return future.result(timeout=BCRYPT_TIMEOUT)
+        except FutureTimeout:
+            future.cancel()
+            raise PasswordPoolBusy("password hashing timed out")
+        except BrokenProcessPool:
+            _reset_executor(executor)
+            if attempt:
+                raise
+
+
+def hash_password(password, rounds=None):
+    return _run(_hashpw, password, rounds or BCRYPT_ROUNDS)
+
+
+def verify_password(stored_password, provided_password):
+    return _run(_checkpw, provided_password, stored_password)
+
+
+def _release_bulk_slot(future):
+    _pending.release()
+    _bulk_pending.release()
+
+
+def hash_passwords(passwords, rounds=None):
+    """Hash many passwords, preserving order.
+
+    Every job holds a login admission slot and one of
+    BCRYPT_BULK_MAX_PENDING bulk slots until it finishes, so a bulk job
+    waits for room instead of filling every worker and logins always
+    have workers left. Raises PasswordPoolBusy if no admission slot frees
+    up within BCRYPT_TIMEOUT.
+    """
+    rounds = rounds or BCRYPT_ROUNDS
+    futures = []
+    try:
+        for password in passwords:
+            _bulk_pending.acquire()
+            if not _pending.acquire(timeout=BCRYPT_TIMEOUT):
+                _bulk_pending.release()
+                raise PasswordPoolBusy("password hashing queue is full")
+            try:
+                future = _get_executor().submit(_hashpw, password, rounds)
+            except Exception:
+                _pending.release()
+                _bulk_pending.release()
+                raise
+            future.add_done_callback(_release_bulk_slot)
+            futures.append(future)
+        return [future.result() for future in futures]
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+
+
+def needs_rehash(stored_password):
+    """True if ``stored_password`` was hashed with a different cost than BCRYPT_ROUNDS."""
+    try:
+        return int(stored_password.split('$')[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError, AttributeError):
+        return False
+
+
+class FailedLoginTracker:
+    """Counts failed logins per emp_no and locks out repeat offenders."""
+
+    def __init__(self, max_failures, window, lockout, max_entries=10000):
+        self.max_failures = max_failures
+        self.window = window
+        self.lockout = lockout
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def check(self, emp_no):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(emp_no)
+            if entry and entry['locked_until'] > now:
+                raise LoginThrottled(entry['locked_until'] - now)
+
+    def record_failure(self, emp_no):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(emp_no)
+            if entry is None or now - entry['window_start'] > self.window:
+                entry = {'failures': 0, 'window_start': now, 'locked_until': 0.0}
+                self._entries[emp_no] = entry
+            entry['failures'] += 1
+            if entry['failures'] >= self.max_failures:
+                entry['locked_until'] = now + self.lockout
+                entry['failures'] = 0
+                entry['window_start'] = now
+            if len(self._entries) > self.max_entries:
+                self._prune(now)
+
+    def record_success(self, emp_no):
+        with self._lock:
+            self._entries.pop(emp_no, None)
+
+    def _prune(self, now):
+        for key in [k for k, e in self._entries.items()
+                    if e['locked_until'] <= now and now - e['window_start'] > self.window]:
+            del self._entries[key]
+
+
+failed_logins = FailedLoginTracker(LOGIN_MAX_FAILURES, LOGIN_FAILURE_WINDOW, LOGIN_LOCKOUT_SECONDS)
@@ -0,0 +1,212 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, time
+from zoneinfo import ZoneInfo
+import numpy as np
+import psycopg2
+from psycopg2 import extras
+from dotenv import load_dotenv
+from db_connection import DB_CONFIG, get_db_connection, close_db_connection
+from models import ATTENDANCE_TIMEZONE
+
+load_dotenv()
+
+# Pay rules
+# Hours per employee per work day paid at the regular rate; the rest is overtime
+PAYROLL_REGULAR_HOURS_PER_DAY = float(os.getenv('PAYROLL_REGULAR_HOURS_PER_DAY', '8'))
+# Local clock window counted as night work, as HH:MM; may wrap past midnight
+PAYROLL_NIGHT_START = os.getenv('PAYROLL_NIGHT_START', '22:00')
+PAYROLL_NIGHT_END = os.getenv('PAYROLL_NIGHT_END', '06:00')
+# Length of one shift; a session counts ceil(duration / this) shifts
+PAYROLL_SHIFT_HOURS = float(os.getenv('PAYROLL_SHIFT_HOURS', '12'))
+# Worker processes computing companies in parallel
+PAYROLL_WORKERS = int(os.getenv('PAYROLL_WORKERS', str(os.cpu_count() or 2)))
+
+DAY = 86400.0
+
+
+def _clock_seconds(value):
+    hours, minutes = value.split(':')
+    return int(hours) * 3600 + int(minutes) * 60
+
+
+def month_bounds(period):
+    """First day of ``period``'s month, of the next month, and their local midnights."""
+    start = period.replace(day=1)
+    end = (start.replace(year=start.year + 1, month=1) if start.month == 12
+           else start.replace(month=start.month + 1))
+    tz = ZoneInfo(ATTENDANCE_TIMEZONE)
+    return start, end, datetime.combine(start, time.min, tz), datetime.combine(end, time.min, tz)
+
+
+def night_seconds_before(local_seconds, night_start, night_end):
+    """Night-window seconds between local time 0 and each of ``local_seconds``.
+
+    Differences of this cumulative count give the night overlap of any
+    interval without iterating over the days it spans.
+    """
+    days, clock = np.divmod(local_seconds, DAY)
+    if night_start <= night_end:
+        per_day = night_end - night_start
+        partial = np.clip(clock, night_start, night_end) - night_start
+    else:
+        per_day = (DAY - night_start) + night_end
+        partial = np.minimum(clock, night_end) + np.maximum(clock - night_start, 0.0)
+    return days * per_day + partial
+
+
+def compute_payroll(emp_nos, local_start, local_end, day_index, days_in_month, rules=None):
+    """Monthly per-employee totals for one set of closed sessions.
+
+    All arguments are equal-length arrays, one element per session:
+    ``local_start``/``local_end`` are wall-clock seconds in the attendance
+    time zone and ``day_index`` is the work date's offset in the month.
+    Returns the unique employees and a dict of per-employee arrays
+    (hours as floats).
+    """
+    rules = rules or {}
+    regular_cap = rules.get('regular_hours_per_day', PAYROLL_REGULAR_HOURS_PER_DAY) * 3600.0
+    shift_length = rules.get('shift_hours', PAYROLL_SHIFT_HOURS) * 3600.0
+    night_start = _clock_seconds(rules.get('night_start', PAYROLL_NIGHT_START))
+    night_end = _clock_seconds(rules.get('night_end', PAYROLL_NIGHT_END))
+
+    employees, emp_index = np.unique(np.asarray(emp_nos, dtype=object), return_inverse=True)
+    n_employees = len(employees)
+    duration = np.maximum(local_end - local_start, 0.0)
+
+    shifts = np.ceil(duration / shift_length)
+    night = (night_seconds_before(local_end, night_start, night_end)
+             - night_seconds_before(local_start, night_start, night_end))
+
+    # Regular/overtime split per employee-day, then summed per employee
+    day_key = emp_index * days_in_month + np.clip(day_index, 0, days_in_month - 1)
+    n_keys = n_employees * days_in_month
+    day_seconds = np.bincount(day_key, weights=duration, minlength=n_keys)
+    day_regular = np.minimum(day_seconds, regular_cap)
+    day_owner = np.arange(n_keys) // days_in_month
+    worked = day_seconds > 0
+
+    def per_employee(values, index=emp_index):
+        return np.bincount(index, weights=values, minlength=n_employees)
+
+    total = per_employee(duration)
+    regular = per_employee(day_regular, day_owner)
+    return employees, {
+        'sessions': np.bincount(emp_index, minlength=n_employees),
+        'days_worked': np.bincount(day_owner[worked], minlength=n_employees),
+        'total_hours': total / 3600.0,
+        'regular_hours': regular / 3600.0,
+        'overtime_hours': (total - regular) / 3600.0,
+        'night_hours': per_employee(night) / 3600.0,
+        'shift_count': per_employee(shifts).astype(np.int64),
+    }
+
+
+def _load_sessions(cursor, company_name, period):
+    start, end, start_time, end_time = month_bounds(period)
+    cursor.execute("""
+        SELECT emp_no,
+               EXTRACT(EPOCH FROM shift_start_time AT TIME ZONE %s)::float8,
+               EXTRACT(EPOCH FROM shift_end_time AT TIME ZONE %s)::float8,
+               COALESCE(work_date, (shift_start_time AT TIME ZONE %s)::date) - %s
+        FROM attendance
+        WHERE company_name = %s
+          AND shift_start_time >= %s AND shift_start_time < %s
+          AND shift_end_time IS NOT NULL
+          AND emp_no IS NOT NULL
+    """, (ATTENDANCE_TIMEZONE, ATTENDANCE_TIMEZONE, ATTENDANCE_TIMEZONE, start,
+          company_name, start_time, end_time))
+    rows = cursor.fetchall()
+    if not rows:
+        return None
+    emp_nos, starts, ends, days = zip(*rows)
+    return (
+        emp_nos,
+        np.fromiter(starts, dtype=np.float64, count=len(rows)),
+        np.fromiter(ends, dtype=np.float64, count=len(rows)),
+        np.fromiter(days, dtype=np.int64, count=len(rows)),
+        (end - start).days,
+    )
+
+
+def run_company_payroll(company_name, period, rules=None):
+    """Compute and store one company's payroll for ``period``'s month.
+
+    Runs in a worker process, so it opens its own connection rather than
+    borrowing from the parent's pool.
+    """
+    period = period.replace(day=1)
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        with conn.cursor() as cursor:
+            sessions = _load_sessions(cursor, company_name, period)
+            cursor.execute("DELETE FROM payroll_monthly WHERE period = %s AND company_name = %s",
+                           (period, company_name))
+            if sessions is None:
+                conn.commit()
+                return 0
+
+            employees, totals = compute_payroll(*sessions, rules=rules)
+            rows = [
+                (period, company_name, emp_no,
+                 int(totals['sessions'][i]), int(totals['days_worked'][i]),
+                 round(float(totals['total_hours'][i]), 2),
+                 round(float(totals['regular_hours'][i]), 2),
+                 round(float(totals['overtime_hours'][i]), 2),
+                 round(float(totals['night_hours'][i]), 2),
+                 int(totals['shift_count'][i]))
+                for i, emp_no in enumerate(employees)
+            ]
+            extras.execute_values(cursor, """
+                INSERT INTO payroll_monthly (
+                    period, company_name, emp_no, sessions, days_worked, total_hours,
+                    regular_hours, overtime_hours, night_hours, shift_count
+                ) VALUES %s
+            """, rows, page_size=1000)
+        conn.commit()
+        return len(rows)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def run_payroll(period, company_names=None, workers=None, rules=None):
+    """Compute payroll for ``period``'s month, one company per worker process.
+
+    Returns {company_name: employees written}.
+    """
+    start, end, start_time, end_time = month_bounds(period)
+    if company_names is None:
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT DISTINCT company_name FROM attendance
+                    WHERE shift_start_time >= %s AND shift_start_time < %s
+                      AND company_name IS NOT NULL
+                """, (start_time, end_time))
+                company_names = [row[0] for row in cursor.fetchall()]
+            conn.commit()
+        finally:
+            close_db_connection(conn)
+
+    results = {}
+    if not company_names:
+        return results
+
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+    else:
+        context = multiprocessing.get_context()
+    workers = max(1, min(workers or PAYROLL_WORKERS, len(company_names)))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        futures = {executor.submit(run_company_payroll, name, start, rules): name
+                   for name in company_names}
+        for future in as_completed(futures):
+            name = futures[future]
+            results[name] = future.result()
+            print(f"Payroll for {name} ({start:%Y-%m}): {results[name]} employees")
+    return results
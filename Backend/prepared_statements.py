@@ -0,0 +1,147 @@
+import threading
+from psycopg2 import errors, extensions
+
+# Hot lookups that are parsed and planned once per connection.
+# name -> (parameter types, statement using $n placeholders)
+STATEMENTS = {
+    'employee_role': (
+        ('varchar',),
+        "SELECT role FROM employees WHERE emp_no = $1"
+    ),
+    'user_role': (
+        ('varchar',),
+        "SELECT role FROM users WHERE emp_no = $1"
+    ),
+    # Company details come from company_catalog.py, not a join
+    'employee_details': (
+        ('varchar',),
+        """
+        SELECT emp_no, id, name, role, tel, security_firm, rank, company_name
+        FROM employees
+        WHERE emp_no = $1
+        """
+    ),
+    'employees_details': (
+        ('varchar[]',),
+        """
+        SELECT emp_no, id, name, role, tel, security_firm, rank, company_name
+        FROM employees
+        WHERE emp_no = ANY($1)
+        """
+    ),
+    # Check-in claims the employee's row in attendance_open_sessions and
+    # inserts the session in the same statement; check-out releases the
+    # claim and closes the session it points to. A check-out must come
+    # strictly after the check-in, as valid_shift_times requires
+    'check_in': (
+        ('varchar', 'varchar', 'varchar', 'timestamptz'),
+        """
+        WITH claim AS (
+            INSERT INTO attendance_open_sessions (emp_no, attendance_id, shift_start_time)
+            VALUES ($1, nextval(pg_get_serial_sequence('attendance', 'id')), $4)
+            ON CONFLICT (emp_no) DO NOTHING
+            RETURNING attendance_id
+        )
+        INSERT INTO attendance (
+            id, emp_no, employee_id, company_name,
+            shift_start_time, shift_end_time, updated_at
+        )
+        SELECT attendance_id, $1, $2, $3, $4, NULL, $4 FROM claim
+        RETURNING id, shift_start_time
+        """
+    ),
+    'check_out': (
+        ('varchar', 'timestamptz'),
+        """
+        WITH released AS (
+            DELETE FROM attendance_open_sessions
+            WHERE emp_no = $1 AND shift_start_time < $2
+            RETURNING attendance_id, shift_start_time
+        )
+        UPDATE attendance a
+        SET shift_end_time = $2,
+            updated_at = CURRENT_TIMESTAMP,
+            total_work_hours = $2 - a.shift_start_time,
+            shift_count = CEIL(EXTRACT(EPOCH FROM ($2 - a.shift_start_time)) / (12 * 60 * 60))
+        FROM released r
+        WHERE a.id = r.attendance_id AND a.shift_start_time = r.shift_start_time
+        RETURNING a.id, a.shift_start_time, a.shift_end_time, a.total_work_hours
+        """
+    ),
+    'employee_login': (
+        ('varchar',),
+        """
+        SELECT emp_no, name, role, tel,
+               security_firm, rank, password, company_name
+        FROM employees
+        WHERE emp_no = $1
+        """
+    ),
+}
+
+_stats_lock = threading.Lock()
+_stats = {
+    'prepares': 0,
+    'reprepares': 0,
+    'executions': 0,
+    'hits': {name: 0 for name in STATEMENTS},
+}
+
+
+def _count(key, name=None):
+    with _stats_lock:
+        _stats[key] += 1
+        if name is not None:
+            _stats['hits'][name] = _stats['hits'].get(name, 0) + 1
+
+
+def _prepared_on(conn):
+    """Names already prepared on this physical connection."""
+    prepared = getattr(conn, 'prepared_statements', None)
+    if prepared is None:
+        prepared = set()
+        conn.prepared_statements = prepared
+    return prepared
+
+
+def _prepare(cursor, name):
+    types, statement = STATEMENTS[name]
+    cursor.execute(f"PREPARE {name} ({', '.join(types)}) AS {statement}")
+    _prepared_on(cursor.connection).add(name)
+    _count('prepares')
+
+
+def execute_prepared(cursor, name, params=()):
+    """Run a registered statement by name, preparing it on first use.
+
+    A freshly opened (or recycled) connection starts with an empty set, so
+    statements are re-prepared transparently after a reconnect. If the
+    server has lost a statement we thought was prepared, it is prepared
+    again and retried as long as no transaction was in progress.
+    """
+    conn = cursor.connection
+    prepared = _prepared_on(conn)
+    placeholders = ', '.join(['%s'] * len(STATEMENTS[name][0]))
+    was_idle = conn.get_transaction_status() == extensions.TRANSACTION_STATUS_IDLE
+
+    if name not in prepared:
+        _prepare(cursor, name)
+    try:
+        cursor.execute(f"EXECUTE {name} ({placeholders})", params)
+    except errors.InvalidSqlStatementName:
+        prepared.clear()
+        if not was_idle:
+            raise
+        conn.rollback()
+        _prepare(cursor, name)
+        _count('reprepares')
+        cursor.execute(f"EXECUTE {name} ({placeholders})", params)
+    _count('executions', name)
+    return cursor
+
+
+def prepared_statement_stats():
+    with _stats_lock:
+        snapshot = dict(_stats)
+        snapshot['hits'] = dict(_stats['hits'])
+    return snapshot
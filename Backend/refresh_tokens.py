@@ -0,0 +1,87 @@
+import hashlib
+import os
+import secrets
+import uuid
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Lifetime of a refresh token; each use replaces it with a fresh one
+REFRESH_TOKEN_TTL = timedelta(days=float(os.getenv('AUTH_REFRESH_TOKEN_TTL_DAYS', '30')))
+
+
+class InvalidRefreshToken(Exception):
+    """Raised for unknown, expired, revoked or already used refresh tokens."""
+
+
+def _digest(token):
+    # Refresh tokens are 256 random bits, so a fast digest is enough to
+    # keep them useless if the table leaks; no key stretching required.
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def create_refresh_token(cursor, emp_no, family_id=None):
+    """Store a new refresh token for ``emp_no`` and return its plaintext."""
+    token = secrets.token_urlsafe(32)
+    cursor.execute("""
+        INSERT INTO refresh_tokens (token_hash, emp_no, family_id, expires_at)
+        VALUES (%s, %s, %s, %s)
+    """, (
+        _digest(token),
+        emp_no,
+        family_id or str(uuid.uuid4()),
+        datetime.now(timezone.utc) + REFRESH_TOKEN_TTL
+    ))
+    return token
+
+
+def rotate_refresh_token(cursor, token):
+    """Consume ``token`` and return ``(emp_no, replacement_token)``.
+
+    Consuming is a single update on the primary key. Presenting a token
+    that was already used means it has leaked, so its whole family (every
+    token descended from the same login) is revoked before the error is
+    raised; the caller must commit for that revocation to stick.
+    """
+    token_hash = _digest(token)
+    cursor.execute("""
+        UPDATE refresh_tokens
+        SET used_at = CURRENT_TIMESTAMP
+        WHERE token_hash = %s
+          AND used_at IS NULL
+          AND revoked_at IS NULL
+          AND expires_at > CURRENT_TIMESTAMP
+        RETURNING emp_no, family_id
+    """, (token_hash,))
+    row = cursor.fetchone()
+    if row:
+        emp_no, family_id = row[0], row[1]
+        return emp_no, create_refresh_token(cursor, emp_no, family_id)
+
+    cursor.execute("""
+        UPDATE refresh_tokens
+        SET revoked_at = CURRENT_TIMESTAMP
+        WHERE family_id = (
+            SELECT family_id FROM refresh_tokens
+            WHERE token_hash = %s AND used_at IS NOT NULL
+        )
+          AND revoked_at IS NULL
+    """, (token_hash,))
+    if cursor.rowcount:
+        raise InvalidRefreshToken('Refresh token reuse detected; session revoked')
+    raise InvalidRefreshToken('Invalid or expired refresh token')
+
+
+def revoke_refresh_token(cursor, token, emp_no):
+    """Revoke the family ``token`` belongs to, ending that device's session."""
+    cursor.execute("""
+        UPDATE refresh_tokens
+        SET revoked_at = CURRENT_TIMESTAMP
+        WHERE family_id = (
+            SELECT family_id FROM refresh_tokens
+            WHERE token_hash = %s AND emp_no = %s
+        )
+          AND revoked_at IS NULL
+    """, (_digest(token), emp_no))
+    return cursor.rowcount > 0
@@ -0,0 +1,119 @@
+import json
+import os
+import queue
+import select
+import threading
+import psycopg2
+from dotenv import load_dotenv
+from db_connection import DB_CONFIG
+
+load_dotenv()
+
+# Postgres channel the open session trigger notifies on
+ROSTER_CHANNEL = 'attendance_roster'
+# Events buffered per stream before a slow client is told to resync
+ROSTER_QUEUE_SIZE = int(os.getenv('ROSTER_STREAM_QUEUE_SIZE', '256'))
+# Open streams per process; each one pins a server thread
+ROSTER_MAX_SUBSCRIBERS = int(os.getenv('ROSTER_STREAM_MAX_SUBSCRIBERS', '200'))
+# Seconds between reconnect attempts of the listener
+LISTEN_RETRY_INTERVAL = 5
+
+
+class RosterFull(Exception):
+    """Raised when ROSTER_MAX_SUBSCRIBERS streams are already open."""
+
+
+class RosterBroadcaster:
+    """Fans committed check-in/check-out notifications out to SSE streams.
+
+    One thread per process holds a dedicated connection that LISTENs on
+    ``ROSTER_CHANNEL``; Postgres only delivers a NOTIFY once the writing
+    transaction commits. Each stream gets a bounded queue. A stream whose
+    queue overflows, and every stream after the listener reconnects, is
+    sent a ``resync`` event so the client reloads the roster.
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def subscribe(self, company_name):
+        events = queue.Queue(maxsize=ROSTER_QUEUE_SIZE)
+        with self._lock:
+            if len(self._subscribers) >= ROSTER_MAX_SUBSCRIBERS:
+                raise RosterFull(f"{ROSTER_MAX_SUBSCRIBERS} roster streams are already open")
+            self._subscribers[events] = company_name
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name='roster-listener', daemon=True)
+                self._thread.start()
+        return events
+
+    def unsubscribe(self, events):
+        with self._lock:
+            self._subscribers.pop(events, None)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def _publish(self, event, company_name=None):
+        with self._lock:
+            targets = [q for q, company in self._subscribers.items()
+                       if company_name is None or company == company_name]
+        for events in targets:
+            try:
+                events.put_nowait(event)
+            except queue.Full:
+                # Drop what is queued; the client reloads the roster instead
+                try:
+                    while True:
+                        events.get_nowait()
+                except queue.Empty:
+                    pass
+                events.put_nowait({'type': 'resync'})
+
+    def _run(self):
+        first = True
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(**DB_CONFIG)
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {ROSTER_CHANNEL}")
+                if not first:
+                    # Notifications may have been missed while disconnected
+                    self._publish({'type': 'resync'})
+                first = False
+
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], LISTEN_RETRY_INTERVAL) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        try:
+                            payload = json.loads(notify.payload)
+                        except ValueError:
+                            continue
+                        payload['type'] = 'status'
+                        self._publish(payload, payload.get('company_name'))
+            except Exception as e:
+                print(f"Error listening for roster changes: {str(e)}")
+                first = False
+                self._stop.wait(LISTEN_RETRY_INTERVAL)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+    def stop(self):
+        self._stop.set()
+
+
+roster_broadcaster = RosterBroadcaster()
@@ -1,153 +1,107 @@
 from flask import Blueprint, jsonify, request
-from models import get_db_connection, close_db_connection
+from db_context import get_db
+from company_catalog import company_catalog, COMPANY_COLUMNS
+from employee_directory import employee_directory
+from company_purge import company_purger, get_purge, request_purge
 
 company_bp = Blueprint('company', __name__)
 
+# Columns update_company may change
+UPDATABLE_COLUMNS = ('address', 'subsidiary', 'contact_number')
+
+
+def write_through(db_ctx, cursor, company_name, company=None):
+    """Apply a write to the catalog once the request's transaction commits."""
+    cursor.execute("SELECT version FROM company_catalog_version")
+    version = cursor.fetchone()[0]
+    db_ctx.after_commit(lambda: company_catalog.apply(version, company_name, company))
+
+
 @company_bp.route('/company/add', methods=['POST'])
 def add_company():
     try:
         data = request.get_json()
-        
+
         # Validate required fields
         required_fields = ['company_name', 'address', 'subsidiary', 'contact_number']
-        if not all(field in data for field in required_fields):
+        if not data or not all(field in data for field in required_fields):
             return jsonify({'message': 'All fields are required'}), 400
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # Check if company already exists
-        cursor.execute("""
-            SELECT * FROM companies 
-            WHERE company_name = %s
-        """, (data['company_name'],))
-        
-        if cursor.fetchone():
-            cursor.close()
-            close_db_connection(conn)
+        if company_catalog.exists(data['company_name']):
             return jsonify({'message': 'Company already exists'}), 400
 
-        # Insert new company
-        cursor.execute("""
-            INSERT INTO companies (company_name, address, subsidiary, contact_number)
-            VALUES (%s, %s, %s, %s)
-        """, (
-            data['company_name'], 
-            data['address'],
-            data['subsidiary'],
-            data['contact_number']
-        ))
-        
-        conn.commit()
-        cursor.close()
-        close_db_connection(conn)
-        
+        db_ctx = get_db()
+        with db_ctx.cursor() as cursor:
+            cursor.execute(f"""
+                INSERT INTO companies (company_name, address, subsidiary, contact_number)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (company_name) DO NOTHING
+                RETURNING {', '.join(COMPANY_COLUMNS)}
+            """, (
+                data['company_name'],
+                data['address'],
+                data['subsidiary'],
+                data['contact_number']
+            ))
+            company = cursor.fetchone()
+            if not company:
+                # Added by another process since the catalog last looked,
+                # or deleted and not purged yet
+                company_catalog.invalidate()
+                cursor.execute("SELECT deleted_at FROM companies WHERE company_name = %s",
+                               (data['company_name'],))
+                existing = cursor.fetchone()
+                if existing and existing['deleted_at']:
+                    return jsonify({'message': 'Company is being deleted, retry once the purge finishes'}), 409
+                return jsonify({'message': 'Company already exists'}), 400
+            write_through(db_ctx, cursor, company['company_name'], dict(company))
+
         return jsonify({
-            'message': 'Company added successfully', 
+            'message': 'Company added successfully',
             'company_name': data['company_name']
         }), 201
 
     except Exception as e:
-        # Ensure database connections are closed in case of an error
-        if 'conn' in locals():
-            try:
-                cursor.close()
-            except:
-                pass
-            try:
-                close_db_connection(conn)
-            except:
-                pass
-        
         print(f"Error adding company: {e}")
         return jsonify({'message': f'Error occurred: {str(e)}'}), 500
 
 @company_bp.route('/company/all', methods=['GET'])
 def get_all_companies():
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT id, company_name FROM companies
-        """)
-        
-        companies = cursor.fetchall()
-        cursor.close()
-        close_db_connection(conn)
-        
+        # company_name is the primary key; companies have no separate id
         return jsonify([{
-            'id': company['id'],
+            'id': company['company_name'],
             'company_name': company['company_name']
-        } for company in companies]), 200
-        
+        } for company in company_catalog.all()]), 200
+
     except Exception as e:
         return jsonify({'message': f"Error occurred: {str(e)}"}), 500
 
 @company_bp.route('/company/list', methods=['GET'])
 def get_all_companies_list():
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT company_name, address, subsidiary, contact_number 
-            FROM companies 
-            ORDER BY company_name
-        """)
-        companies = cursor.fetchall()
-
-        cursor.close()
-        close_db_connection(conn)
-
-        companies_data = [dict(company) for company in companies]
-
         return jsonify({
             'message': 'Companies retrieved successfully',
-            'companies': companies_data
+            'companies': company_catalog.all()
         }), 200
 
     except Exception as e:
-        # Ensure database connections are closed in case of an error
-        if 'conn' in locals():
-            cursor.close()
-            close_db_connection(conn)
-        
         print(f"Error retrieving companies: {e}")
         return jsonify({'message': f'Error occurred: {str(e)}'}), 500
 
 @company_bp.route('/company/<string:company_name>', methods=['GET'])
 def get_company(company_name):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT company_name, address, subsidiary, contact_number 
-            FROM companies 
-            WHERE company_name = %s
-        """, (company_name,))
-        company = cursor.fetchone()
-        
-        cursor.close()
-        close_db_connection(conn)
-
+        company = company_catalog.get(company_name)
         if not company:
             return jsonify({'message': f'Company {company_name} not found'}), 404
 
-        company_data = dict(company)
-
         return jsonify({
             'message': 'Company retrieved successfully',
-            'company': company_data
+            'company': company
         }), 200
 
     except Exception as e:
-        # Ensure database connections are closed in case of an error
-        if 'conn' in locals():
-            cursor.close()
-            close_db_connection(conn)
-        
         print(f"Error retrieving company: {e}")
         return jsonify({'message': f'Error occurred: {str(e)}'}), 500
 
@@ -155,56 +109,31 @@ def get_company(company_name):
 def update_company(company_name):
     try:
         data = request.get_json()
-        
+
         if not data:
             return jsonify({'message': 'No update fields provided'}), 400
 
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # Check if company exists
-        cursor.execute("SELECT 1 FROM companies WHERE company_name = %s", (company_name,))
-        if not cursor.fetchone():
-            cursor.close()
-            close_db_connection(conn)
+        if not company_catalog.exists(company_name):
             return jsonify({'message': f'Company {company_name} not found'}), 404
 
         # Prepare update fields
-        update_fields = []
-        params = []
-
-        if 'address' in data:
-            update_fields.append("address = %s")
-            params.append(data['address'])
-
-        if 'subsidiary' in data:
-            update_fields.append("subsidiary = %s")
-            params.append(data['subsidiary'])
-
-        if 'contact_number' in data:
-            update_fields.append("contact_number = %s")
-            params.append(data['contact_number'])
-
-        # If no fields to update
-        if not update_fields:
-            cursor.close()
-            close_db_connection(conn)
+        fields = [field for field in UPDATABLE_COLUMNS if field in data]
+        if not fields:
             return jsonify({'message': 'No valid update fields provided'}), 400
 
-        # Add company_name to params
-        params.append(company_name)
-
-        # Construct and execute update query
-        update_query = f"""
-            UPDATE companies 
-            SET {', '.join(update_fields)}
-            WHERE company_name = %s
-        """
-        cursor.execute(update_query, params)
-        conn.commit()
-
-        cursor.close()
-        close_db_connection(conn)
+        db_ctx = get_db()
+        with db_ctx.cursor() as cursor:
+            cursor.execute(f"""
+                UPDATE companies
+                SET {', '.join(f'{field} = %s' for field in fields)}
+                WHERE company_name = %s AND deleted_at IS NULL
+                RETURNING {', '.join(COMPANY_COLUMNS)}
+            """, [data[field] for field in fields] + [company_name])
+            company = cursor.fetchone()
+            if not company:
+                company_catalog.invalidate()
+                return jsonify({'message': f'Company {company_name} not found'}), 404
+            write_through(db_ctx, cursor, company_name, dict(company))
 
         return jsonify({
             'message': 'Company updated successfully',
@@ -212,46 +141,63 @@ def update_company(company_name):
         }), 200
 
     except Exception as e:
-        # Ensure database connections are closed in case of an error
-        if 'conn' in locals():
-            cursor.close()
-            close_db_connection(conn)
-        
         print(f"Error updating company: {e}")
         return jsonify({'message': f'Error occurred: {str(e)}'}), 500
 
 @company_bp.route('/company/<string:company_name>', methods=['DELETE'])
 def delete_company(company_name):
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+    """Hide the company now and queue its rows for the background purger.
 
-        # Check if company exists
-        cursor.execute("SELECT * FROM companies WHERE company_name = %s", (company_name,))
-        company = cursor.fetchone()
+    ``?archive=true`` copies the purged rows into company_archive first.
+    Deleting a company whose purge failed queues it again.
+    """
+    try:
+        archive = request.args.get('archive', '').lower() in ('1', 'true', 'yes')
+
+        db_ctx = get_db()
+        with db_ctx.cursor() as cursor:
+            cursor.execute("""
+                UPDATE companies SET deleted_at = COALESCE(deleted_at, CURRENT_TIMESTAMP)
+                WHERE company_name = %s
+                RETURNING company_name
+            """, (company_name,))
+            if not cursor.fetchone():
+                company_catalog.invalidate()
+                return jsonify({'message': f'Company {company_name} not found'}), 404
+            request_purge(cursor, company_name, archive)
+            write_through(db_ctx, cursor, company_name)
+            # The directory hides employees of deleted companies
+            cursor.execute("UPDATE employee_directory_version SET version = version + 1")
+            db_ctx.after_commit(employee_directory.invalidate)
+            db_ctx.after_commit(company_purger.wake)
 
-        if not company:
-            cursor.close()
-            close_db_connection(conn)
-            return jsonify({'message': f'Company {company_name} not found'}), 404
+        return jsonify({
+            'message': 'Company deleted; its data is being removed in the background',
+            'company_name': company_name,
+            'archive': archive
+        }), 202
 
-        # Delete the company
-        cursor.execute("DELETE FROM companies WHERE company_name = %s", (company_name,))
-        conn.commit()
+    except Exception as e:
+        print(f"Error deleting company: {e}")
+        return jsonify({'message': f'Error occurred: {str(e)}'}), 500
 
-        cursor.close()
-        close_db_connection(conn)
+@company_bp.route('/company/<string:company_name>/purge', methods=['GET'])
+def get_company_purge(company_name):
+    """Progress of a deleted company's background purge."""
+    try:
+        with get_db().cursor() as cursor:
+            purge = get_purge(cursor, company_name)
+        if not purge:
+            return jsonify({'message': f'No deletion of company {company_name} found'}), 404
 
         return jsonify({
-            'message': 'Company deleted successfully',
-            'company_name': company_name
+            'message': 'Purge status retrieved successfully',
+            'purge': {
+                key: value.isoformat() if hasattr(value, 'isoformat') else value
+                for key, value in dict(purge).items()
+            }
         }), 200
 
     except Exception as e:
-        # Ensure database connections are closed in case of an error
-        if 'conn' in locals():
-            cursor.close()
-            close_db_connection(conn)
-        
-        print(f"Error deleting company: {e}")
+        print(f"Error retrieving purge status: {e}")
         return jsonify({'message': f'Error occurred: {str(e)}'}), 500
@@ -0,0 +1,110 @@
+"""Shared test fixtures.
+
+Tests that only need the Python dependencies always run. Tests that take
+the ``cursor`` fixture need PostgreSQL and are marked ``db``: point
+TEST_DB_NAME at a scratch database the DB_* user may create tables in,
+
+    TEST_DB_NAME=ems_test python -m pytest -q
+
+and the schema is created there once per run, with every test's writes
+rolled back afterwards. The configured DB_NAME is never touched. Without
+TEST_DB_NAME the ``db`` tests are skipped and the report header says so;
+set TEST_DB_REQUIRED=1 (e.g. in CI) to make that an error instead.
+"""
+import os
+import sys
+
+import pytest
+
+TEST_DB_NAME = os.getenv('TEST_DB_NAME')
+TEST_DB_REQUIRED = os.getenv('TEST_DB_REQUIRED') == '1'
+if TEST_DB_NAME:
+    os.environ['DB_NAME'] = TEST_DB_NAME
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'db: needs the PostgreSQL database named by TEST_DB_NAME')
+
+
+def pytest_report_header(config):
+    if TEST_DB_NAME:
+        return f"database tests: running against {TEST_DB_NAME}"
+    return "database tests: skipped, set TEST_DB_NAME to run them"
+
+
+def pytest_collection_modifyitems(config, items):
+    for item in items:
+        if 'database' in item.fixturenames:
+            item.add_marker(pytest.mark.db)
+
+
+@pytest.fixture(scope='session')
+def database():
+    """Create the schema in the test database once per run."""
+    if not TEST_DB_NAME:
+        if TEST_DB_REQUIRED:
+            pytest.fail('TEST_DB_REQUIRED is set but TEST_DB_NAME is not')
+        pytest.skip('set TEST_DB_NAME to run database tests')
+    import models
+    models.initialize_database()
+
+
+@pytest.fixture
+def db_conn(database):
+    """A connection whose work is rolled back after the test."""
+    import psycopg2
+    from db_connection import DB_CONFIG, PooledConnection
+    # Guard against a test module shadowing ``database`` and reaching here
+    # without the switch to TEST_DB_NAME
+    assert TEST_DB_NAME and DB_CONFIG['database'] == TEST_DB_NAME, 'refusing to test against DB_NAME'
+    conn = psycopg2.connect(connection_factory=PooledConnection, **DB_CONFIG)
+    try:
+        yield conn
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+@pytest.fixture
+def cursor(db_conn):
+    from psycopg2 import extras
+    with db_conn.cursor(cursor_factory=extras.DictCursor) as cur:
+        yield cur
+
+
+@pytest.fixture
+def make_company(cursor):
+    """Insert a company and return its name."""
+    def make(company_name, **fields):
+        row = {'address': 'Colombo', 'subsidiary': 'Security', 'contact_number': '0110000000'}
+        row.update(fields, company_name=company_name)
+        cursor.execute(
+            f"INSERT INTO companies ({', '.join(row)}) VALUES ({', '.join(['%s'] * len(row))})",
+            list(row.values())
+        )
+        return company_name
+    return make
+
+
+@pytest.fixture
+def make_employee(cursor):
+    """Insert an employee and return its emp_no, id, name and company_name.
+
+    Only emp_no is required; id and nic are derived from it so several
+    employees can be made in one test.
+    """
+    def make(emp_no, **fields):
+        row = {
+            'id': f'ID-{emp_no}', 'nic': f'NIC-{emp_no}', 'rank': 'Guard',
+            'name': f'Guard {emp_no}', 'password': 'x', 'security_firm': 'Aitken Spence Security',
+        }
+        row.update(fields, emp_no=emp_no)
+        cursor.execute(
+            f"INSERT INTO employees ({', '.join(row)}) VALUES ({', '.join(['%s'] * len(row))}) "
+            "RETURNING emp_no, id, name, company_name",
+            list(row.values())
+        )
+        return cursor.fetchone()
+    return make
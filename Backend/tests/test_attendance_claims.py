@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from flask import Flask
+
+import auth
+import db_context
+from auth import issue_token
+from prepared_statements import execute_prepared
+
+START = datetime(2024, 5, 6, 8, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def guard(make_company, make_employee):
+    return make_employee('CLAIM001', company_name=make_company('Claims Co'))
+
+
+def check_in(cursor, employee, at):
+    execute_prepared(cursor, 'check_in', (
+        employee['emp_no'], employee['id'], employee['company_name'], at
+    ))
+    return cursor.fetchone()
+
+
+def check_out(cursor, employee, at):
+    execute_prepared(cursor, 'check_out', (employee['emp_no'], at))
+    return cursor.fetchone()
+
+
+def test_second_check_in_is_refused(cursor, guard):
+    assert check_in(cursor, guard, START) is not None
+    assert check_in(cursor, guard, START + timedelta(minutes=5)) is None
+
+    cursor.execute("SELECT COUNT(*) FROM attendance WHERE emp_no = %s", (guard['emp_no'],))
+    assert cursor.fetchone()[0] == 1
+
+
+def test_check_out_must_come_after_check_in(cursor, guard):
+    check_in(cursor, guard, START)
+
+    assert check_out(cursor, guard, START) is None
+    cursor.execute("SELECT COUNT(*) FROM attendance_open_sessions WHERE emp_no = %s", (guard['emp_no'],))
+    assert cursor.fetchone()[0] == 1
+
+
+def test_check_out_closes_the_session_and_frees_the_claim(cursor, guard):
+    session = check_in(cursor, guard, START)
+
+    closed = check_out(cursor, guard, START + timedelta(hours=8))
+
+    assert closed['id'] == session['id']
+    assert closed['total_work_hours'] == timedelta(hours=8)
+    assert check_out(cursor, guard, START + timedelta(hours=9)) is None
+    assert check_in(cursor, guard, START + timedelta(hours=10)) is not None
+
+
+@pytest.fixture
+def attendance_app(database, monkeypatch):
+    from routes.attendance_routes import attendance_bp
+    monkeypatch.setattr(auth, 'get_role', lambda emp_no, table: 'admin')
+    app = Flask(__name__)
+    db_context.init_app(app)
+    app.register_blueprint(attendance_bp, url_prefix='/api/attendance')
+    return app
+
+
+@pytest.fixture
+def companyless(monkeypatch):
+    """Serve one employee whose company is missing or soft-deleted."""
+    employee = {'emp_no': 'ORPHAN1', 'id': 'ID-ORPHAN1', 'name': 'Orphan',
+                'company_name': 'Gone Co', 'company_display_name': None}
+    monkeypatch.setattr(db_context.DataContext, 'load_employee', lambda self, emp_no: employee)
+    monkeypatch.setattr(db_context.DataContext, 'load_employees',
+                        lambda self, emp_nos: {e: employee for e in emp_nos})
+    return employee
+
+
+def test_check_in_refuses_an_employee_without_a_company(attendance_app, companyless):
+    client = attendance_app.test_client()
+    headers = {'Authorization': f"Bearer {issue_token('ADMIN1')}"}
+
+    single = client.post('/api/attendance/checkin', json={'emp_no': 'ORPHAN1'}, headers=headers)
+    bulk = client.post('/api/attendance/checkin/bulk', json={'emp_nos': ['ORPHAN1']}, headers=headers)
+
+    assert single.status_code == 404
+    assert single.get_json()['message'] == 'Employee has no active company'
+    assert bulk.get_json()['results'] == [
+        {'emp_no': 'ORPHAN1', 'success': False, 'message': 'Employee has no active company'}
+    ]
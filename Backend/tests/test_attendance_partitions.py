@@ -0,0 +1,89 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+import models
+from attendance_partitions import ensure_partitions, is_partitioned
+from prepared_statements import execute_prepared
+
+# A month old enough that no partition exists for it
+STRAY_START = datetime(2001, 3, 10, 8, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def partitioned(cursor):
+    if not is_partitioned(cursor):
+        pytest.skip('attendance is not partitioned in the test database')
+
+
+@pytest.fixture
+def guard(make_company, make_employee):
+    return make_employee('PART001', company_name=make_company('Partition Co'))
+
+
+def partition_of(cursor, attendance_id):
+    cursor.execute("SELECT tableoid::regclass::text FROM attendance WHERE id = %s", (attendance_id,))
+    return cursor.fetchone()[0]
+
+
+def side_effects(cursor, attendance_id):
+    """Everything the attendance row triggers write for a row."""
+    cursor.execute("SELECT updated_at FROM attendance WHERE id = %s", (attendance_id,))
+    updated_at = cursor.fetchone()[0]
+    cursor.execute("SELECT COUNT(*) FROM attendance_daily_summary_deltas")
+    deltas = cursor.fetchone()[0]
+    cursor.execute("SELECT attendance_id, shift_start_time FROM attendance_open_sessions")
+    open_sessions = sorted(tuple(row) for row in cursor.fetchall())
+    return updated_at, deltas, open_sessions
+
+
+def test_months_follow_the_attendance_time_zone(cursor, partitioned, monkeypatch):
+    monkeypatch.setattr(models, 'attendance_today', lambda: date(2031, 12, 31))
+
+    created = ensure_partitions(cursor, months_ahead=1)
+
+    assert created == ['attendance_y2031m12', 'attendance_y2032m01']
+
+
+def test_ensure_partitions_creates_each_month_from_start(cursor, partitioned, monkeypatch):
+    monkeypatch.setattr(models, 'attendance_today', lambda: date(2002, 3, 1))
+
+    created = ensure_partitions(cursor, start=date(2002, 1, 15), months_ahead=0)
+
+    assert created == ['attendance_y2002m01', 'attendance_y2002m02', 'attendance_y2002m03']
+
+
+def test_stray_rows_move_into_the_new_partition_untouched(cursor, partitioned, guard):
+    cursor.execute("SELECT to_regclass('attendance_y2001m03') IS NULL")
+    if not cursor.fetchone()[0]:
+        pytest.skip('attendance_y2001m03 already exists in the test database')
+    execute_prepared(cursor, 'check_in', (guard['emp_no'], guard['id'], guard['company_name'], STRAY_START))
+    attendance_id = cursor.fetchone()['id']
+    assert partition_of(cursor, attendance_id) == 'attendance_default'
+    # Within one transaction CURRENT_TIMESTAMP never moves; set a value a
+    # re-fired trigger would visibly overwrite
+    cursor.execute("UPDATE attendance SET updated_at = %s WHERE id = %s", (STRAY_START, attendance_id))
+    before = side_effects(cursor, attendance_id)
+
+    cursor.execute("SELECT create_attendance_partition('attendance', '2001-03-01')")
+
+    assert cursor.fetchone()[0] == 'attendance_y2001m03'
+    assert partition_of(cursor, attendance_id) == 'attendance_y2001m03'
+    assert side_effects(cursor, attendance_id) == before
+    assert before[0] == STRAY_START
+
+
+def test_triggers_are_back_on_after_a_move(cursor, partitioned, guard):
+    execute_prepared(cursor, 'check_in', (guard['emp_no'], guard['id'], guard['company_name'], STRAY_START))
+    cursor.execute("SELECT create_attendance_partition('attendance', '2001-03-01')")
+
+    execute_prepared(cursor, 'check_out', (guard['emp_no'], STRAY_START + timedelta(hours=8)))
+
+    cursor.execute("SELECT COUNT(*) FROM attendance_open_sessions WHERE emp_no = %s", (guard['emp_no'],))
+    assert cursor.fetchone()[0] == 0
+    cursor.execute("""
+        SELECT COUNT(*) FROM pg_trigger
+        WHERE tgrelid IN ('attendance_default'::regclass, 'attendance_y2001m03'::regclass)
+          AND NOT tgisinternal AND tgenabled = 'D'
+    """)
+    assert cursor.fetchone()[0] == 0
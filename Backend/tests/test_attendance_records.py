@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+
+from auth import issue_token
+from routes.attendance_routes import MAX_SHIFT_BACKDATE_DAYS, attendance_bp
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(attendance_bp, url_prefix='/api/attendance')
+    return app.test_client()
+
+
+def update(client, start, end):
+    return client.put('/api/attendance/records/1', headers={
+        'Authorization': f"Bearer {issue_token('ADMIN1')}"
+    }, json={
+        'shift_start_time': start.isoformat() if isinstance(start, datetime) else start,
+        'shift_end_time': end.isoformat() if isinstance(end, datetime) else end,
+        'status': 'Active',
+    })
+
+
+@pytest.mark.parametrize('start_offset, end_offset, message', [
+    (timedelta(hours=-8), timedelta(hours=-9), 'shift_end_time must be after shift_start_time'),
+    (timedelta(hours=-8), timedelta(hours=-8), 'shift_end_time must be after shift_start_time'),
+    (timedelta(hours=-8), timedelta(days=30), 'shift_end_time is in the future'),
+    (timedelta(days=-MAX_SHIFT_BACKDATE_DAYS - 1), timedelta(days=-MAX_SHIFT_BACKDATE_DAYS),
+     f'shift_start_time is more than {MAX_SHIFT_BACKDATE_DAYS} days old'),
+    (timedelta(days=2), timedelta(days=2, hours=8), 'shift_start_time is in the future'),
+])
+def test_shift_times_outside_the_window_are_rejected(client, start_offset, end_offset, message):
+    now = datetime.now().astimezone()
+
+    response = update(client, now + start_offset, now + end_offset)
+
+    assert response.status_code == 400
+    assert response.get_json()['message'] == message
+
+
+def test_unparseable_end_time_is_rejected(client):
+    response = update(client, datetime.now().astimezone() - timedelta(hours=1), 'yesterday')
+
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'shift_end_time must be an ISO 8601 timestamp'
@@ -0,0 +1,97 @@
+from datetime import date, datetime, timedelta, timezone
+
+import psycopg2
+import pytest
+
+from attendance_summary import fold_summary_deltas, lock_summaries
+from prepared_statements import execute_prepared
+
+START = datetime(2024, 5, 6, 8, 0, tzinfo=timezone.utc)
+WORK_DATE = date(2024, 5, 6)
+
+
+@pytest.fixture
+def company(make_company):
+    return make_company('Summary Co')
+
+
+def check_in(cursor, employee, at):
+    execute_prepared(cursor, 'check_in', (employee['emp_no'], employee['id'], employee['company_name'], at))
+
+
+def check_out(cursor, employee, at):
+    execute_prepared(cursor, 'check_out', (employee['emp_no'], at))
+
+
+def totals(cursor, table='attendance_daily_totals'):
+    cursor.execute(f"""
+        SELECT headcount, sessions, open_sessions, total_work_hours, shift_count
+        FROM {table}
+        WHERE company_name = 'Summary Co' AND work_date = %s
+    """, (WORK_DATE,))
+    row = cursor.fetchone()
+    return tuple(row) if row else None
+
+
+def pending_deltas(cursor):
+    cursor.execute("SELECT COUNT(*) FROM attendance_daily_summary_deltas WHERE company_name = 'Summary Co'")
+    return cursor.fetchone()[0]
+
+
+def test_check_in_appends_a_delta_instead_of_updating_the_summary(cursor, company, make_employee):
+    guard = make_employee('SUM001', company_name=company)
+
+    check_in(cursor, guard, START)
+
+    assert totals(cursor) == (1, 1, 1, timedelta(0), 0)
+    assert totals(cursor, 'attendance_daily_summary') is None
+    assert pending_deltas(cursor) == 1
+
+
+def test_totals_count_each_employee_once_per_day(cursor, company, make_employee):
+    first, second = make_employee('SUM001', company_name=company), make_employee('SUM002', company_name=company)
+
+    check_in(cursor, first, START)
+    check_out(cursor, first, START + timedelta(hours=4))
+    check_in(cursor, first, START + timedelta(hours=5))
+    check_out(cursor, first, START + timedelta(hours=9))
+    check_in(cursor, second, START)
+
+    assert totals(cursor) == (2, 3, 1, timedelta(hours=8), 2)
+
+
+def test_fold_moves_the_deltas_into_the_summary(cursor, company, make_employee):
+    guard = make_employee('SUM001', company_name=company)
+    check_in(cursor, guard, START)
+    check_out(cursor, guard, START + timedelta(hours=8))
+    before = totals(cursor)
+
+    assert fold_summary_deltas(cursor) >= 1
+
+    assert pending_deltas(cursor) == 0
+    assert totals(cursor, 'attendance_daily_summary') == before == (1, 1, 0, timedelta(hours=8), 1)
+    assert totals(cursor) == before
+
+
+def test_fold_adds_onto_an_existing_summary_row(cursor, company, make_employee):
+    first, second = make_employee('SUM001', company_name=company), make_employee('SUM002', company_name=company)
+    check_in(cursor, first, START)
+    fold_summary_deltas(cursor)
+
+    check_in(cursor, second, START)
+    check_out(cursor, first, START + timedelta(hours=8))
+    fold_summary_deltas(cursor)
+
+    assert totals(cursor, 'attendance_daily_summary') == (2, 2, 1, timedelta(hours=8), 1)
+
+
+def test_fold_steps_aside_while_another_one_runs(cursor):
+    from db_connection import DB_CONFIG
+    lock_summaries(cursor)
+    other = psycopg2.connect(**DB_CONFIG)
+    try:
+        with other.cursor() as other_cursor:
+            assert fold_summary_deltas(other_cursor) is None
+    finally:
+        other.rollback()
+        other.close()
@@ -0,0 +1,135 @@
+import time
+from datetime import timedelta
+
+import jwt
+import pytest
+from flask import Flask, g, jsonify
+from psycopg2 import extras
+
+import auth
+from auth import TokenCache, RoleCache, issue_token, role_required, token_required, verify_token
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+
+    @app.route('/whoami')
+    @token_required
+    def whoami():
+        return jsonify({'emp_no': g.current_emp_no})
+
+    return app
+
+
+def test_token_cache_evicts_the_least_recently_used():
+    cache = TokenCache(2)
+    cache.put('a', {'emp_no': 'A'})
+    cache.put('b', {'emp_no': 'B'})
+    cache.get('a', time.time())
+    cache.put('c', {'emp_no': 'C'})
+
+    assert cache.get('b', time.time()) is None
+    assert cache.get('a', time.time()) == {'emp_no': 'A'}
+    assert cache.stats()['size'] == 2
+
+
+def test_token_cache_drops_expired_claims():
+    cache = TokenCache(4)
+    cache.put('a', {'emp_no': 'A', 'exp': 100})
+
+    assert cache.get('a', 99) is not None
+    assert cache.get('a', 100) is None
+    assert cache.stats()['size'] == 0
+
+
+def test_verified_token_is_served_from_the_cache(monkeypatch):
+    token = issue_token('E1')
+    decodes = []
+    real_decode = jwt.decode
+    monkeypatch.setattr(auth.jwt, 'decode', lambda *a, **k: decodes.append(1) or real_decode(*a, **k))
+
+    assert verify_token(token)['emp_no'] == 'E1'
+    assert verify_token(token)['emp_no'] == 'E1'
+    assert len(decodes) == 1
+
+
+def test_expired_and_forged_tokens_are_rejected():
+    expired = issue_token('E1', ttl=timedelta(seconds=-1))
+    forged = jwt.encode({'emp_no': 'E1'}, 'not-the-secret-but-just-as-long-as-one', algorithm='HS256')
+
+    with pytest.raises(jwt.ExpiredSignatureError):
+        verify_token(expired)
+    with pytest.raises(jwt.InvalidSignatureError):
+        verify_token(forged)
+
+
+def test_revoked_token_is_rejected_even_when_cached():
+    token = issue_token('E1')
+    claims = verify_token(token)
+
+    auth.revocation_list.mark_revoked(claims['jti'], claims['exp'])
+
+    with pytest.raises(auth.TokenRevokedError):
+        verify_token(token)
+
+
+def test_token_required_exposes_the_caller(app):
+    client = app.test_client()
+
+    ok = client.get('/whoami', headers={'Authorization': f"Bearer {issue_token('E7')}"})
+    missing = client.get('/whoami')
+    bad = client.get('/whoami', headers={'Authorization': 'Bearer nonsense'})
+
+    assert ok.status_code == 200 and ok.get_json() == {'emp_no': 'E7'}
+    assert missing.status_code == 401
+    assert bad.get_json()['message'] == 'Invalid token'
+
+
+def test_role_cache_expires_and_invalidates():
+    cache = RoleCache(ttl=10)
+    cache.put(('employees', 'E1'), 'admin', now=0)
+    cache.put(('users', 'E1'), 'OIC', now=0)
+    cache.put(('employees', 'E2'), None, now=0)
+
+    assert cache.get(('employees', 'E1'), now=5) == (True, 'admin')
+    assert cache.get(('employees', 'E2'), now=5) == (True, None)
+    assert cache.get(('employees', 'E1'), now=10) == (False, None)
+    cache.invalidate('E1')
+    assert cache.get(('users', 'E1'), now=5) == (False, None)
+    assert cache.get(('employees', 'E2'), now=5) == (True, None)
+
+
+def test_role_required_checks_the_cached_role(app, monkeypatch):
+    roles = {'A1': 'Admin', 'G1': 'Guard'}
+    monkeypatch.setattr(auth, 'get_role', lambda emp_no, table: roles.get(emp_no))
+
+    @app.route('/admin')
+    @token_required
+    @role_required(*auth.ADMIN_ROLES, message='Admins only')
+    def admin_only():
+        return jsonify({'role': g.current_role})
+
+    client = app.test_client()
+    admin = client.get('/admin', headers={'Authorization': f"Bearer {issue_token('A1')}"})
+    guard = client.get('/admin', headers={'Authorization': f"Bearer {issue_token('G1')}"})
+
+    assert admin.get_json() == {'role': 'Admin'}
+    assert guard.status_code == 403 and guard.get_json()['message'] == 'Admins only'
+
+
+def test_get_role_reads_once_then_uses_the_cache(db_conn, cursor, make_employee, monkeypatch, app):
+    make_employee('ROLE001', role='admin')
+
+    class Context:
+        def cursor(self):
+            return db_conn.cursor(cursor_factory=extras.DictCursor)
+
+    monkeypatch.setattr(auth, 'get_db', lambda: Context())
+    auth.invalidate_role()
+    with app.app_context():
+        assert auth.get_role('ROLE001') == 'admin'
+        cursor.execute("UPDATE employees SET role = 'guard' WHERE emp_no = 'ROLE001'")
+        assert auth.get_role('ROLE001') == 'admin'
+        auth.invalidate_role('ROLE001')
+        assert auth.get_role('ROLE001') == 'guard'
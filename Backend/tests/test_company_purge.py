@@ -0,0 +1,216 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import company_purge
+from company_catalog import CompanyCatalog
+from company_purge import CompanyPurger, _PurgeStopped, get_purge, request_purge
+from employee_directory import EmployeeDirectory
+from prepared_statements import execute_prepared
+
+START = datetime(2024, 5, 6, 8, 0, tzinfo=timezone.utc)
+
+
+class SavepointConnection:
+    """The test connection, with the purger's transactions as savepoints.
+
+    Lets the purger commit and roll back batch by batch while everything
+    is still undone with the test's own transaction.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._execute('SAVEPOINT purge')
+
+    def _execute(self, sql):
+        with self.conn.cursor() as cur:
+            cur.execute(sql)
+
+    def cursor(self, **kwargs):
+        return self.conn.cursor(**kwargs)
+
+    def commit(self):
+        self._execute('RELEASE SAVEPOINT purge; SAVEPOINT purge')
+
+    def rollback(self):
+        self._execute('ROLLBACK TO SAVEPOINT purge')
+
+
+@pytest.fixture
+def pool(monkeypatch, db_conn):
+    """Hand the purger the test connection; record how it is returned."""
+    returned = []
+    monkeypatch.setattr(company_purge, 'get_db_connection', lambda: SavepointConnection(db_conn))
+    monkeypatch.setattr(company_purge, 'close_db_connection',
+                        lambda conn, discard=False: returned.append(discard))
+    monkeypatch.setattr(company_purge, 'PURGE_BATCH_SIZE', 2)
+    monkeypatch.setattr(company_purge, 'PURGE_BATCH_PAUSE', 0)
+    return returned
+
+
+@pytest.fixture
+def doomed(cursor, make_company, make_employee):
+    """A soft-deleted company with three employees, each with one shift, queued for purging."""
+    make_company('Purge Co')
+    make_company('Kept Co')
+    for i in range(3):
+        employee = make_employee(f'PRG{i:03}', company_name='Purge Co')
+        execute_prepared(cursor, 'check_in', (employee['emp_no'], employee['id'], 'Purge Co',
+                                              START + timedelta(days=i)))
+    make_employee('KEPT001', company_name='Kept Co')
+    cursor.execute("UPDATE companies SET deleted_at = CURRENT_TIMESTAMP WHERE company_name = 'Purge Co'")
+    request_purge(cursor, 'Purge Co')
+    return 'Purge Co'
+
+
+def count(cursor, sql):
+    cursor.execute(sql)
+    return cursor.fetchone()[0]
+
+
+def advisory_locks(cursor):
+    return count(cursor, "SELECT COUNT(*) FROM pg_locks WHERE locktype = 'advisory' AND pid = pg_backend_pid()")
+
+
+def test_purge_removes_the_company_in_batches(cursor, pool, doomed):
+    CompanyPurger().run_pending()
+
+    purge = get_purge(cursor, doomed)
+    assert (purge['status'], purge['attendance_deleted'], purge['employees_deleted']) == ('done', 3, 3)
+    assert count(cursor, "SELECT COUNT(*) FROM employees WHERE company_name = 'Purge Co'") == 0
+    assert count(cursor, "SELECT COUNT(*) FROM attendance WHERE emp_no LIKE 'PRG%'") == 0
+    assert count(cursor, "SELECT COUNT(*) FROM companies WHERE company_name = 'Purge Co'") == 0
+    assert count(cursor, "SELECT COUNT(*) FROM employees WHERE emp_no = 'KEPT001'") == 1
+    assert count(cursor, "SELECT COUNT(*) FROM company_archive WHERE company_name = 'Purge Co'") == 0
+    assert advisory_locks(cursor) == 0
+    assert pool == [False]
+
+
+def test_archived_purge_keeps_a_copy(cursor, pool, doomed):
+    request_purge(cursor, doomed, archive=True)
+
+    CompanyPurger().run_pending()
+
+    cursor.execute("""
+        SELECT source_table, COUNT(*) FROM company_archive
+        WHERE company_name = 'Purge Co' GROUP BY source_table ORDER BY source_table
+    """)
+    assert [tuple(row) for row in cursor.fetchall()] == [('attendance', 3), ('companies', 1), ('employees', 3)]
+
+
+def test_failed_purge_is_recorded_and_queued_again_on_start(cursor, pool, doomed, monkeypatch):
+    purger = CompanyPurger()
+
+    def fail(*args):
+        raise RuntimeError('disk full')
+    monkeypatch.setattr(purger, '_purge', fail)
+    purger.run_pending()
+
+    purge = get_purge(cursor, doomed)
+    assert (purge['status'], purge['error']) == ('failed', 'disk full')
+    assert advisory_locks(cursor) == 0
+
+    purger.requeue_failed()
+
+    purge = get_purge(cursor, doomed)
+    assert (purge['status'], purge['error']) == ('pending', None)
+
+
+def test_stopping_leaves_the_purge_to_carry_on_later(cursor, pool, doomed):
+    purger = CompanyPurger()
+    original = purger._progress
+
+    def progress_then_stop(*args, **counts):
+        purger._stop.set()
+        original(*args, **counts)
+    purger._progress = progress_then_stop
+
+    purger.run_pending()
+
+    purge = get_purge(cursor, doomed)
+    assert (purge['status'], purge['attendance_deleted'], purge['error']) == ('running', 2, None)
+    assert count(cursor, "SELECT COUNT(*) FROM attendance WHERE emp_no LIKE 'PRG%'") == 1
+    assert count(cursor, "SELECT COUNT(*) FROM employees WHERE company_name = 'Purge Co'") == 3
+    assert advisory_locks(cursor) == 0
+    assert pool == [False]
+
+
+def test_progress_raises_once_stopped():
+    purger = CompanyPurger()
+    purger.stop()
+
+    class Connection:
+        def commit(self):
+            pass
+
+    class Cursor:
+        def execute(self, sql, params):
+            pass
+
+    with pytest.raises(_PurgeStopped):
+        purger._progress(Connection(), Cursor(), 'Purge Co', attendance_deleted=1)
+
+
+def test_connection_is_discarded_if_the_purge_pass_breaks(cursor, pool, doomed, monkeypatch):
+    purger = CompanyPurger()
+
+    def broken(*args):
+        raise RuntimeError('connection lost')
+    monkeypatch.setattr(purger, '_purge', broken)
+    original_cursor = SavepointConnection.cursor
+
+    def cursor_failing_on_unlock(self, **kwargs):
+        cur = original_cursor(self, **kwargs)
+        execute = cur.execute
+
+        def guarded(sql, params=None):
+            if 'pg_advisory_unlock' in sql:
+                raise RuntimeError('connection lost')
+            return execute(sql, params)
+        cur.execute = guarded
+        return cur
+    monkeypatch.setattr(SavepointConnection, 'cursor', cursor_failing_on_unlock)
+
+    with pytest.raises(RuntimeError):
+        purger.run_pending()
+
+    assert pool == [True]
+
+
+def test_deleted_company_is_hidden_before_it_is_purged(cursor, doomed):
+    catalog, directory = CompanyCatalog(), EmployeeDirectory()
+
+    catalog._load(cursor, 1)
+    directory._load(cursor, 1)
+
+    assert 'Purge Co' not in catalog._by_name and 'Kept Co' in catalog._by_name
+    assert 'PRG000' not in directory._by_emp_no and 'KEPT001' in directory._by_emp_no
+
+
+def test_employees_are_indexed_by_company(cursor):
+    assert count(cursor, "SELECT COUNT(*) FROM pg_indexes WHERE indexname = 'idx_employees_company_name'") == 1
+
+
+def test_thread_queues_failed_purges_again_before_its_first_pass(monkeypatch):
+    purger = CompanyPurger()
+    calls = []
+
+    def requeue():
+        calls.append('requeue')
+        if calls.count('requeue') == 1:
+            raise RuntimeError('database unavailable')
+
+    def run_pending():
+        calls.append('run')
+        if calls.count('run') == 2:
+            purger.stop()
+        else:
+            purger.wake()
+
+    monkeypatch.setattr(purger, 'requeue_failed', requeue)
+    monkeypatch.setattr(purger, 'run_pending', run_pending)
+    monkeypatch.setattr(company_purge, 'PURGE_POLL_INTERVAL', 0.01)
+    purger.start()
+    purger._thread.join(2)
+
+    assert calls == ['requeue', 'requeue', 'run', 'run']
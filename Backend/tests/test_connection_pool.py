@@ -0,0 +1,137 @@
+import threading
+import time
+
+import pytest
+from psycopg2 import extensions
+
+from db_connection import ConnectionPool, PoolTimeout
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        if self.conn.broken:
+            raise RuntimeError('server closed the connection')
+
+
+class FakeConnection:
+    def __init__(self):
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.closed = False
+        self.broken = False
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def get_transaction_status(self):
+        return self.status
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = True
+
+
+class FakePool(ConnectionPool):
+    def _connect(self):
+        with self._cond:
+            self._stats['connections_opened'] += 1
+        return FakeConnection()
+
+
+def make_pool(maxconn=2, **settings):
+    options = {'checkout_timeout': 0.2, 'max_lifetime': 60, 'preping_interval': 30}
+    options.update(settings)
+    return FakePool(0, maxconn, **options)
+
+
+def test_reuses_the_most_recently_returned_connection():
+    pool = make_pool()
+    first, second = pool.getconn(), pool.getconn()
+    pool.putconn(first)
+    pool.putconn(second)
+
+    assert pool.getconn() is second
+    assert pool.stats()['connections_opened'] == 2
+
+
+def test_checkout_times_out_when_every_connection_is_lent():
+    pool = make_pool(maxconn=1)
+    held = pool.getconn()
+
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    assert pool.stats()['checkout_timeouts'] == 1
+    pool.putconn(held)
+    assert pool.getconn() is held
+
+
+def test_connection_a_caller_forgot_is_reclaimed():
+    pool = make_pool(maxconn=1)
+    pool.getconn()
+
+    assert pool.getconn() is not None
+
+
+def test_returned_connection_wakes_a_waiting_caller():
+    pool = make_pool(maxconn=1, checkout_timeout=2)
+    conn = pool.getconn()
+    threading.Timer(0.05, pool.putconn, (conn,)).start()
+
+    assert pool.getconn() is conn
+    assert pool.stats()['checkout_waits'] == 1
+
+
+def test_open_transaction_is_rolled_back_on_return():
+    pool = make_pool()
+    conn = pool.getconn()
+    conn.status = extensions.TRANSACTION_STATUS_INTRANS
+    pool.putconn(conn)
+
+    assert conn.rollbacks == 1
+    assert pool.stats()['idle'] == 1
+
+
+def test_connection_past_its_lifetime_is_replaced():
+    pool = make_pool(max_lifetime=0.01)
+    conn = pool.getconn()
+    time.sleep(0.02)
+    pool.putconn(conn)
+
+    assert conn.closed
+    assert pool.getconn() is not conn
+    assert pool.stats()['recycled'] == 1
+
+
+def test_idle_connection_failing_its_ping_is_replaced():
+    pool = make_pool(preping_interval=0)
+    conn = pool.getconn()
+    pool.putconn(conn)
+    conn.broken = True
+
+    replacement = pool.getconn()
+    assert replacement is not conn
+    assert conn.closed
+    assert pool.stats()['preping_failures'] == 1
+
+
+def test_discarded_connection_frees_its_slot():
+    pool = make_pool(maxconn=1)
+    conn = pool.getconn()
+    pool.putconn(conn, discard=True)
+
+    assert conn.closed
+    assert pool.getconn() is not conn
@@ -0,0 +1,112 @@
+import pytest
+
+from employee_changes import InvalidChangesCursor, decode_cursor, encode_cursor, fetch_changes
+
+
+def current_txid(cursor):
+    cursor.execute("SELECT txid_current()")
+    return cursor.fetchone()[0]
+
+
+def sync(cursor, since=None, limit=None):
+    """Follow the pages of one sync; return its changes for SYNC* employees and the final cursor."""
+    changes = []
+    while True:
+        page, since, has_more = fetch_changes(cursor, since, limit)
+        changes.extend(page)
+        if not has_more:
+            break
+    mine = [c for c in changes if (c.get('emp_no') or c.get('employee', {}).get('emp_no')).startswith('SYNC')]
+    return mine, since
+
+
+def emp_nos(changes):
+    return [(c['op'], c.get('emp_no') or c['employee']['emp_no']) for c in changes]
+
+
+def test_cursor_round_trips():
+    assert decode_cursor(encode_cursor(42)) == (42, 0, None)
+    assert decode_cursor(encode_cursor(42, 7, 50)) == (42, 7, 50)
+
+
+@pytest.mark.parametrize('token', ['nonsense', encode_cursor(1, 2, 3)[:-2], 'WzEsMl0'])
+def test_malformed_cursor_is_rejected(token):
+    with pytest.raises(InvalidChangesCursor):
+        decode_cursor(token)
+
+
+def test_first_sync_returns_every_employee(cursor, make_employee):
+    make_employee('SYNC01', company_name=None)
+    make_employee('SYNC02')
+
+    changes, _ = sync(cursor)
+
+    assert emp_nos(changes) == [('upsert', 'SYNC01'), ('upsert', 'SYNC02')]
+    assert set(changes[0]['employee']) == {'emp_no', 'id', 'name', 'role', 'security_firm', 'rank', 'company_name'}
+
+
+def test_pages_walk_every_change_once(cursor, make_employee):
+    for i in range(5):
+        make_employee(f'SYNC{i:02}')
+
+    changes, _ = sync(cursor, limit=2)
+
+    assert emp_nos(changes) == [('upsert', f'SYNC{i:02}') for i in range(5)]
+    versions = [c['version'] for c in changes]
+    assert versions == sorted(versions)
+
+
+def test_deleted_employee_leaves_a_tombstone(cursor, make_employee):
+    make_employee('SYNC01')
+    make_employee('SYNC02')
+    cursor.execute("DELETE FROM employees WHERE emp_no = 'SYNC01'")
+
+    changes, _ = sync(cursor)
+
+    assert emp_nos(changes) == [('upsert', 'SYNC02'), ('delete', 'SYNC01')]
+
+
+def test_readded_employee_drops_its_tombstone(cursor, make_employee):
+    make_employee('SYNC01')
+    cursor.execute("DELETE FROM employees WHERE emp_no = 'SYNC01'")
+    make_employee('SYNC01')
+
+    changes, _ = sync(cursor)
+
+    assert emp_nos(changes) == [('upsert', 'SYNC01')]
+
+
+def test_only_synced_columns_stamp_a_change(cursor, make_employee):
+    make_employee('SYNC01')
+
+    def version():
+        cursor.execute("SELECT change_version FROM employees WHERE emp_no = 'SYNC01'")
+        return cursor.fetchone()[0]
+
+    inserted = version()
+    cursor.execute("UPDATE employees SET password = 'y', address = 'Kandy' WHERE emp_no = 'SYNC01'")
+    unchanged = version()
+    cursor.execute("UPDATE employees SET rank = 'Driver' WHERE emp_no = 'SYNC01'")
+
+    assert unchanged == inserted
+    assert version() > inserted
+
+
+def test_next_sync_starts_at_the_oldest_running_transaction(cursor, make_employee):
+    make_employee('SYNC01')
+    txid = current_txid(cursor)
+
+    _, since = sync(cursor)
+    horizon, _, _ = decode_cursor(since)
+
+    # This transaction was still running, so its rows are sent again
+    assert horizon <= txid
+    assert emp_nos(sync(cursor, since)[0]) == [('upsert', 'SYNC01')]
+
+
+def test_rows_from_before_the_horizon_are_not_resent(cursor, make_employee):
+    make_employee('SYNC01')
+
+    changes, _ = sync(cursor, encode_cursor(current_txid(cursor) + 1))
+
+    assert changes == []
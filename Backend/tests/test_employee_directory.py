@@ -0,0 +1,115 @@
+import time
+
+import pytest
+from flask import Flask
+
+from employee_directory import EmployeeDirectory
+from routes.user_routes import user_bp
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchall(self):
+        return self.rows
+
+
+def loaded_directory(rows, version=1):
+    directory = EmployeeDirectory()
+    directory._load(FakeCursor(rows), version)
+    directory._next_check = time.monotonic() + 60
+    return directory
+
+
+GUARDS = [
+    ('E1', 'ID-E1', 'Guard One', 'employee', 'Aitken Spence Security', 'Guard'),
+    ('E2', 'ID-E2', 'Guard Two', 'employee', 'Aitken Spence Security', 'Guard'),
+    ('S1', 'ID-S1', 'Supervisor', 'admin', 'Aitken Spence Security', 'Supervisor'),
+]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    directory = loaded_directory(GUARDS)
+    monkeypatch.setattr('routes.user_routes.employee_directory', directory)
+    app = Flask(__name__)
+    app.register_blueprint(user_bp, url_prefix='/api')
+    client = app.test_client()
+    client.directory = directory
+    return client
+
+
+def test_directory_is_indexed_by_emp_no_and_rank():
+    directory = loaded_directory(GUARDS)
+
+    assert directory.get('S1')['name'] == 'Supervisor'
+    assert [e['emp_no'] for e in directory.rank('Guard').employees] == ['E1', 'E2']
+    assert directory.rank('Driver').employees == []
+    assert directory.stats() == {'version': 1, 'employees': 3, 'ranks': 2}
+
+
+def test_rank_listing_is_built_once_per_version():
+    directory = loaded_directory(GUARDS)
+
+    assert directory.rank('Guard') is directory.rank('Guard')
+
+
+def test_rank_is_served_with_an_etag(client):
+    response = client.get('/api/employees_by_rank?rank=Guard')
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] == f'"{client.directory.rank("Guard").etag}"'
+    assert [e['emp_no'] for e in response.get_json()['employees']] == ['E1', 'E2']
+
+
+def test_unchanged_rank_answers_not_modified(client):
+    etag = client.get('/api/employees_by_rank?rank=Guard').headers['ETag']
+
+    response = client.get('/api/employees_by_rank?rank=Guard', headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert response.data == b''
+
+
+def test_changed_rank_gets_a_new_etag(client):
+    etag = client.get('/api/employees_by_rank?rank=Guard').headers['ETag']
+    client.directory._load(FakeCursor(GUARDS[:1]), 2)
+
+    response = client.get('/api/employees_by_rank?rank=Guard', headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_directory_loads_employees(cursor, make_employee):
+    make_employee('DIR001', rank='Driver', name='Driver One')
+    make_employee('DIR002', rank='Driver', name='Driver Two')
+    directory = EmployeeDirectory()
+
+    directory._load(cursor, 5)
+    directory._next_check = time.monotonic() + 60
+
+    drivers = [e for e in directory.rank('Driver').employees if e['emp_no'].startswith('DIR')]
+    assert [e['name'] for e in drivers] == ['Driver One', 'Driver Two']
+    assert set(directory.get('DIR001')) == {'emp_no', 'id', 'name', 'role', 'security_firm', 'rank'}
+
+
+def test_only_directory_columns_bump_the_version(cursor, make_employee):
+    def version():
+        cursor.execute("SELECT version FROM employee_directory_version")
+        return cursor.fetchone()[0]
+
+    start = version()
+    make_employee('DIR003')
+    after_insert = version()
+    cursor.execute("UPDATE employees SET password = 'y' WHERE emp_no = 'DIR003'")
+    after_password = version()
+    cursor.execute("UPDATE employees SET rank = 'Driver' WHERE emp_no = 'DIR003'")
+
+    assert after_insert == start + 1
+    assert after_password == after_insert
+    assert version() == after_insert + 1
@@ -0,0 +1,133 @@
+import csv
+import io
+
+import pytest
+
+import employee_import
+from employee_import import InvalidImport, load_import, prepare_import, read_chunks
+
+HEADER = 'emp_no,id,name,rank,role,company_name,security_firm,address,tel,nic,password'
+
+
+def csv_stream(*lines, header=HEADER):
+    return io.StringIO('\n'.join((header,) + lines) + '\n')
+
+
+def employee_line(emp_no, company='Import Co', **fields):
+    row = {
+        'emp_no': emp_no, 'id': f'ID-{emp_no}', 'name': f'Guard {emp_no}', 'rank': 'Guard',
+        'role': '', 'company_name': company, 'security_firm': 'Aitken Spence Security',
+        'address': '', 'tel': '', 'nic': f'NIC-{emp_no}', 'password': 'secret',
+    }
+    row.update(fields)
+    return ','.join(row[column] for column in HEADER.split(','))
+
+
+@pytest.fixture(autouse=True)
+def fast_hashing(monkeypatch):
+    """Stand in for the bcrypt workers, which test_password_hashing covers."""
+    monkeypatch.setattr(employee_import, 'hash_passwords', lambda passwords: [f'hashed:{p}' for p in passwords])
+
+
+def read_all(stream):
+    rows, rejected = [], []
+    for chunk_rows, chunk_rejected in read_chunks(stream):
+        rows.extend(chunk_rows)
+        rejected.extend(chunk_rejected)
+    return rows, rejected
+
+
+def test_missing_columns_reject_the_whole_file():
+    with pytest.raises(InvalidImport, match='missing columns: nic, password'):
+        read_all(csv_stream(header='emp_no,id,name,rank,company_name,security_firm'))
+
+
+def test_header_is_matched_case_insensitively():
+    rows, rejected = read_all(csv_stream(employee_line('IMP001'), header=HEADER.upper().replace(',', ' ,')))
+
+    assert rejected == []
+    assert rows[0]['emp_no'] == 'IMP001'
+    assert rows[0]['role'] == 'user'
+
+
+def test_invalid_rows_are_reported_with_their_line():
+    rows, rejected = read_all(csv_stream(
+        employee_line('IMP001'),
+        employee_line('IMP002', name=''),
+        employee_line('IMP003', role='owner'),
+        employee_line('IMP004', tel='0' * 21),
+        employee_line('IMP005', nic='NIC-IMP001'),
+        employee_line('IMP001', id='OTHER', nic='OTHER'),
+    ))
+
+    assert [row['line_no'] for row in rows] == [2]
+    assert rejected == [
+        {'line': 3, 'emp_no': 'IMP002', 'reason': 'missing name'},
+        {'line': 4, 'emp_no': 'IMP003', 'reason': 'invalid role owner'},
+        {'line': 5, 'emp_no': 'IMP004', 'reason': 'too long: tel'},
+        {'line': 6, 'emp_no': 'IMP005', 'reason': 'duplicate_nic_in_file'},
+        {'line': 7, 'emp_no': 'IMP001', 'reason': 'duplicate_emp_no_in_file'},
+    ]
+
+
+def test_rows_are_read_a_chunk_at_a_time(monkeypatch):
+    monkeypatch.setattr(employee_import, 'IMPORT_CHUNK_ROWS', 2)
+
+    chunks = list(read_chunks(csv_stream(*(employee_line(f'IMP{i:03}') for i in range(5)))))
+
+    assert [len(rows) for rows, _ in chunks] == [2, 2, 1]
+
+
+def test_too_many_rows_reject_the_whole_file(monkeypatch):
+    monkeypatch.setattr(employee_import, 'IMPORT_MAX_ROWS', 2)
+
+    with pytest.raises(InvalidImport):
+        read_all(csv_stream(*(employee_line(f'IMP{i:03}') for i in range(3))))
+
+
+def test_prepared_import_stages_hashed_rows():
+    with prepare_import(csv_stream(employee_line('IMP001'), employee_line('IMP002', rank=''))) as prepared:
+        staged = list(csv.reader(prepared.staging))
+
+    assert (prepared.received, prepared.staged) == (2, 1)
+    assert prepared.rejected == [{'line': 3, 'emp_no': 'IMP002', 'reason': 'missing rank'}]
+    row = dict(zip(employee_import.STAGING_COLUMNS, staged[0]))
+    assert row['password'] == 'hashed:secret'
+    assert row['tel'] == ''
+
+
+def test_nothing_staged_needs_no_database():
+    with prepare_import(csv_stream(employee_line('IMP001', name=''))) as prepared:
+        report = load_import(None, prepared)
+
+    assert report == {'received': 1, 'inserted': 0, 'conflicts': prepared.rejected}
+
+
+def test_import_merges_into_employees(cursor, make_company, make_employee):
+    make_company('Import Co')
+    make_employee('IMP100')
+    make_employee('IMP900', id='ID-IMP101', nic='NIC-IMP900')
+    make_employee('IMP901', nic='NIC-IMP102')
+    stream = csv_stream(
+        employee_line('IMP100'),
+        employee_line('IMP101'),
+        employee_line('IMP102'),
+        employee_line('IMP103', company='Unknown Co'),
+        employee_line('IMP104', tel='0771234567'),
+        employee_line('IMP105'),
+        employee_line('IMP106', name=''),
+    )
+
+    with prepare_import(stream) as prepared:
+        report = load_import(cursor, prepared)
+
+    assert report['received'] == 7
+    assert report['inserted'] == 2
+    assert [(c['line'], c['reason']) for c in report['conflicts']] == [
+        (2, 'emp_no_exists'), (3, 'id_exists'), (4, 'nic_exists'), (5, 'unknown_company'), (8, 'missing name'),
+    ]
+    cursor.execute("SELECT emp_no, role, tel, password FROM employees WHERE emp_no IN ('IMP104', 'IMP105') ORDER BY emp_no")
+    assert [tuple(row) for row in cursor.fetchall()] == [
+        ('IMP104', 'user', '0771234567', 'hashed:secret'),
+        ('IMP105', 'user', None, 'hashed:secret'),
+    ]
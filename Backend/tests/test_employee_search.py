@@ -0,0 +1,128 @@
+import pytest
+
+from employee_search import (
+    InvalidSearchCursor, SEARCH_MAX_LIMIT, decode_cursor, encode_cursor, escape_like, search_employees
+)
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.query = self.params = None
+
+    def execute(self, query, params=None):
+        self.query, self.params = query, params
+
+    def fetchall(self):
+        return self.rows
+
+
+def rows(count):
+    return [{'emp_no': f'E{i:03}', 'score': 3.0 - i / 100} for i in range(count)]
+
+
+def test_like_wildcards_are_escaped():
+    assert escape_like('50%_a\\b') == '50\\%\\_a\\\\b'
+
+
+def test_cursor_round_trips_the_exact_score():
+    score = 2.0 + 1 / 3
+
+    assert decode_cursor(encode_cursor(score, 'E001')) == (score, 'E001')
+
+
+@pytest.mark.parametrize('token', ['not-a-cursor', encode_cursor(1.0, 'E1')[:-3], 'WzFd'])
+def test_malformed_cursor_is_rejected(token):
+    with pytest.raises(InvalidSearchCursor):
+        decode_cursor(token)
+
+
+def test_page_asks_for_one_extra_row_to_find_the_next_cursor():
+    cursor = FakeCursor(rows(4))
+
+    page, next_cursor = search_employees(cursor, ' Per ', limit=3)
+
+    assert cursor.params['limit'] == 4
+    assert cursor.params['q'] == 'per'
+    assert [r['emp_no'] for r in page] == ['E000', 'E001', 'E002']
+    assert decode_cursor(next_cursor) == (page[-1]['score'], 'E002')
+
+
+def test_last_page_has_no_next_cursor():
+    page, next_cursor = search_employees(FakeCursor(rows(2)), 'per', limit=3)
+
+    assert len(page) == 2
+    assert next_cursor is None
+
+
+def test_limit_is_capped():
+    cursor = FakeCursor([])
+
+    search_employees(cursor, 'per', limit=10 * SEARCH_MAX_LIMIT)
+
+    assert cursor.params['limit'] == SEARCH_MAX_LIMIT + 1
+
+
+def test_short_queries_only_match_prefixes():
+    short, longer = FakeCursor([]), FakeCursor([])
+
+    search_employees(short, 'pe')
+    search_employees(longer, 'per')
+
+    assert '<%' not in short.query
+    assert '<%' in longer.query
+
+
+def test_cursor_continues_after_the_last_row():
+    cursor = FakeCursor([])
+
+    search_employees(cursor, 'per', after=encode_cursor(2.5, 'E007'))
+
+    assert (cursor.params['after_score'], cursor.params['after_emp_no']) == (2.5, 'E007')
+
+
+@pytest.fixture
+def staff(make_employee):
+    make_employee('SRCH01', name='Perera Silva', nic='SRCHNIC01')
+    make_employee('SRCH02', name='Nimal Perera', nic='SRCHNIC02')
+    make_employee('SRCH03', name='Kamal Fernando', nic='SRCHNIC03')
+    make_employee('SRCH04', name='Pereira Dias', nic='SRCHNIC04')
+
+
+def test_exact_emp_no_ranks_first(cursor, staff):
+    page, _ = search_employees(cursor, 'srch03')
+
+    assert page[0]['emp_no'] == 'SRCH03'
+
+
+def test_name_prefix_ranks_above_later_word(cursor, staff):
+    page, _ = search_employees(cursor, 'perera', limit=SEARCH_MAX_LIMIT)
+    emp_nos = [r['emp_no'] for r in page]
+
+    assert emp_nos.index('SRCH01') < emp_nos.index('SRCH02')
+    assert 'SRCH03' not in emp_nos
+
+
+def test_typo_still_matches(cursor, staff):
+    page, _ = search_employees(cursor, 'pererra', limit=SEARCH_MAX_LIMIT)
+
+    assert 'SRCH01' in [r['emp_no'] for r in page]
+
+
+def test_like_wildcards_in_the_query_match_literally(cursor, staff):
+    page, _ = search_employees(cursor, 'p_', limit=SEARCH_MAX_LIMIT)
+
+    assert not [r for r in page if r['emp_no'].startswith('SRCH')]
+
+
+def test_paging_visits_every_match_once(cursor, staff):
+    everything, _ = search_employees(cursor, 'srch', limit=SEARCH_MAX_LIMIT)
+    seen, after = [], None
+    while True:
+        page, after = search_employees(cursor, 'srch', limit=1, after=after)
+        seen.extend(r['emp_no'] for r in page)
+        if after is None:
+            break
+
+    assert seen == [r['emp_no'] for r in everything]
+    assert {'SRCH01', 'SRCH02', 'SRCH03', 'SRCH04'} <= set(seen)
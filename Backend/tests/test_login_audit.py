@@ -0,0 +1,130 @@
+import time
+
+import login_audit
+from login_audit import LoginAuditWriter
+
+
+class Uncommitted:
+    """The test connection, with the writer's commit left to the test's rollback."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def cursor(self):
+        return self.conn.cursor()
+
+    def commit(self):
+        pass
+
+
+def test_record_captures_the_user_row(monkeypatch):
+    writer = LoginAuditWriter()
+    monkeypatch.setattr(writer, '_ensure_started', lambda: None)
+
+    writer.record('SUCCESS', user={'emp_no': 'E1', 'name': 'Guard One', 'rank': 'Guard'},
+                  emp_no='ignored', ip_address='10.0.0.1')
+    writer.record('FAILED', emp_no='E2')
+
+    first, second = writer._queue.get_nowait(), writer._queue.get_nowait()
+    event = dict(zip(login_audit.AUDIT_COLUMNS, first))
+    assert {column: value for column, value in event.items() if value is not None and column != 'occurred_at'} == {
+        'emp_no': 'E1', 'name': 'Guard One', 'rank': 'Guard', 'ip_address': '10.0.0.1', 'status': 'SUCCESS'
+    }
+    assert (second[1], second[-1]) == ('E2', 'FAILED')
+
+
+def test_events_are_batched_up_to_the_batch_size(monkeypatch):
+    monkeypatch.setattr(login_audit, 'LOGIN_AUDIT_BATCH_SIZE', 3)
+    writer = LoginAuditWriter()
+    monkeypatch.setattr(writer, '_ensure_started', lambda: None)
+    for i in range(5):
+        writer.record('SUCCESS', emp_no=f'E{i}')
+
+    assert [len(writer._next_batch()), len(writer._next_batch())] == [3, 2]
+
+
+def test_full_queue_drops_the_event(monkeypatch):
+    monkeypatch.setattr(login_audit, 'LOGIN_AUDIT_QUEUE_SIZE', 1)
+    monkeypatch.setattr(login_audit, 'LOGIN_AUDIT_ENQUEUE_TIMEOUT', 0.01)
+    writer = LoginAuditWriter()
+    monkeypatch.setattr(writer, '_ensure_started', lambda: None)
+
+    writer.record('SUCCESS', emp_no='E1')
+    writer.record('SUCCESS', emp_no='E2')
+
+    assert writer.stats() == {'written': 0, 'dropped': 1, 'failed': 0, 'batches': 0, 'queued': 1}
+
+
+def test_stop_writes_out_queued_events(monkeypatch):
+    writer = LoginAuditWriter()
+    written = []
+    monkeypatch.setattr(writer, '_write', written.extend)
+
+    for i in range(20):
+        writer.record('SUCCESS', emp_no=f'E{i}')
+    writer.stop()
+
+    assert [event[1] for event in written] == [f'E{i}' for i in range(20)]
+
+
+def test_failed_checkout_counts_as_an_attempt(monkeypatch):
+    attempts = []
+
+    def unavailable():
+        attempts.append(time.monotonic())
+        raise RuntimeError('pool exhausted')
+
+    monkeypatch.setattr(login_audit, 'get_db_connection', unavailable)
+    monkeypatch.setattr(login_audit, 'LOGIN_AUDIT_RETRY_DELAY', 0.01)
+    writer = LoginAuditWriter()
+
+    writer._write([('event',)])
+
+    assert len(attempts) == login_audit.LOGIN_AUDIT_WRITE_ATTEMPTS
+    assert attempts[-1] - attempts[0] >= 0.01
+    assert writer.stats()['failed'] == 1
+
+
+def test_writer_thread_survives_unexpected_errors(monkeypatch):
+    monkeypatch.setattr(login_audit, 'LOGIN_AUDIT_RETRY_DELAY', 0.01)
+    writer = LoginAuditWriter()
+    written = []
+
+    def flaky(batch):
+        if not written:
+            written.append(None)
+            raise ValueError('unexpected')
+        written.extend(batch)
+
+    monkeypatch.setattr(writer, '_write', flaky)
+    writer.record('SUCCESS', emp_no='E1')
+    wait_for(lambda: written)
+    writer.record('SUCCESS', emp_no='E2')
+    wait_for(lambda: len(written) > 1)
+    writer.stop()
+
+    assert len(written) == 2
+
+
+def wait_for(condition, timeout=3):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_batch_is_written_with_one_insert(db_conn, cursor, monkeypatch):
+    monkeypatch.setattr(login_audit, 'get_db_connection', lambda: Uncommitted(db_conn))
+    monkeypatch.setattr(login_audit, 'close_db_connection', lambda conn, discard=False: None)
+    writer = LoginAuditWriter()
+    monkeypatch.setattr(writer, '_ensure_started', lambda: None)
+    writer.record('SUCCESS', user={'emp_no': 'AUD001', 'name': 'Guard One'}, device_info='android')
+    writer.record('FAILED', emp_no='AUD002')
+
+    writer._write(writer._next_batch())
+
+    cursor.execute("SELECT emp_no, name, device_info, status FROM login_events WHERE emp_no LIKE 'AUD%' ORDER BY id")
+    assert [tuple(row) for row in cursor.fetchall()] == [
+        ('AUD001', 'Guard One', 'android', 'SUCCESS'),
+        ('AUD002', None, None, 'FAILED'),
+    ]
+    assert writer.stats()['batches'] == 1
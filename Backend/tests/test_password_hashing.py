@@ -0,0 +1,125 @@
+import time
+
+import bcrypt
+import pytest
+
+import password_hashing
+from password_hashing import PasswordPoolBusy
+
+
+@pytest.fixture(autouse=True)
+def pool():
+    yield
+    password_hashing.shutdown_pool()
+
+
+def slots():
+    return password_hashing._pending._value, password_hashing._bulk_pending._value
+
+
+def test_hash_and_verify_round_trip():
+    hashed = password_hashing.hash_password('secret', rounds=4)
+
+    assert password_hashing.verify_password(hashed, 'secret')
+    assert not password_hashing.verify_password(hashed, 'wrong')
+
+
+def test_timed_out_job_keeps_its_slot_until_it_finishes(monkeypatch):
+    monkeypatch.setattr(password_hashing, 'BCRYPT_TIMEOUT', 0.05)
+    password_hashing.start_pool()
+    before = slots()
+
+    with pytest.raises(PasswordPoolBusy):
+        password_hashing._run(time.sleep, 0.5)
+    assert password_hashing._pending._value == before[0] - 1
+
+    deadline = time.monotonic() + 5
+    while slots() != before and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert slots() == before
+
+
+def test_full_queue_fails_fast():
+    held = 0
+    while password_hashing._pending.acquire(blocking=False):
+        held += 1
+    try:
+        with pytest.raises(PasswordPoolBusy, match='queue is full'):
+            password_hashing.hash_password('secret', rounds=4)
+    finally:
+        for _ in range(held):
+            password_hashing._pending.release()
+
+
+def test_needs_rehash_compares_the_cost(monkeypatch):
+    monkeypatch.setattr(password_hashing, 'BCRYPT_ROUNDS', 12)
+
+    assert password_hashing.needs_rehash(bcrypt.hashpw(b'x', bcrypt.gensalt(4)).decode())
+    assert not password_hashing.needs_rehash('$2b$12$' + 'a' * 53)
+    assert not password_hashing.needs_rehash('plaintext')
+
+
+def test_failed_logins_lock_out_and_reset():
+    tracker = password_hashing.FailedLoginTracker(max_failures=2, window=60, lockout=60)
+    tracker.record_failure('E1')
+    tracker.check('E1')
+    tracker.record_failure('E1')
+
+    with pytest.raises(password_hashing.LoginThrottled):
+        tracker.check('E1')
+    tracker.record_success('E1')
+    tracker.check('E1')
+
+
+def test_bulk_hashing_keeps_order_and_returns_its_slots():
+    before = slots()
+    passwords = [f'password-{i}' for i in range(6)]
+
+    hashes = password_hashing.hash_passwords(passwords, rounds=4)
+
+    assert [bcrypt.checkpw(p.encode(), h.encode()) for p, h in zip(passwords, hashes)] == [True] * 6
+    assert slots() == before
+
+
+def test_bulk_hashing_gives_up_when_logins_hold_every_slot(monkeypatch):
+    monkeypatch.setattr(password_hashing, 'BCRYPT_TIMEOUT', 0.05)
+    held = 0
+    while password_hashing._pending.acquire(blocking=False):
+        held += 1
+    try:
+        with pytest.raises(PasswordPoolBusy):
+            password_hashing.hash_passwords(['a', 'b'], rounds=4)
+    finally:
+        for _ in range(held):
+            password_hashing._pending.release()
+    assert password_hashing._bulk_pending._value == password_hashing.BCRYPT_BULK_MAX_PENDING
+
+
+@pytest.fixture
+def routes_app(database):
+    from flask import Flask
+    import db_context
+    from routes.user_routes import user_bp
+    app = Flask(__name__)
+    db_context.init_app(app)
+    app.register_blueprint(user_bp, url_prefix='/api')
+    return app
+
+
+def test_add_employee_hashes_without_holding_a_connection(routes_app, monkeypatch):
+    from flask import g
+    import routes.user_routes as user_routes
+    held_during_hash = []
+
+    def hash_and_note(password):
+        held_during_hash.append(g.get('_data_context') is not None)
+        return password_hashing.hash_password(password, rounds=4)
+    monkeypatch.setattr(user_routes, 'hash_password', hash_and_note)
+
+    routes_app.test_client().post('/api/employee/add', json={
+        'emp_no': 'HASH001', 'name': 'Hash Test', 'role': 'guard', 'tel': '0770000000',
+        'security_firm': 'Aitken Spence Security', 'rank': 'Guard',
+        'company_name': 'No Such Co', 'nic': 'HASHNIC001', 'password': 'secret',
+    })
+
+    assert held_during_hash == [False]
@@ -0,0 +1,108 @@
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pytest
+
+from models import ATTENDANCE_TIMEZONE
+from payroll import _load_sessions, compute_payroll, month_bounds, night_seconds_before
+from prepared_statements import execute_prepared
+
+HOUR = 3600.0
+DAY = 24 * HOUR
+RULES = {'regular_hours_per_day': 8, 'shift_hours': 12, 'night_start': '22:00', 'night_end': '06:00'}
+
+
+def payroll(sessions, days_in_month=31, rules=RULES):
+    """compute_payroll over (emp_no, day, start hour, end hour) tuples, hours from that day's midnight."""
+    emp_nos = [s[0] for s in sessions]
+    starts = np.array([s[1] * DAY + s[2] * HOUR for s in sessions])
+    ends = np.array([s[1] * DAY + s[3] * HOUR for s in sessions])
+    days = np.array([s[1] for s in sessions])
+    employees, totals = compute_payroll(emp_nos, starts, ends, days, days_in_month, rules)
+    return {emp: {k: v[i].item() for k, v in totals.items()} for i, emp in enumerate(employees)}
+
+
+def night_minutes(start, end, night_start, night_end):
+    """Reference night overlap, one minute at a time."""
+    count = 0
+    for minute in range(int(start // 60), int(end // 60)):
+        clock = (minute * 60) % DAY
+        if night_start <= night_end:
+            count += night_start <= clock < night_end
+        else:
+            count += clock >= night_start or clock < night_end
+    return count * 60
+
+
+def test_hours_over_the_daily_cap_are_overtime():
+    result = payroll([('E1', 0, 8, 18)])['E1']
+
+    assert result['total_hours'] == 10
+    assert result['regular_hours'] == 8
+    assert result['overtime_hours'] == 2
+    assert result['shift_count'] == 1
+
+
+def test_cap_applies_per_work_day_not_per_session():
+    same_day = payroll([('E1', 0, 6, 11), ('E1', 0, 13, 18)])['E1']
+    two_days = payroll([('E1', 0, 6, 11), ('E1', 1, 13, 18)])['E1']
+
+    assert same_day['overtime_hours'] == 2 and same_day['days_worked'] == 1
+    assert two_days['overtime_hours'] == 0 and two_days['days_worked'] == 2
+    assert same_day['sessions'] == two_days['sessions'] == 2
+
+
+def test_night_hours_span_midnight():
+    result = payroll([('E1', 0, 20, 26)])['E1']
+
+    assert result['night_hours'] == 4
+    assert result['shift_count'] == 1
+
+
+def test_long_session_counts_several_shifts():
+    assert payroll([('E1', 0, 0, 25)])['E1']['shift_count'] == 3
+
+
+def test_employees_are_totalled_separately():
+    result = payroll([('E2', 0, 8, 12), ('E1', 0, 8, 20), ('E2', 3, 8, 12)])
+
+    assert list(result) == ['E1', 'E2']
+    assert result['E1']['overtime_hours'] == 4
+    assert result['E2']['total_hours'] == 8 and result['E2']['days_worked'] == 2
+
+
+@pytest.mark.parametrize('night_start, night_end', [(22, 6), (1, 5), (0, 0), (18, 18.5)])
+def test_night_overlap_matches_a_minute_by_minute_count(night_start, night_end):
+    rng = np.random.default_rng(7)
+    starts = rng.integers(0, 30 * 24 * 60, 200) * 60.0
+    ends = starts + rng.integers(0, 40 * 60, 200) * 60.0
+    ns, ne = night_start * HOUR, night_end * HOUR
+
+    night = night_seconds_before(ends, ns, ne) - night_seconds_before(starts, ns, ne)
+
+    expected = [night_minutes(s, e, ns, ne) for s, e in zip(starts, ends)]
+    assert np.array_equal(night, np.array(expected, dtype=float))
+
+
+def test_month_bounds_roll_over_the_year():
+    start, end, start_time, end_time = month_bounds(date(2025, 12, 17))
+
+    assert (start, end) == (date(2025, 12, 1), date(2026, 1, 1))
+    assert start_time.utcoffset() == end_time.utcoffset()
+    assert end_time - start_time == timedelta(days=31)
+
+
+def test_sessions_are_loaded_in_local_time(cursor, make_company, make_employee):
+    guard = make_employee('PAY001', company_name=make_company('Payroll Co'))
+    # 22:00 local time on 1 May, for eight hours
+    start = datetime(2025, 5, 1, 22, 0, tzinfo=ZoneInfo(ATTENDANCE_TIMEZONE)).astimezone(timezone.utc)
+    execute_prepared(cursor, 'check_in', (guard['emp_no'], guard['id'], 'Payroll Co', start))
+    execute_prepared(cursor, 'check_out', (guard['emp_no'], start + timedelta(hours=8)))
+
+    emp_nos, starts, ends, days, days_in_month = _load_sessions(cursor, 'Payroll Co', date(2025, 5, 1))
+
+    assert emp_nos == ('PAY001',) and days_in_month == 31
+    assert starts[0] % DAY == 22 * HOUR
+    assert ends[0] - starts[0] == 8 * HOUR
+    assert days[0] == 0
@@ -0,0 +1,61 @@
+import pytest
+
+from refresh_tokens import (
+    InvalidRefreshToken, create_refresh_token, revoke_refresh_token, rotate_refresh_token
+)
+
+
+def test_rotation_returns_a_new_token(cursor, make_employee):
+    employee = make_employee('RT001')
+    token = create_refresh_token(cursor, employee['emp_no'])
+
+    emp_no, replacement = rotate_refresh_token(cursor, token)
+
+    assert emp_no == employee['emp_no']
+    assert replacement != token
+    assert rotate_refresh_token(cursor, replacement)[0] == employee['emp_no']
+
+
+def test_reusing_a_rotated_token_revokes_the_family(cursor, make_employee):
+    employee = make_employee('RT002')
+    token = create_refresh_token(cursor, employee['emp_no'])
+    _, replacement = rotate_refresh_token(cursor, token)
+
+    with pytest.raises(InvalidRefreshToken, match='reuse detected'):
+        rotate_refresh_token(cursor, token)
+    with pytest.raises(InvalidRefreshToken, match='Invalid or expired'):
+        rotate_refresh_token(cursor, replacement)
+
+
+def test_unknown_token_is_rejected(cursor):
+    with pytest.raises(InvalidRefreshToken, match='Invalid or expired'):
+        rotate_refresh_token(cursor, 'not-a-token')
+
+
+def test_logout_revokes_only_that_session(cursor, make_employee):
+    employee = make_employee('RT003')
+    phone = create_refresh_token(cursor, employee['emp_no'])
+    tablet = create_refresh_token(cursor, employee['emp_no'])
+
+    assert revoke_refresh_token(cursor, phone, employee['emp_no'])
+    with pytest.raises(InvalidRefreshToken):
+        rotate_refresh_token(cursor, phone)
+    assert rotate_refresh_token(cursor, tablet)[0] == employee['emp_no']
+
+
+def test_expired_token_is_rejected(cursor, make_employee):
+    employee = make_employee('RT004')
+    token = create_refresh_token(cursor, employee['emp_no'])
+    cursor.execute("UPDATE refresh_tokens SET expires_at = CURRENT_TIMESTAMP - INTERVAL '1 second' "
+                   "WHERE emp_no = %s", (employee['emp_no'],))
+
+    with pytest.raises(InvalidRefreshToken, match='Invalid or expired'):
+        rotate_refresh_token(cursor, token)
+
+
+def test_tokens_are_stored_as_digests(cursor, make_employee):
+    employee = make_employee('RT005')
+    token = create_refresh_token(cursor, employee['emp_no'])
+
+    cursor.execute("SELECT COUNT(*) FROM refresh_tokens WHERE token_hash = %s", (token,))
+    assert cursor.fetchone()[0] == 0
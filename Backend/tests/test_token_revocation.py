@@ -0,0 +1,154 @@
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import token_revocation
+from token_revocation import BloomFilter, RevocationList
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.queries.append((' '.join(query.split()), params))
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.cur = FakeCursor(rows)
+        self.committed = False
+
+    def cursor(self):
+        return self.cur
+
+    def commit(self):
+        self.committed = True
+
+
+@pytest.fixture
+def revoked_tokens(monkeypatch):
+    """Serve refresh() a fixed set of revoked_tokens rows."""
+    connections = []
+
+    def serve(rows):
+        def connect():
+            connections.append(FakeConnection(rows))
+            return connections[-1]
+        monkeypatch.setattr(token_revocation, 'get_db_connection', connect)
+        monkeypatch.setattr(token_revocation, 'close_db_connection', lambda conn: None)
+        return connections
+    return serve
+
+
+def revoked_row(jti, expires_in=3600, revoked_ago=0):
+    now = datetime.now(timezone.utc)
+    return jti, now + timedelta(seconds=expires_in), now - timedelta(seconds=revoked_ago)
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    items = [uuid.uuid4().hex for _ in range(1000)]
+    for item in items:
+        bloom.add(item)
+
+    assert all(item in bloom for item in items)
+    false_positives = sum(uuid.uuid4().hex in bloom for _ in range(10000))
+    assert false_positives < 300
+
+
+def test_locally_revoked_token_is_seen_at_once():
+    revocations = RevocationList(100, 0.001)
+
+    revocations.mark_revoked('abc', time.time() + 60)
+
+    assert revocations.is_revoked('abc')
+    assert not revocations.is_revoked('def')
+
+
+def test_checking_a_token_never_touches_the_database(monkeypatch):
+    def unavailable():
+        raise AssertionError('is_revoked opened a connection')
+    monkeypatch.setattr(token_revocation, 'get_db_connection', unavailable)
+
+    assert not RevocationList(100, 0.001).is_revoked('abc')
+
+
+def test_refresh_loads_everything_then_only_newer_rows(revoked_tokens):
+    connections = revoked_tokens([revoked_row('old', revoked_ago=30), revoked_row('new')])
+    revocations = RevocationList(100, 0.001)
+
+    revocations.refresh()
+    revocations.refresh()
+
+    assert revocations.is_revoked('old') and revocations.is_revoked('new')
+    first, second = connections[0].cur.queries[0], connections[1].cur.queries[0]
+    assert 'expires_at > CURRENT_TIMESTAMP' in first[0]
+    assert second[1] == (revocations._last_seen, token_revocation.REFRESH_OVERLAP)
+    assert all(conn.committed for conn in connections)
+
+
+def test_refresh_forgets_expired_revocations(revoked_tokens):
+    revoked_tokens([revoked_row('gone', expires_in=-1)])
+    revocations = RevocationList(100, 0.001)
+
+    revocations.refresh()
+
+    assert not revocations.is_revoked('gone')
+    assert revocations.stats()['revoked'] == 0
+
+
+def test_filter_is_rebuilt_once_mostly_stale(revoked_tokens):
+    revoked_tokens([])
+    revocations = RevocationList(4, 0.01)
+    for i in range(10):
+        revocations.mark_revoked(f'expired-{i}', time.time() - 1)
+    revocations.mark_revoked('live', time.time() + 60)
+
+    revocations.refresh()
+
+    assert revocations.stats()['bloom_entries'] == 1
+    assert revocations.is_revoked('live')
+
+
+def test_refresh_thread_keeps_going_after_errors(monkeypatch):
+    calls = []
+
+    def refresh():
+        calls.append(None)
+        raise RuntimeError('database unavailable')
+
+    monkeypatch.setattr(token_revocation.revocation_list, 'refresh', refresh)
+    monkeypatch.setattr(token_revocation, 'REFRESH_INTERVAL', 0.01)
+    token_revocation.start_revocation_refresh()
+    try:
+        deadline = time.monotonic() + 2
+        while len(calls) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        token_revocation.stop_revocation_refresh()
+        token_revocation._thread.join(1)
+
+    assert len(calls) >= 3
+
+
+def test_revocation_round_trip(cursor, db_conn, make_employee):
+    employee = make_employee('REV001')
+    jti = uuid.uuid4().hex
+    RevocationList(100, 0.001).revoke(cursor, jti, employee['emp_no'], time.time() + 600)
+
+    cursor.execute("SELECT emp_no FROM revoked_tokens WHERE jti = %s", (jti,))
+
+    assert cursor.fetchone()[0] == employee['emp_no']
@@ -0,0 +1,225 @@
+import time
+
+import pytest
+from flask import Flask
+
+import versioned_cache
+from company_catalog import CompanyCatalog
+from versioned_cache import VersionedCache
+
+
+class FakeCursor:
+    def __init__(self, row):
+        self.row = row
+        self.queries = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.queries.append(' '.join(query.split()))
+
+    def fetchone(self):
+        return self.row
+
+
+class FakeConnection:
+    def __init__(self, version):
+        self.cur = FakeCursor((version,))
+
+    def cursor(self):
+        return self.cur
+
+    def commit(self):
+        pass
+
+
+class Context:
+    def __init__(self, cur):
+        self.cur = cur
+
+    def cursor(self):
+        return self.cur
+
+
+class RecordingCache(VersionedCache):
+    def __init__(self, check_interval=60):
+        super().__init__('test_version', check_interval)
+        self.loads = []
+
+    def _load(self, cursor, version):
+        self.loads.append(version)
+        self._version = version
+
+
+@pytest.fixture
+def db_version(monkeypatch):
+    """Serve the version table from ``state['version']`` on pool connections."""
+    state = {'version': 1, 'connections': 0, 'error': None}
+
+    def connect():
+        if state['error']:
+            raise state['error']
+        state['connections'] += 1
+        return FakeConnection(state['version'])
+
+    monkeypatch.setattr(versioned_cache, 'get_db_connection', connect)
+    monkeypatch.setattr(versioned_cache, 'close_db_connection', lambda conn: None)
+    return state
+
+
+def test_first_use_loads_the_table(db_version):
+    cache = RecordingCache()
+
+    cache.maybe_refresh()
+
+    assert cache.loads == [1]
+
+
+def test_version_is_not_checked_again_within_the_interval(db_version):
+    cache = RecordingCache()
+    cache.maybe_refresh()
+    db_version['version'] = 2
+
+    cache.maybe_refresh()
+
+    assert cache.loads == [1]
+    assert db_version['connections'] == 1
+
+
+def test_reloads_only_when_the_version_moved(db_version):
+    cache = RecordingCache(check_interval=0)
+    cache.maybe_refresh()
+    cache.maybe_refresh()
+    db_version['version'] = 2
+    cache.maybe_refresh()
+
+    assert cache.loads == [1, 2]
+    assert db_version['connections'] == 3
+
+
+def test_invalidate_forces_a_check(db_version):
+    cache = RecordingCache()
+    cache.maybe_refresh()
+    db_version['version'] = 2
+
+    cache.invalidate()
+    cache.maybe_refresh()
+
+    assert cache.loads == [1, 2]
+
+
+def test_failed_first_load_is_raised(db_version):
+    db_version['error'] = RuntimeError('database unavailable')
+
+    with pytest.raises(RuntimeError):
+        RecordingCache().maybe_refresh()
+
+
+def test_failed_check_keeps_serving_and_retries(db_version):
+    cache = RecordingCache()
+    cache.maybe_refresh()
+    cache.invalidate()
+    db_version['error'] = RuntimeError('database unavailable')
+
+    cache.maybe_refresh()
+
+    assert cache._version == 1
+    db_version['error'] = None
+    db_version['version'] = 2
+    cache.maybe_refresh()
+    assert cache.loads == [1, 2]
+
+
+def test_request_checks_on_the_request_connection(db_version, monkeypatch):
+    import db_context
+
+    monkeypatch.setattr(db_context, 'get_db', lambda: Context(FakeCursor((3, True))))
+    cache = RecordingCache()
+
+    with Flask(__name__).test_request_context():
+        cache.maybe_refresh()
+
+    assert cache.loads == [3]
+    assert db_version['connections'] == 0
+
+
+def test_request_that_has_written_keeps_the_current_copy(db_version, monkeypatch):
+    import db_context
+
+    cache = RecordingCache()
+    cache.maybe_refresh()
+    cache.invalidate()
+    monkeypatch.setattr(db_context, 'get_db', lambda: Context(FakeCursor((5, False))))
+
+    with Flask(__name__).test_request_context():
+        cache.maybe_refresh()
+
+    assert cache.loads == [1]
+    assert db_version['connections'] == 1
+
+
+def test_request_that_has_written_loads_an_empty_cache_on_its_own_connection(db_version, monkeypatch):
+    import db_context
+
+    monkeypatch.setattr(db_context, 'get_db', lambda: Context(FakeCursor((5, False))))
+    cache = RecordingCache()
+
+    with Flask(__name__).test_request_context():
+        cache.maybe_refresh()
+
+    assert cache.loads == [1]
+    assert db_version['connections'] == 1
+
+
+def loaded_catalog(*names, version=1):
+    catalog = CompanyCatalog()
+    catalog._install({name: {'company_name': name} for name in names}, version)
+    catalog._next_check = time.monotonic() + 60
+    return catalog
+
+
+def test_catalog_applies_the_next_version_in_place():
+    catalog = loaded_catalog('Alpha', 'Gamma')
+
+    catalog.apply(2, 'Beta', {'company_name': 'Beta', 'address': 'Kandy', 'extra': 'ignored'})
+    catalog.apply(3, 'Gamma')
+
+    assert [c['company_name'] for c in catalog.all()] == ['Alpha', 'Beta']
+    assert catalog.get('Beta') == {'company_name': 'Beta', 'address': 'Kandy', 'subsidiary': None, 'contact_number': None}
+    assert catalog.stats() == {'version': 3, 'companies': 2}
+
+
+def test_catalog_reloads_after_a_write_it_did_not_see():
+    catalog = loaded_catalog('Alpha')
+
+    catalog.apply(3, 'Beta', {'company_name': 'Beta'})
+
+    assert catalog._version == 1
+    assert 'Beta' not in catalog._by_name
+    assert catalog._next_check == 0.0
+
+
+def test_catalog_loads_live_companies(cursor, make_company):
+    make_company('Catalog Test Co', address='Galle')
+    catalog = CompanyCatalog()
+
+    catalog._load(cursor, 7)
+
+    assert catalog._version == 7
+    assert catalog._by_name['Catalog Test Co']['address'] == 'Galle'
+    assert catalog._sorted == sorted(catalog._sorted, key=lambda c: c['company_name'])
+
+
+def test_company_writes_bump_the_catalog_version(cursor, make_company):
+    cursor.execute("SELECT version FROM company_catalog_version")
+    before = cursor.fetchone()[0]
+
+    make_company('Catalog Version Co')
+    cursor.execute("UPDATE companies SET address = 'Jaffna' WHERE company_name = 'Catalog Version Co'")
+    cursor.execute("SELECT version FROM company_catalog_version")
+
+    assert cursor.fetchone()[0] == before + 2
@@ -0,0 +1,184 @@
+import hashlib
+import math
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+from db_connection import get_db_connection, close_db_connection
+
+load_dotenv()
+
+# Seconds between incremental reloads of the revocation list
+REFRESH_INTERVAL = float(os.getenv('AUTH_REVOCATION_REFRESH_INTERVAL', '5'))
+# Each reload re-reads this many seconds before the last one, so rows from
+# transactions that committed late are not skipped
+REFRESH_OVERLAP = float(os.getenv('AUTH_REVOCATION_REFRESH_OVERLAP', '60'))
+# Expected number of live revocations and tolerated false-positive rate
+BLOOM_CAPACITY = int(os.getenv('AUTH_REVOCATION_BLOOM_CAPACITY', '100000'))
+BLOOM_ERROR_RATE = float(os.getenv('AUTH_REVOCATION_BLOOM_ERROR_RATE', '0.001'))
+# Seconds between deletions of revocations whose tokens have expired
+PURGE_INTERVAL = 3600
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing."""
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class RevocationList:
+    """In-process mirror of the ``revoked_tokens`` table.
+
+    A Bloom filter answers the common "not revoked" case with one memory
+    probe; only filter hits consult the exact set. The mirror is refreshed
+    incrementally by ``revoked_at`` every ``REFRESH_INTERVAL`` seconds on a
+    background thread (``start_revocation_refresh``), so checking a token
+    never needs a connection of its own.
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._revoked = {}
+        self._lock = threading.Lock()
+        self._last_seen = None
+        self._next_purge = 0.0
+
+    def _add_local(self, jti, expires_at):
+        with self._lock:
+            if jti not in self._revoked:
+                self._bloom.add(jti)
+            self._revoked[jti] = expires_at
+
+    def is_revoked(self, jti):
+        if jti not in self._bloom:
+            return False
+        with self._lock:
+            return jti in self._revoked
+
+    def refresh(self):
+        """Load revocations newer than the last refresh and drop expired ones.
+
+        Called from the refresh thread only, which owns ``_last_seen``.
+        """
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                if self._last_seen is None:
+                    cur.execute("""
+                        SELECT jti, expires_at, revoked_at
+                        FROM revoked_tokens
+                        WHERE expires_at > CURRENT_TIMESTAMP
+                        ORDER BY revoked_at
+                    """)
+                else:
+                    cur.execute("""
+                        SELECT jti, expires_at, revoked_at
+                        FROM revoked_tokens
+                        WHERE revoked_at > %s - %s * INTERVAL '1 second'
+                        ORDER BY revoked_at
+                    """, (self._last_seen, REFRESH_OVERLAP))
+                rows = cur.fetchall()
+
+                if time.monotonic() >= self._next_purge:
+                    cur.execute("""
+                        DELETE FROM revoked_tokens
+                        WHERE expires_at < CURRENT_TIMESTAMP - INTERVAL '1 day'
+                    """)
+                    self._next_purge = time.monotonic() + PURGE_INTERVAL
+            conn.commit()
+        finally:
+            close_db_connection(conn)
+
+        for jti, expires_at, revoked_at in rows:
+            self._add_local(jti, expires_at.timestamp())
+            if self._last_seen is None or revoked_at > self._last_seen:
+                self._last_seen = revoked_at
+        if self._last_seen is None:
+            self._last_seen = datetime.now(timezone.utc)
+        self._prune()
+
+    def _prune(self):
+        """Forget expired revocations; rebuild the filter once it is mostly stale."""
+        now = time.time()
+        with self._lock:
+            for jti in [j for j, exp in self._revoked.items() if exp <= now]:
+                del self._revoked[jti]
+            if self._bloom.count > max(2 * len(self._revoked), self.capacity):
+                self._bloom = BloomFilter(max(self.capacity, 2 * len(self._revoked)), self.error_rate)
+                for jti in self._revoked:
+                    self._bloom.add(jti)
+
+    def revoke(self, cursor, jti, emp_no, expires_at):
+        """Record a revocation in the caller's transaction.
+
+        The local mirror is updated by the caller once the transaction has
+        committed (see ``mark_revoked``); other processes pick it up on
+        their next refresh.
+        """
+        cursor.execute("""
+            INSERT INTO revoked_tokens (jti, emp_no, expires_at)
+            VALUES (%s, %s, to_timestamp(%s))
+            ON CONFLICT (jti) DO NOTHING
+        """, (jti, emp_no, expires_at))
+
+    def mark_revoked(self, jti, expires_at):
+        self._add_local(jti, expires_at)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'revoked': len(self._revoked),
+                'bloom_entries': self._bloom.count,
+                'bloom_bits': self._bloom.size,
+            }
+
+
+revocation_list = RevocationList(BLOOM_CAPACITY, BLOOM_ERROR_RATE)
+
+
+_stop = threading.Event()
+_thread = None
+
+
+def _refresh_loop():
+    while not _stop.is_set():
+        try:
+            revocation_list.refresh()
+        except Exception as e:
+            print(f"Error refreshing token revocation list: {str(e)}")
+        _stop.wait(REFRESH_INTERVAL)
+
+
+def start_revocation_refresh():
+    """Load the revocation list now and then once per refresh interval."""
+    global _thread
+    if _thread is None or not _thread.is_alive():
+        _stop.clear()
+        _thread = threading.Thread(target=_refresh_loop, name='token-revocations', daemon=True)
+        _thread.start()
+
+
+def stop_revocation_refresh():
+    _stop.set()
@@ -1,6 +1,6 @@
 CREATE OR REPLACE FUNCTION calculate_shift_count(
-    start_time TIME,
-    end_time TIME
+    start_time TIMESTAMP WITH TIME ZONE,
+    end_time TIMESTAMP WITH TIME ZONE
 ) RETURNS INTEGER AS $$
 DECLARE
     total_hours INTERVAL;
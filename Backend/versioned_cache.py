@@ -0,0 +1,83 @@
+import threading
+import time
+from flask import has_request_context
+from db_connection import get_db_connection, close_db_connection
+
+
+class VersionedCache:
+    """Base for in-process copies of a table kept current by a version counter.
+
+    A statement trigger bumps the single row of ``version_table`` on every
+    write to the cached table. The cache compares that number at most every
+    ``check_interval`` seconds and calls ``_load`` to rebuild itself when it
+    moved; between checks lookups are plain reads. One thread checks while
+    the rest keep serving the current copy.
+
+    Inside a request the check runs on the request's own connection, so a
+    handler never waits on the pool for a second one. If the request has
+    already written in its transaction, what it sees may never commit, so
+    the check is skipped until the next interval (a first load falls back
+    to a connection of its own).
+    """
+
+    name = 'cache'
+
+    def __init__(self, version_table, check_interval):
+        self._version_table = version_table
+        self._check_interval = check_interval
+        self._version = None
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+
+    def invalidate(self):
+        """Force a version check on the next lookup."""
+        self._next_check = 0.0
+
+    def maybe_refresh(self):
+        if time.monotonic() < self._next_check and self._version is not None:
+            return
+        if not self._lock.acquire(blocking=self._version is None):
+            return
+        try:
+            if time.monotonic() >= self._next_check or self._version is None:
+                self._next_check = time.monotonic() + self._check_interval
+                self._refresh()
+        except Exception as e:
+            self._next_check = 0.0
+            print(f"Error refreshing {self.name}: {str(e)}")
+            if self._version is None:
+                raise
+        finally:
+            self._lock.release()
+
+    def _refresh(self):
+        if has_request_context():
+            from db_context import get_db
+            with get_db().cursor() as cur:
+                cur.execute(f"""
+                    SELECT (SELECT version FROM {self._version_table}),
+                           txid_current_if_assigned() IS NULL
+                """)
+                version, clean = cur.fetchone()
+                if clean:
+                    if (version or 0) != self._version:
+                        self._load(cur, version or 0)
+                    return
+            if self._version is not None:
+                return
+
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT version FROM {self._version_table}")
+                row = cur.fetchone()
+                version = row[0] if row else 0
+                if version != self._version:
+                    self._load(cur, version)
+            conn.commit()
+        finally:
+            close_db_connection(conn)
+
+    def _load(self, cursor, version):
+        """Read the table with ``cursor`` and install it as ``version``."""
+        raise NotImplementedError
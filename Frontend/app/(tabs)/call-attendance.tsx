@@ -12,6 +12,7 @@ import { useRouter } from 'expo-router';
 import { useLanguage } from '../../context/LanguageContext';
 import { useLocalSearchParams } from 'expo-router';
 import { getApiUrl } from '../../config/api';
+import { flushAttendanceEvents, queueAttendanceEvent } from '../../config/attendanceQueue';
 import * as SecureStore from 'expo-secure-store';
 import axios from 'axios';
 import DateTimePicker, { DateTimePickerEvent } from '@react-native-community/datetimepicker';
@@ -83,16 +84,16 @@ const CallAttendancePage: FC = () => {
         headers: { Authorization: `Bearer ${token}` },
       });
 
-      if (response.data) {
-        const empNo = response.data.emp_no || empId;
+      const employee = response.data?.employee;
+      if (employee) {
         setEmployeeData({
-          employeeId: empNo,
-          rank: response.data.rank || rank || 'N/A',
-          name: response.data.name || employeeName || 'Employee',
-          role: response.data.role,
-          tel: response.data.tel,
-          companyName: response.data.company_name,
-          securityFirm: response.data.security_firm,
+          employeeId: employee.emp_no || empId,
+          rank: employee.rank || rank || 'N/A',
+          name: employee.name || employeeName || 'Employee',
+          role: employee.role,
+          tel: employee.tel,
+          companyName: employee.company_name,
+          securityFirm: employee.security_firm,
         });
       }
     } catch (error: any) {
@@ -148,6 +149,15 @@ const CallAttendancePage: FC = () => {
     if (employeeData?.employeeId) fetchAttendanceRecords(employeeData.employeeId, dateFilter);
   }, [employeeData?.employeeId, dateFilter]);
 
+  // Replay anything marked while the device was offline
+  useEffect(() => {
+    flushAttendanceEvents()
+      .then((results) => {
+        if (results.length && employeeData?.employeeId) fetchAttendanceRecords(employeeData.employeeId);
+      })
+      .catch(() => undefined);
+  }, [employeeData?.employeeId]);
+
   const handleBack = () => {
     router.back();
   };
@@ -190,8 +200,15 @@ const CallAttendancePage: FC = () => {
     } catch (error: any) {
       let errorMessage = `Failed to mark ${status}. Please try again.`;
       if (error.response) errorMessage = error.response.data?.message || errorMessage;
-      else if (error.request) errorMessage = 'No response from server. Please check your connection.';
-      else errorMessage = error.message || errorMessage;
+      else if (error.request) {
+        // Keep the action with its real time and replay it once back online
+        await queueAttendanceEvent(employeeData.employeeId, status === 'IN' ? 'checkin' : 'checkout');
+        Alert.alert(
+          'Saved Offline',
+          `No response from server. ${status === 'IN' ? 'Check-in' : 'Check-out'} was saved and will sync when the connection is back.`
+        );
+        return;
+      } else errorMessage = error.message || errorMessage;
       Alert.alert('Error', errorMessage);
     }
   };
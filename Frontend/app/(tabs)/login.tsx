@@ -63,6 +63,7 @@ const LoginPage: React.FC = () => {
         // Store authentication details securely
         await Promise.all([
           SecureStore.setItemAsync('userToken', String(response.data.token)),
+          SecureStore.setItemAsync('refreshToken', String(response.data.refresh_token || '')),
           SecureStore.setItemAsync('userRole', String(response.data.role || '')),
           SecureStore.setItemAsync('userRank', String(response.data.rank || '')),
           SecureStore.setItemAsync('userName', String(response.data.name || '')),
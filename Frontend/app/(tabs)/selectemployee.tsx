@@ -27,6 +27,9 @@ interface Employee {
   rank: string;
 }
 
+// Last rank lists with their ETags, so unchanged lists come back as 304
+const rankCache = new Map<string, { etag: string; employees: Employee[] }>();
+
 const CallAttendanceSelectPage: React.FC = () => {
   const router = useRouter();
   const { t } = useLanguage();
@@ -49,15 +52,22 @@ const CallAttendanceSelectPage: React.FC = () => {
       }
       setLoading(true);
       try {
-        const response = await axios.get(getApiUrl(`/api/employees_by_rank?rank=${selectedRank}`), {
+        const cached = rankCache.get(selectedRank);
+        const response = await axios.get(getApiUrl(`/api/employees_by_rank?rank=${encodeURIComponent(selectedRank)}`), {
           headers: {
             'Content-Type': 'application/json',
-            'Authorization': `Bearer ${await SecureStore.getItemAsync('userToken')}`
+            'Authorization': `Bearer ${await SecureStore.getItemAsync('userToken')}`,
+            ...(cached ? { 'If-None-Match': cached.etag } : {}),
           },
+          validateStatus: (status) => status === 200 || status === 304,
         });
 
-        if (response.status === 200) {
+        if (response.status === 304 && cached) {
+          setFilteredEmployees(cached.employees);
+        } else if (response.status === 200) {
           const data = response.data?.employees || [];
+          const etag = response.headers['etag'];
+          if (etag) rankCache.set(selectedRank, { etag, employees: data });
           setFilteredEmployees(data);
         } else {
           throw new Error('Failed to fetch employees');
@@ -1,3 +1,6 @@
+import axios, { AxiosError, InternalAxiosRequestConfig } from 'axios';
+import * as SecureStore from 'expo-secure-store';
+
 // Use your local network IP address for physical device testing
 // In production, this should be your production API URL
 export const API_URL = process.env.EXPO_PUBLIC_API_URL || 'http://172.20.10.3:5001';
@@ -8,3 +11,60 @@ console.log('API URL:', API_URL);
 export function getApiUrl(path?: string) {
   return path ? `${API_URL}${path}` : API_URL;
 }
+
+let refreshInFlight: Promise<string | null> | null = null;
+
+// Exchange the stored refresh token for a new access token so the user does
+// not have to log in again. Concurrent 401s share one refresh request.
+export function refreshAccessToken(): Promise<string | null> {
+  if (!refreshInFlight) {
+    refreshInFlight = (async () => {
+      const refreshToken = await SecureStore.getItemAsync('refreshToken');
+      if (!refreshToken) {
+        return null;
+      }
+      try {
+        const response = await axios.post(
+          getApiUrl('/api/token/refresh'),
+          { refresh_token: refreshToken },
+          { headers: { 'Content-Type': 'application/json' }, timeout: 15000 }
+        );
+        await Promise.all([
+          SecureStore.setItemAsync('userToken', String(response.data.token)),
+          SecureStore.setItemAsync('refreshToken', String(response.data.refresh_token)),
+        ]);
+        return response.data.token as string;
+      } catch (error) {
+        if (axios.isAxiosError(error) && error.response?.status === 401) {
+          await SecureStore.deleteItemAsync('refreshToken');
+        }
+        return null;
+      }
+    })().finally(() => {
+      refreshInFlight = null;
+    });
+  }
+  return refreshInFlight;
+}
+
+// Retry a request once with a renewed access token when it comes back 401
+axios.interceptors.response.use(undefined, async (error: AxiosError) => {
+  const config = error.config as (InternalAxiosRequestConfig & { _retried?: boolean }) | undefined;
+  if (
+    !config ||
+    config._retried ||
+    error.response?.status !== 401 ||
+    config.url?.includes('/api/token/refresh') ||
+    config.url?.includes('/api/login')
+  ) {
+    return Promise.reject(error);
+  }
+
+  config._retried = true;
+  const token = await refreshAccessToken();
+  if (!token) {
+    return Promise.reject(error);
+  }
+  config.headers.Authorization = `Bearer ${token}`;
+  return axios(config);
+});
@@ -0,0 +1,79 @@
+import AsyncStorage from '@react-native-async-storage/async-storage';
+import * as SecureStore from 'expo-secure-store';
+import axios from 'axios';
+import { getApiUrl } from './api';
+
+const QUEUE_KEY = 'attendanceEventQueue';
+// Must not exceed ATTENDANCE_MAX_REPLAY_EVENTS on the server
+const MAX_EVENTS_PER_REQUEST = 500;
+
+export interface AttendanceEvent {
+  idempotency_key: string;
+  emp_no: string;
+  type: 'checkin' | 'checkout';
+  timestamp: string;
+}
+
+function newIdempotencyKey(): string {
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}-${Math.random()
+    .toString(36)
+    .slice(2, 12)}`;
+}
+
+export async function getQueuedEvents(): Promise<AttendanceEvent[]> {
+  const stored = await AsyncStorage.getItem(QUEUE_KEY);
+  return stored ? JSON.parse(stored) : [];
+}
+
+// Serialise queue updates so an enqueue cannot race a flush
+let queueLock: Promise<unknown> = Promise.resolve();
+function withQueueLock<T>(fn: () => Promise<T>): Promise<T> {
+  const result = queueLock.then(fn, fn);
+  queueLock = result.catch(() => undefined);
+  return result;
+}
+
+// Record a check-in/check-out that could not reach the server, stamped with
+// the time it actually happened.
+export function queueAttendanceEvent(empNo: string, type: 'checkin' | 'checkout') {
+  return withQueueLock(async () => {
+    const events = await getQueuedEvents();
+    const event: AttendanceEvent = {
+      idempotency_key: newIdempotencyKey(),
+      emp_no: empNo,
+      type,
+      timestamp: new Date().toISOString(),
+    };
+    events.push(event);
+    await AsyncStorage.setItem(QUEUE_KEY, JSON.stringify(events));
+    return event;
+  });
+}
+
+// Send queued events to /api/attendance/events. Each event keeps its key
+// across retries, so resending after a dropped response cannot create
+// duplicate rows. Returns the server's per-event results.
+export function flushAttendanceEvents() {
+  return withQueueLock(async () => {
+    const events = await getQueuedEvents();
+    const results: any[] = [];
+    if (!events.length) return results;
+
+    const token = await SecureStore.getItemAsync('userToken');
+    if (!token) return results;
+
+    let remaining = events;
+    while (remaining.length) {
+      const batch = remaining.slice(0, MAX_EVENTS_PER_REQUEST);
+      const response = await axios.post(
+        getApiUrl('/api/attendance/events'),
+        { events: batch },
+        { headers: { 'Content-Type': 'application/json', Authorization: `Bearer ${token}` }, timeout: 30000 }
+      );
+      results.push(...(response.data.results || []));
+      remaining = remaining.slice(batch.length);
+      await AsyncStorage.setItem(QUEUE_KEY, JSON.stringify(remaining));
+    }
+    return results;
+  });
+}